@@ -1,7 +1,7 @@
-from .services.transcription import transcribe_audio
-from .services.minutes import generate_minutes
+from .services.transcription import transcribe_audio, stream_transcription
+from .services.minutes import generate_minutes, stream_minutes, parse_minutes
 from .services.document import create_docx
 from .services.rate_limiter import rate_limiter
 from .services.file_cache import file_cache
 
-__all__ = ["transcribe_audio", "generate_minutes", "create_docx", "rate_limiter", "file_cache"]
\ No newline at end of file
+__all__ = ["transcribe_audio", "stream_transcription", "generate_minutes", "stream_minutes", "parse_minutes", "create_docx", "rate_limiter", "file_cache"]
\ No newline at end of file
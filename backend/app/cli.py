@@ -0,0 +1,183 @@
+# backend/app/cli.py
+"""
+Offline batch processing: transcribe, generate minutes and render DOCX for
+every recording in a directory or manifest.
+
+    python -m backend.app.cli process recordings/ --output minutes/ --concurrency 4
+
+Progress is checkpointed after every file, re-running the same command
+resumes where it stopped and skips recordings (by content hash) that are
+already done.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List
+
+from backend.app import transcribe_audio, generate_minutes, parse_minutes, create_docx
+from backend.app.services.clients import close_client
+from backend.app.services.file_cache import hash_file
+from backend.app.services.preprocess import close_pool
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".mp3", ".wav")
+STATE_FILE = ".memomatic_batch.json"
+REPORT_FILE = "report.json"
+
+
+def find_inputs(source: str, manifest: bool) -> List[str]:
+    """List recordings in a directory (recursively) or a manifest file with one path per line"""
+    if manifest:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, "r") as f:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        return [os.path.join(base, path) for path in paths]
+
+    inputs = []
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                inputs.append(os.path.join(root, name))
+    return sorted(inputs)
+
+
+class Checkpoint:
+    """Per-recording results keyed by content hash, saved after every update"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.entries = json.load(f)
+
+    def is_done(self, digest: str) -> bool:
+        return self.entries.get(digest, {}).get("status") == "done"
+
+    def update(self, digest: str, entry: Dict):
+        self.entries[digest] = entry
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+async def process_file(path: str, digest: str, output_dir: str) -> Dict:
+    """Run one recording through transcription, minutes and DOCX, returning its timings"""
+    loop = asyncio.get_running_loop()
+    stem = f"{os.path.splitext(os.path.basename(path))[0]}-{digest[:8]}"
+    timings = {}
+
+    started = time.perf_counter()
+    transcript = await transcribe_audio(path, digest)
+    timings["transcribe"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    minutes_dict = parse_minutes(await generate_minutes(transcript))
+    timings["minutes"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    docx_bytes = await loop.run_in_executor(None, create_docx, minutes_dict)
+    timings["docx"] = time.perf_counter() - started
+
+    outputs = {
+        "transcript": os.path.join(output_dir, f"{stem}.txt"),
+        "minutes": os.path.join(output_dir, f"{stem}.json"),
+        "docx": os.path.join(output_dir, f"{stem}.docx"),
+    }
+    with open(outputs["transcript"], "w", encoding="utf-8") as f:
+        f.write(transcript)
+    with open(outputs["minutes"], "w", encoding="utf-8") as f:
+        json.dump(minutes_dict, f, ensure_ascii=False, indent=2)
+    with open(outputs["docx"], "wb") as f:
+        f.write(docx_bytes)
+
+    return {"outputs": outputs, "timings": timings}
+
+
+async def run_batch(inputs: List[str], output_dir: str, concurrency: int, retry_failed: bool) -> Dict:
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(output_dir, STATE_FILE))
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    in_batch = set()
+    counts = {"done": 0, "skipped": 0, "failed": 0}
+
+    async def run(path: str):
+        async with semaphore:
+            digest = await loop.run_in_executor(None, hash_file, path)
+            entry = checkpoint.entries.get(digest, {})
+            if checkpoint.is_done(digest) or digest in in_batch or (
+                entry.get("status") == "failed" and not retry_failed
+            ):
+                logger.info(f"Skipping {path}, already processed as {digest[:8]}")
+                counts["skipped"] += 1
+                return
+            in_batch.add(digest)
+
+            started = time.perf_counter()
+            try:
+                result = await process_file(path, digest, output_dir)
+                entry = {"status": "done", "source": path, **result}
+                counts["done"] += 1
+                logger.info(f"Processed {path} in {time.perf_counter() - started:.1f}s")
+            except Exception as e:
+                entry = {"status": "failed", "source": path, "error": str(e)}
+                counts["failed"] += 1
+                logger.error(f"Failed to process {path}: {str(e)}")
+            entry["total_seconds"] = time.perf_counter() - started
+            checkpoint.update(digest, entry)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(run(path) for path in inputs))
+    finally:
+        await close_client()
+        close_pool()
+
+    report = {
+        "inputs": len(inputs),
+        **counts,
+        "wall_seconds": time.perf_counter() - started,
+        "files": checkpoint.entries,
+    }
+    with open(os.path.join(output_dir, REPORT_FILE), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memomatic", description="MemoMatic batch processing")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    process = subparsers.add_parser("process", help="Transcribe and generate minutes for many recordings")
+    process.add_argument("source", help="Directory of recordings, or a manifest file with --manifest")
+    process.add_argument("--manifest", action="store_true", help="Treat source as a file listing one recording per line")
+    process.add_argument("--output", "-o", default="minutes_output", help="Directory for results, checkpoint and report")
+    process.add_argument("--concurrency", "-c", type=int, default=2, help="Recordings processed at the same time")
+    process.add_argument("--retry-failed", action="store_true", help="Retry recordings that failed in a previous run")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    inputs = find_inputs(args.source, args.manifest)
+    if not inputs:
+        print(f"No recordings found in {args.source}", file=sys.stderr)
+        return 1
+
+    report = asyncio.run(run_batch(inputs, args.output, args.concurrency, args.retry_failed))
+    print(
+        f"{report['inputs']} recordings: {report['done']} processed, "
+        f"{report['skipped']} skipped, {report['failed']} failed "
+        f"in {report['wall_seconds']:.1f}s. Report: {os.path.join(args.output, REPORT_FILE)}"
+    )
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,38 @@
-from fastapi import FastAPI, UploadFile, File, Request, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, Request, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from backend.app import transcribe_audio, generate_minutes, create_docx, rate_limiter, file_cache
-from typing import Optional
+from backend.app import transcribe_audio, stream_transcription, generate_minutes, stream_minutes, parse_minutes, create_docx, rate_limiter, file_cache
+from config import settings
+from backend.app.services.artifacts import artifact_store, ArtifactNotFoundError
+from backend.app.services.document import FORMATS, load_template, render, render_batch
+from backend.app.services.clients import init_client, close_client
+from backend.app.services.jobs import job_queue, JobNotFoundError
+from backend.app.services.json_stream import IncrementalJSONParser
+from backend.app.services.minutes import cached_minutes, finalize_minutes, minutes_cache, minutes_request
+from backend.app.services import document, preprocess
+from backend.app.services.transcription import start_analysis, stop_analysis, transcript_id
+from backend.app.services.transcripts import format_transcript, transcript_store, TranscriptNotFoundError
+from backend.app.services.search import search_index
+from backend.app.services.metrics import registry, http_requests_in_flight, http_request_duration, time_stage
+from backend.app.services.storage import FileLock, TEMP_DIR
+from backend.app.services.resilience import UpstreamError, UpstreamTimeoutError, UpstreamUnavailableError
+from backend.app.services.upload import (
+    run_blocking,
+    save_upload,
+    upload_manager,
+    UploadTooLargeError,
+    UploadOffsetError,
+    UploadNotFoundError,
+)
+from contextlib import asynccontextmanager
+from io import BytesIO
+from typing import List, Optional, Tuple
+import asyncio
+import math
 import os
+import time
+import zipfile
 from urllib.parse import unquote
 import logging
 import json
@@ -12,10 +41,6 @@ import json
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# get the absolute path to the project root directory
-PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-TEMP_DIR = os.path.join(PROJECT_ROOT, "temp")
-
 # create a temp directory if it doesn't exist
 os.makedirs(TEMP_DIR, exist_ok=True)
 
@@ -24,10 +49,79 @@ title = "MemoMatic API"
 description = "MemoMatic API"
 __version__ = "0.1"
 
+async def run_periodically(func, interval: int, lock: Optional[FileLock] = None):
+    """
+    Run a blocking maintenance function in the thread pool every interval
+    seconds. With a lock, only the worker process holding it runs func.
+    """
+    while True:
+        try:
+            if lock is None or lock.acquire():
+                await run_blocking(func)
+        except Exception as e:
+            logger.error(f"Periodic task {func.__name__} failed: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+# with several uvicorn workers, cleaners run in whichever one holds this lock
+maintenance_lock = FileLock(os.path.join(TEMP_DIR, "maintenance.lock"))
+
+
+def lock_for(backend) -> Optional[FileLock]:
+    """The maintenance lock for a backend shared by all workers, None when each worker keeps its own state"""
+    return maintenance_lock if backend.shared else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one pooled upstream client shared by all requests
+    init_client()
+    # parse the DOCX template once instead of on every render
+    load_template()
+    if settings.PREPROCESS_AUDIO:
+        preprocess.init_pool()
+    # batch exports reuse one render pool instead of starting processes per request
+    document.init_pool()
+    # keep temp/ bounded in the background, shared state is maintained by one worker, per-process state by each
+    interval = settings.FILE_CACHE_EVICTION_INTERVAL
+    maintenance_tasks = [
+        asyncio.create_task(run_periodically(file_cache.maintain, interval, maintenance_lock)),
+        asyncio.create_task(
+            run_periodically(rate_limiter.prune, settings.RATE_LIMIT_PRUNE_INTERVAL, lock_for(rate_limiter.backend))
+        ),
+        asyncio.create_task(run_periodically(artifact_store.clean_expired, interval, maintenance_lock)),
+        asyncio.create_task(run_periodically(upload_manager.clean_stale, interval, maintenance_lock)),
+        asyncio.create_task(run_periodically(transcript_store.evict, interval, maintenance_lock)),
+        asyncio.create_task(run_periodically(minutes_cache.evict, interval, maintenance_lock)),
+        asyncio.create_task(run_periodically(search_index.compact, interval, maintenance_lock)),
+        # every worker keeps its own view of the search index, loaded now rather than on the first search
+        asyncio.create_task(run_periodically(search_index.refresh, interval)),
+        asyncio.create_task(
+            run_periodically(job_queue.requeue_stale, settings.JOB_HEARTBEAT_INTERVAL, lock_for(job_queue.backend))
+        ),
+        asyncio.create_task(run_periodically(job_queue.purge, interval, lock_for(job_queue.backend))),
+    ]
+    job_queue.start()
+    logger.info(f"Worker {os.getpid()} started")
+    yield
+    # let running jobs finish (or requeue them) before their clients and pools go away
+    await job_queue.stop()
+    await stop_analysis()
+    for task in maintenance_tasks:
+        task.cancel()
+    await asyncio.gather(*maintenance_tasks, return_exceptions=True)
+    maintenance_lock.release()
+    preprocess.close_pool()
+    document.close_pool()
+    await close_client()
+    logger.info(f"Worker {os.getpid()} stopped")
+
+
 app = FastAPI(
     title=title,
     description=description,
-    version=__version__
+    version=__version__,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -38,6 +132,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Track in-flight requests and latency per route"""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    
+    http_requests_in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec()
+        # label by route template so per-file URLs don't create new series
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=status,
+        )
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Metrics in the Prometheus text format"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 def root(request: Request = None):
     client_host = request.client.host
@@ -51,13 +176,13 @@ def root(request: Request = None):
 async def get_rate_limit_status(request: Request):
     """Get current rate limit status"""
     client_ip = request.client.host
-    return rate_limiter.check_status(client_ip)
+    return await run_blocking(rate_limiter.check_status, client_ip)
 
 @app.post("/v1/start-cycle", tags=["Rate Limit"])
 async def start_cycle(request: Request):
     """Start a new transcription cycle"""
     client_ip = request.client.host
-    is_allowed, rate_info = rate_limiter.start_cycle(client_ip)
+    is_allowed, rate_info = await run_blocking(rate_limiter.start_cycle, client_ip)
     
     if not is_allowed:
         raise HTTPException(
@@ -71,65 +196,174 @@ async def start_cycle(request: Request):
     
 @app.post("/v1/upload_audio")
 async def upload_audio(file: UploadFile = File(...)):
-    """Handle file upload with caching"""
+    """Handle file upload with content-addressed caching"""
     logger.info(f"Received file upload request: {file.filename}")
-    
-    # Check if file already exists in cache
-    if file_cache.file_exists(file.filename):
-        logger.info(f"File {file.filename} already exists in cache")
-        return {"filename": file.filename}
+    filename = os.path.basename(file.filename)
     
     try:
-        file_path = os.path.join(TEMP_DIR, file.filename)
+        file_path = file_cache.temp_path(filename)
         logger.info(f"Saving file to: {file_path}")
         
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-            logger.info(f"File saved successfully, size: {len(content)} bytes")
+        # stream to disk in chunks, hashing the content on the way
+        size, digest = await save_upload(file, file_path)
+        logger.info(f"File saved successfully, size: {size} bytes, sha256: {digest}")
             
-        # Add file to cache
-        file_cache.add_file(file.filename, file_path)
-        return {"filename": file.filename}
+        # Add file to cache, identical content is only stored once
+        await run_blocking(file_cache.add_file, filename, file_path, digest)
+        # preprocess, index and diarize the audio while the user is still on the upload step
+        start_analysis(await run_blocking(file_cache.get_file_path, digest), digest)
+        return {"filename": filename, "file_id": digest}
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         error_msg = f"Error uploading file: {str(e)}"
         logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+
+class UploadCheckRequest(BaseModel):
+    filename: str
+    size: int
+    sha256: str
+
+
+@app.post("/v1/uploads/check", tags=["Uploads"])
+async def check_upload(request: UploadCheckRequest):
+    """
+    Pre-upload handshake: the client sends the sha256 of the file and skips
+    the upload when the server already has that content.
+    """
+    digest = request.sha256.lower()
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        raise HTTPException(status_code=400, detail="sha256 must be 64 hex characters")
+
+    filename = os.path.basename(request.filename)
+    file_path = await run_blocking(file_cache.claim, filename, digest, request.size)
+    if file_path is None:
+        return {"exists": False}
+
+    logger.info(f"Upload of {filename} skipped, content {digest} is already cached")
+    start_analysis(file_path, digest)
+    return {"exists": True, "filename": filename, "file_id": digest}
+
+
+class CreateUploadRequest(BaseModel):
+    filename: str
+    size: Optional[int] = None
+
+
+@app.post("/v1/uploads", tags=["Uploads"])
+async def create_upload(request: CreateUploadRequest):
+    """Start a resumable, chunked upload"""
+    try:
+        return await run_blocking(upload_manager.create, request.filename, request.size)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@app.get("/v1/uploads/{upload_id}", tags=["Uploads"])
+async def get_upload(upload_id: str):
+    """Get the resume offset of a chunked upload"""
+    try:
+        return await run_blocking(upload_manager.status, upload_id)
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.put("/v1/uploads/{upload_id}", tags=["Uploads"])
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """Append the request body to a chunked upload at the given offset"""
+    try:
+        return await upload_manager.append(upload_id, offset, request.stream())
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@app.post("/v1/uploads/{upload_id}/complete", tags=["Uploads"])
+async def complete_upload(upload_id: str):
+    """Finish a chunked upload and add it to the file cache"""
+    try:
+        state = await run_blocking(upload_manager.status, upload_id)
+        filename = state["filename"]
+        file_path = file_cache.temp_path(filename)
+        await upload_manager.complete(upload_id, file_path)
+        digest = await run_blocking(file_cache.add_file, filename, file_path)
+        start_analysis(await run_blocking(file_cache.get_file_path, digest), digest)
+        logger.info(f"Chunked upload {upload_id} completed, size: {state['offset']} bytes")
+        return {"filename": filename, "file_id": digest}
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+async def validate_session(client_ip: str, session_id: str) -> dict:
+    """Check that session_id is the client's active cycle"""
+    # the SQLite backend can wait on other workers' transactions, keep it off the event loop
+    rate_info = await run_blocking(rate_limiter.check_status, client_ip)
+    if not rate_info["active_cycle"] or rate_info["session_id"] != session_id:
+        raise HTTPException(
+            status_code=400,
+            detail="No active transcription cycle. Please start a new cycle."
+        )
+    return rate_info
+
+
+def error_status(e: Exception) -> int:
+    """Status code for a failed request, upstream failures map to 502, 503 and 504"""
+    if isinstance(e, UpstreamUnavailableError):
+        return 503
+    if isinstance(e, UpstreamTimeoutError):
+        return 504
+    if isinstance(e, UpstreamError):
+        return 502
+    return 500
+
+
+def error_response(e: Exception, error_msg: str) -> HTTPException:
+    headers = None
+    if isinstance(e, UpstreamUnavailableError):
+        headers = {"Retry-After": str(math.ceil(e.retry_after))}
+    return HTTPException(status_code=error_status(e), detail=error_msg, headers=headers)
+
+
+def resolve_audio(filename: str) -> Tuple[str, str]:
+    """Look up a cached upload by file_id or filename, returns (path, digest)"""
+    decoded_filename = unquote(filename)
+    file_path = file_cache.get_file_path(decoded_filename)
+    
+    if not file_path or not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail=f"File not found: {decoded_filename}")
+    
+    # Check file size
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+    
+    return file_path, file_cache.get_digest(decoded_filename)
+
+
 @app.post("/v1/transcribe/{filename}")
 async def transcribe(
     filename: str,
     request: Request,
     session_id: str
 ):
-    """Transcribe audio using cached file"""
+    """Transcribe audio using cached file, looked up by file_id or filename"""
     try:
-        # Validate session
-        rate_info = rate_limiter.check_status(request.client.host)
-        if not rate_info["active_cycle"] or rate_info["session_id"] != session_id:
-            raise HTTPException(
-                status_code=400,
-                detail="No active transcription cycle. Please start a new cycle."
-            )
+        rate_info = await validate_session(request.client.host, session_id)
+        file_path, digest = resolve_audio(filename)
             
-        # Get file from cache
-        decoded_filename = unquote(filename)
-        file_path = file_cache.get_file_path(decoded_filename)
-        
-        if not file_path or not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"File not found: {decoded_filename}")
-        
-        # Check file size
-        file_size = os.path.getsize(file_path)
-        if file_size == 0:
-            raise HTTPException(status_code=400, detail="File is empty")
-            
-        transcript = await transcribe_audio(file_path)
+        transcript = await transcribe_audio(file_path, digest)
         logger.info("Transcription completed successfully")
         
         return {
             "transcript": transcript,
+            "transcript_id": transcript_id(digest),
             "rate_limit_info": rate_info
         }
         
@@ -138,50 +372,330 @@ async def transcribe(
     except Exception as e:
         error_msg = f"Error during transcription: {str(e)}"
         logger.error(error_msg)
-        raise HTTPException(status_code=500, detail=error_msg)
+        raise error_response(e, error_msg)
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/v1/transcribe/{filename}/stream")
+async def transcribe_stream(
+    filename: str,
+    request: Request,
+    session_id: str
+):
+    """Stream transcript segments as Server-Sent Events while chunks are recognized"""
+    rate_info = await validate_session(request.client.host, session_id)
+    file_path, digest = resolve_audio(filename)
+    
+    async def events():
+        segments = []
+        try:
+            async for segment in stream_transcription(file_path, digest):
+                segments.append(segment)
+                yield sse_event("segment", segment)
+            yield sse_event("done", {
+                "transcript": format_transcript(segments),
+                "transcript_id": transcript_id(digest),
+                "rate_limit_info": rate_info
+            })
+        except Exception as e:
+            error_msg = f"Error during transcription: {str(e)}"
+            logger.error(error_msg)
+            yield sse_event("error", {"detail": error_msg, "status_code": error_status(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/v1/transcripts/{transcript_id}", tags=["Transcripts"])
+async def get_transcript(transcript_id: str):
+    """Get the segment count, duration and speakers of a stored transcript"""
+    try:
+        return await run_blocking(transcript_store.get, transcript_id)
+    except TranscriptNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/v1/transcripts/{transcript_id}/segments", tags=["Transcripts"])
+async def get_transcript_segments(
+    transcript_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+):
+    """Get a page of timestamped segments, optionally only those overlapping start-end (seconds)"""
+    try:
+        segments = await run_blocking(
+            transcript_store.segments, transcript_id, offset=offset, limit=limit, start=start, end=end
+        )
+    except TranscriptNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"transcript_id": transcript_id, "offset": offset, "segments": segments}
+
+
+@app.get("/v1/transcripts/{transcript_id}/text", tags=["Transcripts"])
+async def get_transcript_text(transcript_id: str, start: Optional[float] = None, end: Optional[float] = None):
+    """Get a stored transcript, or the part between start and end (seconds), as plain text"""
+    try:
+        return PlainTextResponse(await run_blocking(transcript_store.text, transcript_id, start=start, end=end))
+    except TranscriptNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 class MinutesRequest(BaseModel):
-    transcript: str
+    # either the transcript text or the id of a stored transcript
+    transcript: Optional[str] = None
+    transcript_id: Optional[str] = None
     session_id: Optional[str] = None
+    # skip the minutes cache and ask the model again
+    regenerate: bool = False
+
+
+async def load_transcript(transcript: Optional[str], stored_id: Optional[str]) -> str:
+    """The transcript text of a minutes request, read from the transcript store when given an id"""
+    if stored_id:
+        try:
+            return await run_blocking(transcript_store.text, stored_id)
+        except TranscriptNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    if not transcript:
+        raise HTTPException(status_code=400, detail="Either transcript or transcript_id is required")
+    return transcript
+
+
+async def save_minutes(minutes_dict: dict, transcript: str, stored_id: Optional[str] = None) -> str:
+    """
+    Store parsed minutes and render their DOCX off the event loop, then
+    queue them for the search index. Returns the minutes id.
+    """
+    minutes_id = await run_blocking(artifact_store.save_minutes, minutes_dict)
+    docx_bytes = await run_blocking(create_docx, minutes_dict)
+    await run_blocking(artifact_store.save_file, minutes_id, "minutes.docx", docx_bytes)
+    logger.info(f"DOCX file created for minutes {minutes_id}")
+    search_index.schedule(minutes_id, minutes_dict, transcript, stored_id)
+    return minutes_id
+
+
+async def build_minutes(transcript: str, stored_id: Optional[str] = None, regenerate: bool = False) -> dict:
+    """Generate minutes for a transcript (or reuse cached ones unless regenerate is set) and render the DOCX"""
+    minutes_content = None if regenerate else await cached_minutes(transcript)
+    cache_hit = minutes_content is not None
+    if not cache_hit:
+        minutes_content = await generate_minutes(transcript)
+    minutes_dict = parse_minutes(minutes_content)
+    minutes_id = await save_minutes(minutes_dict, transcript, stored_id)
+    # return the parsed minutes too so clients don't have to parse them again
+    return {"minutes": minutes_content, "minutes_data": minutes_dict, "minutes_id": minutes_id, "cache_hit": cache_hit}
+
+
+def with_cache_info(rate_info: Optional[dict], cache_hit: bool) -> Optional[dict]:
+    """Rate limit info of a minutes response, cached minutes didn't use any upstream capacity"""
+    if rate_info is None:
+        return None
+    return {**rate_info, "cache_hit": cache_hit}
+
     
 @app.post("/v1/generate_minutes")
 async def generate(request: MinutesRequest, req: Request):
     logger.info("Starting minutes generation")
     try:
-        if request.session_id:
-            rate_info = rate_limiter.check_status(req.client.host)
+        rate_info = await validate_session(req.client.host, request.session_id) if request.session_id else None
             
-            if not rate_info["active_cycle"] or rate_info["session_id"] != request.session_id:
-                raise HTTPException(
-                    status_code=400,
-                    detail="No active transcription cycle. Please start a new cycle."
-                )
-            
-        # generate minutes content
-        minutes_content = await generate_minutes(request.transcript)
-        
-        #parse the minutes content from string to dictionary
-        try:
-            # first try to parse it as JSON
-            minutes_dict = json.loads(minutes_content)
-        except json.JSONDecodeError:
-            # if it's not JSON, create a simple format
-            minutes_dict = {
-                "title": "Meeting Minutes",
-                "summary": minutes_content,
-                "key_points": [],
-                "action_items": [],
-                "decisions": []
-            }
-            
-        # create docx file
-        docx_path = create_docx(minutes_dict)
-        logger.info(f"DOCX file created at: {docx_path}")
-        
-        return {"minutes": minutes_content}
+        transcript = await load_transcript(request.transcript, request.transcript_id)
+        result = await build_minutes(transcript, request.transcript_id, request.regenerate)
+        return {**result, "rate_limit_info": with_cache_info(rate_info, result["cache_hit"])}
         
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = f"Error generating minutes: {str(e)}"
         logger.error(error_msg)
-        raise HTTPException(status_code=500, detail=error_msg)
\ No newline at end of file
+        raise error_response(e, error_msg)
+
+
+@app.post("/v1/generate_minutes/stream")
+async def generate_stream(request: MinutesRequest, req: Request):
+    """
+    Stream minutes generation as Server-Sent Events: raw model output as
+    "token" events, each completed section as a "section" event, then "done"
+    """
+    rate_info = await validate_session(req.client.host, request.session_id) if request.session_id else None
+    transcript = await load_transcript(request.transcript, request.transcript_id)
+    cached = None if request.regenerate else await cached_minutes(transcript)
+    
+    async def replay_cached():
+        # cached minutes go through the same events as a generation, in one token
+        yield cached
+    
+    async def events():
+        parser = IncrementalJSONParser()
+        parts = []
+        try:
+            # built once, the follow-up for missing fields reuses it instead of summarizing again
+            minutes_req = await minutes_request(transcript) if cached is None else None
+            async for delta in (replay_cached() if cached is not None else stream_minutes(transcript, minutes_req)):
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+                for kind, key, value in parser.feed(delta):
+                    yield sse_event("section", {"type": kind, "key": key, "value": value})
+            
+            minutes_content = "".join(parts)
+            if cached is None:
+                minutes_content = await finalize_minutes(minutes_content, transcript, minutes_req)
+            minutes_dict = parse_minutes(minutes_content)
+            minutes_id = await save_minutes(minutes_dict, transcript, request.transcript_id)
+            yield sse_event("done", {
+                "minutes": minutes_content,
+                "minutes_data": minutes_dict,
+                "minutes_id": minutes_id,
+                "cache_hit": cached is not None,
+                "rate_limit_info": with_cache_info(rate_info, cached is not None)
+            })
+        except Exception as e:
+            error_msg = f"Error generating minutes: {str(e)}"
+            logger.error(error_msg)
+            yield sse_event("error", {"detail": error_msg, "status_code": error_status(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/v1/minutes/{minutes_id}", tags=["Minutes"])
+async def get_minutes(minutes_id: str):
+    """Get previously generated minutes"""
+    try:
+        return await run_blocking(artifact_store.get_minutes, minutes_id)
+    except ArtifactNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/v1/minutes/{minutes_id}/{fmt}", tags=["Minutes"])
+async def export_minutes(minutes_id: str, fmt: str):
+    """Download generated minutes as docx, md, html or txt"""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    export_format = FORMATS[fmt]
+    file_name = f"minutes.{export_format.extension}"
+    
+    try:
+        content = await run_blocking(artifact_store.get_file, minutes_id, file_name)
+        if content is None:
+            # rendered on demand and kept for the next download
+            minutes_dict = await run_blocking(artifact_store.get_minutes, minutes_id)
+            content = await run_blocking(render, minutes_dict, fmt)
+            await run_blocking(artifact_store.save_file, minutes_id, file_name, content)
+    except ArtifactNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return Response(
+        content=content,
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="meeting_minutes.{export_format.extension}"'}
+    )
+
+
+class BatchExportRequest(BaseModel):
+    minutes_ids: List[str]
+    format: str = "docx"
+
+
+@app.post("/v1/minutes/export", tags=["Minutes"])
+async def export_minutes_batch(request: BatchExportRequest):
+    """Render many minutes in one call, returned as a zip archive"""
+    if request.format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {request.format}")
+    
+    try:
+        minutes_list = [
+            await run_blocking(artifact_store.get_minutes, minutes_id)
+            for minutes_id in request.minutes_ids
+        ]
+    except ArtifactNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    documents = await run_blocking(render_batch, minutes_list, request.format)
+    
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for minutes_id, content in zip(request.minutes_ids, documents):
+            zf.writestr(f"{minutes_id}.{FORMATS[request.format].extension}", content)
+    
+    return Response(
+        content=archive.getvalue(),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="meeting_minutes.zip"'}
+    )
+
+
+@app.get("/v1/search", tags=["Search"])
+async def search(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100)):
+    """Past meetings ranked by relevance to the query, each with its best matching passages"""
+    started = time.perf_counter()
+    with time_stage("search"):
+        results = await run_blocking(search_index.search, q, limit)
+    return {"query": q, "results": results, "took_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+async def transcribe_job(payload: dict, report_progress) -> dict:
+    def on_progress(done: int, total: int):
+        report_progress(done / total, f"Transcribed {done} of {total} chunks")
+    
+    transcript = await transcribe_audio(payload["file_path"], payload["file_id"], on_progress)
+    return {"transcript": transcript, "transcript_id": transcript_id(payload["file_id"])}
+
+
+async def minutes_job(payload: dict, report_progress) -> dict:
+    transcript = await load_transcript(payload.get("transcript"), payload.get("transcript_id"))
+    return await build_minutes(transcript, payload.get("transcript_id"), payload.get("regenerate", False))
+
+
+job_queue.register("transcribe", transcribe_job)
+job_queue.register("generate_minutes", minutes_job)
+
+
+@app.post("/v1/jobs/transcribe/{filename}", tags=["Jobs"])
+async def submit_transcribe_job(filename: str, request: Request, session_id: str):
+    """Queue a transcription and return its job id immediately"""
+    rate_info = await validate_session(request.client.host, session_id)
+    file_path, digest = resolve_audio(filename)
+    job = await job_queue.submit("transcribe", {"file_path": file_path, "file_id": digest})
+    return {"job_id": job["job_id"], "status": job["status"], "rate_limit_info": rate_info}
+
+
+@app.post("/v1/jobs/generate_minutes", tags=["Jobs"])
+async def submit_minutes_job(request: MinutesRequest, req: Request):
+    """Queue minutes generation and return its job id immediately"""
+    if request.session_id:
+        await validate_session(req.client.host, request.session_id)
+    if request.transcript_id:
+        # fail now rather than in the job if the transcript is gone
+        await load_transcript(None, request.transcript_id)
+        payload = {"transcript_id": request.transcript_id}
+    else:
+        payload = {"transcript": await load_transcript(request.transcript, None)}
+    if request.regenerate:
+        payload["regenerate"] = True
+    job = await job_queue.submit("generate_minutes", payload)
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+
+@app.get("/v1/jobs/{job_id}", tags=["Jobs"])
+async def get_job(job_id: str):
+    """Get the status, progress and result of a job"""
+    try:
+        job = await job_queue.get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # the payload can hold a whole transcript, clients don't need it back
+    job.pop("payload", None)
+    return job
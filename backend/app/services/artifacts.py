@@ -0,0 +1,102 @@
+# backend/app/services/artifacts.py
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Dict, Optional
+
+from config import settings
+from .storage import TEMP_DIR
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DIR = os.path.join(TEMP_DIR, "artifacts")
+MINUTES_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ArtifactNotFoundError(Exception):
+    """Raised when a minutes id is unknown or has expired"""
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated minutes and their documents.
+    Each minutes dict gets its own directory, named by the sha256 of its
+    canonical JSON, so concurrent users never share an output file.
+    """
+
+    def __init__(self, root: str = ARTIFACTS_DIR, ttl: Optional[int] = None):
+        self.root = root
+        self.ttl = ttl or settings.ARTIFACT_TTL
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, minutes_id: str) -> str:
+        if not MINUTES_ID_PATTERN.match(minutes_id):
+            raise ArtifactNotFoundError(f"Minutes not found: {minutes_id}")
+        return os.path.join(self.root, minutes_id)
+
+    @staticmethod
+    def minutes_id(minutes_data: Dict) -> str:
+        canonical = json.dumps(minutes_data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _write(self, path: str, data: bytes):
+        # write then rename so readers never see a partial file, the temp name is unique per call
+        # because threads of one worker can write the same document at once
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def save_minutes(self, minutes_data: Dict) -> str:
+        """Store a minutes dict, returns its id"""
+        minutes_id = self.minutes_id(minutes_data)
+        directory = self._dir(minutes_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "minutes.json")
+        if not os.path.exists(path):
+            self._write(path, json.dumps(minutes_data, ensure_ascii=False).encode("utf-8"))
+        return minutes_id
+
+    def get_minutes(self, minutes_id: str) -> Dict:
+        path = os.path.join(self._dir(minutes_id), "minutes.json")
+        if not os.path.exists(path):
+            raise ArtifactNotFoundError(f"Minutes not found: {minutes_id}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_file(self, minutes_id: str, name: str, data: bytes):
+        """Store a rendered document next to its minutes"""
+        self._write(os.path.join(self._dir(minutes_id), name), data)
+
+    def get_file(self, minutes_id: str, name: str) -> Optional[bytes]:
+        """Get a rendered document, or None if it hasn't been rendered"""
+        path = os.path.join(self._dir(minutes_id), name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def clean_expired(self):
+        """Remove artifacts older than the TTL"""
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    logger.info(f"Removed expired artifacts {name}")
+            except OSError:
+                pass
+
+
+artifact_store = ArtifactStore()
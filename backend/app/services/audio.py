@@ -0,0 +1,269 @@
+# backend/app/services/audio.py
+import logging
+import os
+import wave
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# energy is measured over frames of this length when looking for silences
+ENERGY_FRAME_SECONDS = 0.02
+
+# taps of the anti-aliasing filter used before downsampling
+LOWPASS_TAPS = 63
+
+# output samples interpolated per step when resampling, bounds memory use
+RESAMPLE_BLOCK = 1 << 20
+
+# frames decoded at a time when a WAV is processed block by block, bounds memory use
+READ_BLOCK_FRAMES = 1 << 20
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    path: str
+    start: float
+    end: float
+    # speech regions joined into the chunk (seconds on the source timeline), None when it is one span
+    segments: Optional[List[Tuple[float, float]]] = None
+
+
+def is_wav(file_path: str) -> bool:
+    """Check whether a file is a PCM WAV that the stdlib can read"""
+    try:
+        with wave.open(file_path, "rb") as wav:
+            return wav.getcomptype() == "NONE"
+    except (wave.Error, EOFError):
+        return False
+
+
+def wav_duration(file_path: str) -> float:
+    with wave.open(file_path, "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+def pcm_to_mono(raw: bytes, channels: int, sample_width: int) -> np.ndarray:
+    """Decode interleaved PCM bytes to mono float32 samples in [-1, 1]"""
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (data[:, 0].astype(np.int32)
+                | (data[:, 1].astype(np.int32) << 8)
+                | (data[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def read_frames(wav: wave.Wave_read, first: int, count: int) -> np.ndarray:
+    """Decode count frames from frame first of an open WAV as mono float32 samples"""
+    wav.setpos(first)
+    return pcm_to_mono(wav.readframes(count), wav.getnchannels(), wav.getsampwidth())
+
+
+def iter_wav_mono(file_path: str, block_frames: int = READ_BLOCK_FRAMES) -> Iterator[np.ndarray]:
+    """Read a PCM WAV as consecutive blocks of mono float32 samples, only one block is in memory at a time"""
+    with wave.open(file_path, "rb") as wav:
+        while True:
+            raw = wav.readframes(block_frames)
+            if not raw:
+                break
+            yield pcm_to_mono(raw, wav.getnchannels(), wav.getsampwidth())
+
+
+def wav_energy(file_path: str, frame_seconds: float = ENERGY_FRAME_SECONDS) -> Tuple[np.ndarray, int, float]:
+    """RMS energy per frame of a PCM WAV, read block by block. Returns (energy, sample_rate, duration)"""
+    with wave.open(file_path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        duration = wav.getnframes() / float(sample_rate)
+    frame_length = max(1, int(sample_rate * frame_seconds))
+    # whole frames per block, so no frame straddles two blocks
+    block_frames = max(1, READ_BLOCK_FRAMES // frame_length) * frame_length
+    energy = [frame_energy(block, sample_rate, frame_seconds) for block in iter_wav_mono(file_path, block_frames)]
+    return (np.concatenate(energy) if energy else np.zeros(0, dtype=np.float32)), sample_rate, duration
+
+
+def lowpass(samples: np.ndarray, cutoff: float, taps: int = LOWPASS_TAPS) -> np.ndarray:
+    """Windowed-sinc low-pass filter, cutoff as a fraction of the sample rate (0 to 0.5)"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode="same")
+
+
+def write_resampled(src_path: str, dest_path: str, dst_rate: int, start: float, end: float):
+    """
+    Write [start, end) seconds of a PCM WAV as a mono 16-bit WAV at dst_rate,
+    low-pass filtering first when downsampling. Works block by block, each
+    block is read with enough neighbouring samples for the filter.
+    """
+    with wave.open(src_path, "rb") as src, wave.open(dest_path, "wb") as dest:
+        src_rate = src.getframerate()
+        total = src.getnframes()
+        dest.setnchannels(1)
+        dest.setsampwidth(2)
+        dest.setframerate(dst_rate)
+
+        first = int(start * src_rate)
+        last = min(total, int(end * src_rate))
+        step = src_rate / dst_rate
+        n_out = int((last - first) / step)
+        downsample = src_rate > dst_rate
+        context = LOWPASS_TAPS // 2 + 1 if downsample else 1
+
+        for block in range(0, n_out, RESAMPLE_BLOCK):
+            # linear interpolation at src positions, relative to the first sample read
+            positions = first + np.arange(block, min(n_out, block + RESAMPLE_BLOCK)) * step
+            lo = max(0, int(positions[0]) - context)
+            hi = min(total, int(positions[-1]) + 2 + context)
+            samples = read_frames(src, lo, hi - lo)
+            if downsample:
+                samples = lowpass(samples, 0.5 * dst_rate / src_rate)
+            positions -= lo
+            left = np.minimum(positions.astype(np.int64), len(samples) - 1)
+            right = np.minimum(left + 1, len(samples) - 1)
+            frac = (positions - left).astype(np.float32)
+            out = samples[left] * (1 - frac) + samples[right] * frac
+            dest.writeframes((np.clip(out, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+
+
+def speech_bounds(
+    energy: np.ndarray,
+    duration: float,
+    threshold_db: float,
+    pad_seconds: float,
+    frame_seconds: float = ENERGY_FRAME_SECONDS,
+):
+    """
+    (start, end) in seconds of the audio between the first and last frame
+    louder than threshold_db (dBFS), padded by pad_seconds. A recording
+    that is silent throughout is kept whole.
+    """
+    loud = np.flatnonzero(energy > 10 ** (threshold_db / 20))
+    if len(loud) == 0:
+        return 0.0, duration
+    start = max(0.0, float(loud[0]) * frame_seconds - pad_seconds)
+    end = min(duration, float(loud[-1] + 1) * frame_seconds + pad_seconds)
+    return start, end
+
+
+def frame_energy(samples: np.ndarray, sample_rate: int, frame_seconds: float = ENERGY_FRAME_SECONDS) -> np.ndarray:
+    """RMS energy per fixed-length frame"""
+    frame_length = max(1, int(sample_rate * frame_seconds))
+    n_frames = len(samples) // frame_length
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[: n_frames * frame_length].reshape(n_frames, frame_length)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def find_split_points(
+    energy: np.ndarray,
+    duration: float,
+    chunk_seconds: float,
+    search_seconds: float,
+    frame_seconds: float = ENERGY_FRAME_SECONDS,
+) -> List[float]:
+    """
+    Pick chunk boundaries close to every chunk_seconds, moved to the quietest
+    frame within +/- search_seconds so cuts land in pauses rather than words.
+    """
+    points = []
+    target = chunk_seconds
+    search_frames = int(search_seconds / frame_seconds)
+    while target < duration - search_seconds:
+        center = int(target / frame_seconds)
+        lo = max(0, center - search_frames)
+        hi = min(len(energy), center + search_frames + 1)
+        if hi > lo:
+            split = (lo + int(np.argmin(energy[lo:hi]))) * frame_seconds
+        else:
+            split = target
+        points.append(split)
+        target = split + chunk_seconds
+    return points
+
+
+def write_wav_segment(src_path: str, dest_path: str, start: float, end: float):
+    """Copy [start, end) seconds of a WAV file to a new WAV with the same format"""
+    with wave.open(src_path, "rb") as src:
+        rate = src.getframerate()
+        first = int(start * rate)
+        last = min(src.getnframes(), int(end * rate))
+        src.setpos(first)
+        frames = src.readframes(last - first)
+        with wave.open(dest_path, "wb") as dest:
+            dest.setnchannels(src.getnchannels())
+            dest.setsampwidth(src.getsampwidth())
+            dest.setframerate(rate)
+            dest.writeframes(frames)
+
+
+def split_audio(
+    file_path: str,
+    out_dir: str,
+    chunk_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float,
+) -> Optional[List[AudioChunk]]:
+    """
+    Split a recording into overlapping chunks cut at low-energy points.
+    Returns None when the file can't be split (not a PCM WAV, or short
+    enough to send in one request).
+    """
+    if not is_wav(file_path):
+        return None
+
+    duration = wav_duration(file_path)
+    if duration <= chunk_seconds + search_seconds:
+        return None
+
+    energy, _, _ = wav_energy(file_path)
+    boundaries = [0.0] + find_split_points(energy, duration, chunk_seconds, search_seconds) + [duration]
+
+    os.makedirs(out_dir, exist_ok=True)
+    chunks = []
+    for index in range(len(boundaries) - 1):
+        start = max(0.0, boundaries[index] - overlap_seconds / 2)
+        end = min(duration, boundaries[index + 1] + overlap_seconds / 2)
+        chunk_path = os.path.join(out_dir, f"chunk_{index:04d}.wav")
+        write_wav_segment(file_path, chunk_path, start, end)
+        chunks.append(AudioChunk(index=index, path=chunk_path, start=start, end=end))
+
+    logger.info(f"Split {file_path} ({duration:.1f}s) into {len(chunks)} chunks")
+    return chunks
+
+
+def _normalize_word(word: str) -> str:
+    return "".join(ch for ch in word.lower() if ch.isalnum())
+
+
+def merge_overlap(previous: str, current: str, max_overlap_words: int) -> str:
+    """
+    Drop the words at the start of current that repeat the end of previous.
+    Chunks overlap in time, so the ASR usually transcribes the shared region twice.
+    """
+    prev_words = [_normalize_word(w) for w in previous.split()[-max_overlap_words:]]
+    cur_split = current.split()
+    cur_words = [_normalize_word(w) for w in cur_split[:max_overlap_words]]
+
+    for size in range(min(len(prev_words), len(cur_words)), 0, -1):
+        if prev_words[-size:] == cur_words[:size]:
+            return " ".join(cur_split[size:])
+    return current
+
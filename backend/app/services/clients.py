@@ -0,0 +1,85 @@
+# backend/app/services/clients.py
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from config import settings
+from .metrics import upstream_duration, upstream_errors, upstream_wait
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def init_client() -> AsyncOpenAI:
+    """
+    Create the shared upstream client. One pooled, keep-alive HTTP client
+    is reused by transcription and minutes generation.
+    """
+    global _client, _semaphore
+
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.API_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.API_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.API_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.API_TIMEOUT, connect=settings.API_CONNECT_TIMEOUT),
+    )
+    _client = AsyncOpenAI(
+        base_url=settings.MESOLITICA_API_URL,
+        api_key=settings.MESOLITICA_API_KEY,
+        http_client=http_client,
+        # retries, timeouts and backoff are handled by the resilience layer
+        max_retries=0,
+    )
+    _semaphore = asyncio.Semaphore(settings.API_MAX_CONCURRENCY)
+    logger.info("Initialized shared upstream API client")
+    return _client
+
+
+async def close_client():
+    """Close the shared client and its connection pool"""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _semaphore = None
+
+
+def get_client() -> AsyncOpenAI:
+    """Get the shared client, creating it on first use"""
+    if _client is None:
+        init_client()
+    return _client
+
+
+@asynccontextmanager
+async def upstream_slot(operation: str = "other", timeout: Optional[float] = None):
+    """
+    Limit the number of concurrent upstream calls and record their latency
+    and errors. Raises asyncio.TimeoutError if no slot frees up within timeout.
+    """
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.API_MAX_CONCURRENCY)
+    semaphore = _semaphore
+    queued = time.perf_counter()
+    await asyncio.wait_for(semaphore.acquire(), timeout)
+    try:
+        started = time.perf_counter()
+        upstream_wait.observe(started - queued, operation=operation)
+        try:
+            yield
+        except Exception as e:
+            upstream_errors.inc(operation=operation, error=type(e).__name__)
+            raise
+        finally:
+            upstream_duration.observe(time.perf_counter() - started, operation=operation)
+    finally:
+        semaphore.release()
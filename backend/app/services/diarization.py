@@ -0,0 +1,325 @@
+# backend/app/services/diarization.py
+"""
+CPU-only speaker diarization. Speech regions from the VAD index are cut
+into short windows, each described by MFCC statistics, and the windows are
+clustered into speakers. The resulting speaker turns are cached in
+FileCache per upload, like the speech index.
+"""
+import asyncio
+import logging
+import wave
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from .audio import read_frames
+from .file_cache import file_cache
+from .metrics import time_stage
+from .preprocess import init_pool
+from .vad import VAD_KIND, Segment
+
+logger = logging.getLogger(__name__)
+
+# turns depend on the clustering parameters and on the speech index they were computed from
+DIARIZATION_KIND = (
+    f"diarization:{settings.DIARIZATION_WINDOW_SECONDS}:{settings.DIARIZATION_HOP_SECONDS}:"
+    f"{settings.DIARIZATION_THRESHOLD}:{settings.DIARIZATION_MAX_SPEAKERS}:"
+    f"{settings.DIARIZATION_MIN_TURN_SECONDS}:{VAD_KIND}"
+)
+
+FRAME_SECONDS = 0.025
+FRAME_HOP_SECONDS = 0.01
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+# frames are analysed this many at a time, bounds the size of the FFT buffers
+FRAME_BLOCK = 1 << 14
+# windows are first grouped into this many clusters by k-means, which are then merged into speakers
+PRE_CLUSTERS = 32
+KMEANS_ITERATIONS = 20
+# same-speaker turns separated by less than this are joined (seconds)
+TURN_GAP_SECONDS = 2.0
+
+# (start, end, speaker label)
+Turn = Tuple[float, float, str]
+
+
+def _mel_filterbank(sample_rate: int, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """Triangular mel filters, shape (n_mels, n_fft // 2 + 1)"""
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    edges = to_hz(np.linspace(to_mel(0.0), to_mel(sample_rate / 2.0), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def mfcc(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """MFCCs (without c0, so loudness doesn't matter) per 10 ms frame, shape (frames, N_MFCC - 1)"""
+    frame_length = int(FRAME_SECONDS * sample_rate)
+    hop = int(FRAME_HOP_SECONDS * sample_rate)
+    n_frames = max(0, 1 + (len(samples) - frame_length) // hop)
+    if n_frames == 0:
+        return np.zeros((0, N_MFCC - 1), dtype=np.float32)
+
+    window = np.hanning(frame_length).astype(np.float32)
+    filters = _mel_filterbank(sample_rate)
+    n = np.arange(N_MELS)
+    dct = np.cos(np.pi / N_MELS * (n[None, :] + 0.5) * np.arange(1, N_MFCC)[:, None]).astype(np.float32)
+
+    features = np.empty((n_frames, N_MFCC - 1), dtype=np.float32)
+    for first in range(0, n_frames, FRAME_BLOCK):
+        count = min(FRAME_BLOCK, n_frames - first)
+        starts = (first + np.arange(count)) * hop
+        frames = samples[starts[:, None] + np.arange(frame_length)] * window
+        power = np.abs(np.fft.rfft(frames, n=N_FFT)) ** 2
+        log_mel = np.log(power @ filters.T + 1e-10)
+        features[first:first + count] = log_mel @ dct.T
+    return features
+
+
+def speech_mfcc(file_path: str, segments: List[Segment]) -> np.ndarray:
+    """
+    MFCCs per 10 ms frame of a PCM WAV, computed only over the speech
+    segments and FRAME_BLOCK frames at a time so the recording is never
+    loaded whole. Frames outside the segments are left at zero.
+    """
+    with wave.open(file_path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        total = wav.getnframes()
+        frame_length = int(FRAME_SECONDS * sample_rate)
+        hop = int(FRAME_HOP_SECONDS * sample_rate)
+        n_frames = max(0, 1 + (total - frame_length) // hop)
+        features = np.zeros((n_frames, N_MFCC - 1), dtype=np.float32)
+        for start, end in segments:
+            # one frame of margin, windows round their bounds to the nearest frame
+            first = max(0, int(start / FRAME_HOP_SECONDS) - 1)
+            last = min(n_frames, int(np.ceil(end / FRAME_HOP_SECONDS)) + 1)
+            for block in range(first, last, FRAME_BLOCK):
+                count = min(FRAME_BLOCK, last - block)
+                samples = read_frames(wav, block * hop, (count - 1) * hop + frame_length)
+                block_features = mfcc(samples, sample_rate)
+                features[block:block + len(block_features)] = block_features
+    return features
+
+
+def window_embeddings(
+    features: np.ndarray,
+    segments: List[Segment],
+    window_seconds: float,
+    hop_seconds: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and standard deviation of the features over sliding windows inside
+    each speech segment. Returns (embeddings, window centers in seconds).
+    """
+    spans = []
+    for start, end in segments:
+        if end - start <= window_seconds:
+            spans.append((start, end))
+            continue
+        for offset in np.arange(start, end - window_seconds + 1e-6, hop_seconds):
+            spans.append((offset, offset + window_seconds))
+        if spans[-1][1] < end:
+            spans.append((end - window_seconds, end))
+    if not spans:
+        return np.zeros((0, 2 * features.shape[1]), dtype=np.float32), np.zeros(0)
+
+    bounds = np.clip(np.round(np.array(spans) / FRAME_HOP_SECONDS).astype(int), 0, len(features))
+    bounds[:, 1] = np.maximum(bounds[:, 1], np.minimum(bounds[:, 0] + 1, len(features)))
+    keep = bounds[:, 1] > bounds[:, 0]
+    bounds, spans = bounds[keep], np.array(spans)[keep]
+
+    # window statistics from cumulative sums, O(1) per window
+    values = features.astype(np.float64)
+    sums = np.vstack([np.zeros(values.shape[1]), np.cumsum(values, axis=0)])
+    squares = np.vstack([np.zeros(values.shape[1]), np.cumsum(values ** 2, axis=0)])
+    counts = (bounds[:, 1] - bounds[:, 0])[:, None]
+    mean = (sums[bounds[:, 1]] - sums[bounds[:, 0]]) / counts
+    std = np.sqrt(np.maximum((squares[bounds[:, 1]] - squares[bounds[:, 0]]) / counts - mean ** 2, 0.0))
+    return np.hstack([mean, std]).astype(np.float32), spans.mean(axis=1)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-10)
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS) -> np.ndarray:
+    """Spherical k-means with k-means++ seeding, returns the cluster of each vector"""
+    rng = np.random.default_rng(0)
+    centers = [vectors[rng.integers(len(vectors))]]
+    distance = 1.0 - vectors @ centers[0]
+    for _ in range(1, k):
+        weights = np.maximum(distance, 0.0) ** 2
+        if weights.sum() <= 0:
+            break
+        centers.append(vectors[rng.choice(len(vectors), p=weights / weights.sum())])
+        distance = np.minimum(distance, 1.0 - vectors @ centers[-1])
+    centers = np.array(centers)
+
+    labels = np.zeros(len(vectors), dtype=int)
+    for _ in range(iterations):
+        labels = np.argmax(vectors @ centers.T, axis=1)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, vectors)
+        used = np.bincount(labels, minlength=len(centers)) > 0
+        centers[used] = _normalize(sums[used])
+    return labels
+
+
+def cluster_speakers(embeddings: np.ndarray, threshold: float, max_speakers: int) -> np.ndarray:
+    """
+    Speaker index of each embedding. Windows are grouped by k-means into at
+    most PRE_CLUSTERS clusters, then the two closest clusters (cosine
+    distance of their centroids) are merged until none are closer than
+    threshold and there are at most max_speakers left.
+    """
+    if len(embeddings) < 2:
+        return np.zeros(len(embeddings), dtype=int)
+
+    # not centered on the recording, so the threshold means the same for one speaker as for many
+    vectors = _normalize(embeddings.astype(np.float64))
+
+    labels = _kmeans(vectors, min(PRE_CLUSTERS, len(vectors)))
+    clusters = [np.flatnonzero(labels == label) for label in np.unique(labels)]
+    sums = np.array([vectors[members].sum(axis=0) for members in clusters])
+
+    while len(clusters) > 1:
+        centroids = _normalize(sums)
+        distance = 1.0 - centroids @ centroids.T
+        np.fill_diagonal(distance, np.inf)
+        i, j = np.unravel_index(np.argmin(distance), distance.shape)
+        if distance[i, j] > threshold and len(clusters) <= max_speakers:
+            break
+        i, j = min(i, j), max(i, j)
+        clusters[i] = np.concatenate([clusters[i], clusters[j]])
+        sums[i] += sums[j]
+        del clusters[j]
+        sums = np.delete(sums, j, axis=0)
+
+    speakers = np.zeros(len(embeddings), dtype=int)
+    for speaker, members in enumerate(clusters):
+        speakers[members] = speaker
+    return speakers
+
+
+def speaker_turns(
+    segments: List[Segment],
+    centers: np.ndarray,
+    speakers: np.ndarray,
+    min_turn: float,
+) -> List[Turn]:
+    """
+    Label the speech segments with the speaker of the nearest window,
+    absorb turns shorter than min_turn into the previous one and join
+    turns of the same speaker. Speakers are numbered by first appearance.
+    """
+    turns: List[List] = []
+    for start, end in segments:
+        inside = np.flatnonzero((centers >= start) & (centers <= end))
+        if len(inside) == 0:
+            nearest = int(np.argmin(np.abs(centers - (start + end) / 2)))
+            turns.append([start, end, int(speakers[nearest])])
+            continue
+        # change points halfway between windows of different speakers
+        cut = start
+        for a, b in zip(inside[:-1], inside[1:]):
+            if speakers[a] != speakers[b]:
+                middle = float(centers[a] + centers[b]) / 2
+                turns.append([cut, middle, int(speakers[a])])
+                cut = middle
+        turns.append([cut, end, int(speakers[inside[-1]])])
+
+    merged: List[List] = []
+    for turn in turns:
+        if merged and turn[1] - turn[0] < min_turn and turn[0] - merged[-1][1] < TURN_GAP_SECONDS:
+            turn[2] = merged[-1][2]
+        if merged and turn[2] == merged[-1][2] and turn[0] - merged[-1][1] < TURN_GAP_SECONDS:
+            merged[-1][1] = turn[1]
+        else:
+            merged.append(turn)
+
+    names = {}
+    for turn in merged:
+        names.setdefault(turn[2], f"Speaker {len(names) + 1}")
+    return [(start, end, names[speaker]) for start, end, speaker in merged]
+
+
+def diarize(file_path: str, segments: List[Segment]) -> dict:
+    """Speaker turns over the speech segments of a PCM WAV. Runs in a worker process."""
+    features = speech_mfcc(file_path, segments)
+    embeddings, centers = window_embeddings(
+        features, segments, settings.DIARIZATION_WINDOW_SECONDS, settings.DIARIZATION_HOP_SECONDS
+    )
+    if len(embeddings) == 0:
+        return {"speakers": 0, "turns": []}
+    speakers = cluster_speakers(embeddings, settings.DIARIZATION_THRESHOLD, settings.DIARIZATION_MAX_SPEAKERS)
+    turns = speaker_turns(segments, centers, speakers, settings.DIARIZATION_MIN_TURN_SECONDS)
+    return {"speakers": len({turn[2] for turn in turns}), "turns": turns}
+
+
+async def get_speaker_turns(file_path: str, digest: str, segments: List[Segment]) -> Optional[List[Turn]]:
+    """
+    Get the speaker turns of the audio at file_path (the file the speech
+    index was computed on) from the cache, computing and caching them once.
+    """
+    if not settings.DIARIZATION_ENABLED or not segments:
+        return None
+
+    loop = asyncio.get_running_loop()
+    cached = await loop.run_in_executor(None, file_cache.get_derived, digest, DIARIZATION_KIND)
+    if cached is not None:
+        return [tuple(turn) for turn in cached[1].get("turns", [])] or None
+
+    try:
+        with time_stage("diarize"):
+            result = await loop.run_in_executor(init_pool(), diarize, file_path, segments)
+    except Exception as e:
+        logger.warning(f"Speaker diarization failed for {digest}, transcript won't be labeled: {str(e)}")
+        return None
+
+    await loop.run_in_executor(None, file_cache.add_derived, digest, DIARIZATION_KIND, None, result)
+    logger.info(f"Diarized {digest}: {result['speakers']} speaker(s), {len(result['turns'])} turn(s)")
+    return [tuple(turn) for turn in result["turns"]] or None
+
+
+def label_text(text: str, segments: List[Segment], turns: List[Turn]) -> List[Tuple[float, float, Optional[str], str]]:
+    """
+    Attribute the transcript of a chunk to speakers. The ASR returns plain
+    text, so its words are shared between the speaker turns overlapping the
+    chunk's speech segments in proportion to their speech time. Returns
+    (start, end, speaker, text) pieces in order.
+    """
+    pieces: List[List] = []
+    for start, end in segments:
+        for turn_start, turn_end, speaker in turns:
+            piece_start, piece_end = max(start, turn_start), min(end, turn_end)
+            if piece_end - piece_start <= 0:
+                continue
+            if pieces and pieces[-1][2] == speaker:
+                pieces[-1][1] = piece_end
+                pieces[-1][3] += piece_end - piece_start
+            else:
+                pieces.append([piece_start, piece_end, speaker, piece_end - piece_start])
+    if not pieces:
+        return [(segments[0][0], segments[-1][1], None, text)]
+
+    words = text.split()
+    total = sum(piece[3] for piece in pieces)
+    labeled = []
+    spoken = 0.0
+    first = 0
+    for start, end, speaker, speech in pieces:
+        spoken += speech
+        last = round(len(words) * spoken / total)
+        if last > first:
+            labeled.append((start, end, speaker, " ".join(words[first:last])))
+        first = last
+    return labeled or [(pieces[0][0], pieces[-1][1], pieces[0][2], text)]
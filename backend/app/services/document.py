@@ -2,49 +2,196 @@
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from html import escape
+from io import BytesIO
+from typing import Callable, Dict, List, Optional
 import os
 
-def create_docx(minutes_data: dict) -> str:
-    doc = Document()
-    
+from config import settings
+from .metrics import time_stage
+
+# sections rendered as bullet lists, in document order
+LIST_SECTIONS = [
+    ("key_points", "Key Points"),
+    ("action_items", "Action Items"),
+    ("decisions", "Decisions"),
+]
+
+# below this many documents a batch is rendered in-process, a pool costs more to start
+MIN_BATCH_FOR_POOL = 8
+
+_template_bytes: Optional[bytes] = None
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass
+class Section:
+    heading: str
+    paragraphs: List[str] = field(default_factory=list)
+    bullets: List[str] = field(default_factory=list)
+
+
+@dataclass
+class MinutesDocument:
+    """Format-independent representation of minutes, shared by every exporter"""
+    title: str
+    sections: List[Section] = field(default_factory=list)
+
+
+def build_document(minutes_data: dict) -> MinutesDocument:
+    document = MinutesDocument(title=str(minutes_data.get('title', 'Meeting Minutes')))
+
+    if 'summary' in minutes_data:
+        document.sections.append(Section('Summary', paragraphs=[str(minutes_data['summary'])]))
+
+    for key, heading in LIST_SECTIONS:
+        if minutes_data.get(key):
+            document.sections.append(Section(heading, bullets=[str(item) for item in minutes_data[key]]))
+
+    return document
+
+
+def load_template() -> bytes:
+    """
+    Load the DOCX template once per process. DOCX_TEMPLATE_PATH can point
+    to a styled template, otherwise python-docx's default is used.
+    """
+    global _template_bytes
+    if _template_bytes is None:
+        if settings.DOCX_TEMPLATE_PATH:
+            with open(settings.DOCX_TEMPLATE_PATH, "rb") as f:
+                _template_bytes = f.read()
+        else:
+            buffer = BytesIO()
+            Document().save(buffer)
+            _template_bytes = buffer.getvalue()
+    return _template_bytes
+
+
+def render_docx(document: MinutesDocument) -> bytes:
+    doc = Document(BytesIO(load_template()))
+
     # Add title
-    title = doc.add_heading(minutes_data.get('title', 'Meeting Minutes'), 0)
+    title = doc.add_heading(document.title, 0)
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Add summary section
-    if 'summary' in minutes_data:
-        doc.add_heading('Summary', 1)
-        doc.add_paragraph(minutes_data['summary'])
-    
-    # Add key points
-    if 'key_points' in minutes_data and minutes_data['key_points']:
-        doc.add_heading('Key Points', 1)
-        for point in minutes_data['key_points']:
-            p = doc.add_paragraph()
-            p.add_run('• ').bold = True
-            p.add_run(point)
-    
-    # Add action items
-    if 'action_items' in minutes_data and minutes_data['action_items']:
-        doc.add_heading('Action Items', 1)
-        for item in minutes_data['action_items']:
-            p = doc.add_paragraph()
-            p.add_run('• ').bold = True
-            p.add_run(item)
-    
-    # Add decisions
-    if 'decisions' in minutes_data and minutes_data['decisions']:
-        doc.add_heading('Decisions', 1)
-        for decision in minutes_data['decisions']:
+
+    for section in document.sections:
+        doc.add_heading(section.heading, 1)
+        for text in section.paragraphs:
+            doc.add_paragraph(text)
+        for text in section.bullets:
             p = doc.add_paragraph()
             p.add_run('• ').bold = True
-            p.add_run(decision)
-    
-    # Ensure temp directory exists
-    PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-    TEMP_DIR = os.path.join(PROJECT_ROOT, "temp")
-    
+            p.add_run(text)
+
     # Save document
-    output_path = os.path.join(TEMP_DIR, 'minutes.docx')
-    doc.save(output_path)
-    return output_path
\ No newline at end of file
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def render_markdown(document: MinutesDocument) -> bytes:
+    lines = [f"# {document.title}", ""]
+    for section in document.sections:
+        lines += [f"## {section.heading}", ""]
+        lines += [f"{text}\n" for text in section.paragraphs]
+        lines += [f"- {text}" for text in section.bullets]
+        if section.bullets:
+            lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+def render_html(document: MinutesDocument) -> bytes:
+    parts = [
+        "<!DOCTYPE html>",
+        "<html><head><meta charset=\"utf-8\">",
+        f"<title>{escape(document.title)}</title></head><body>",
+        f"<h1>{escape(document.title)}</h1>",
+    ]
+    for section in document.sections:
+        parts.append(f"<h2>{escape(section.heading)}</h2>")
+        parts += [f"<p>{escape(text)}</p>" for text in section.paragraphs]
+        if section.bullets:
+            parts.append("<ul>")
+            parts += [f"<li>{escape(text)}</li>" for text in section.bullets]
+            parts.append("</ul>")
+    parts.append("</body></html>")
+    return "\n".join(parts).encode("utf-8")
+
+
+def render_text(document: MinutesDocument) -> bytes:
+    lines = [document.title, "=" * len(document.title), ""]
+    for section in document.sections:
+        lines += [section.heading, "-" * len(section.heading)]
+        lines += section.paragraphs
+        lines += [f"* {text}" for text in section.bullets]
+        lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+@dataclass
+class ExportFormat:
+    render: Callable[[MinutesDocument], bytes]
+    media_type: str
+    extension: str
+
+
+FORMATS: Dict[str, ExportFormat] = {
+    "docx": ExportFormat(
+        render_docx,
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "docx",
+    ),
+    "md": ExportFormat(render_markdown, "text/markdown; charset=utf-8", "md"),
+    "html": ExportFormat(render_html, "text/html; charset=utf-8", "html"),
+    "txt": ExportFormat(render_text, "text/plain; charset=utf-8", "txt"),
+}
+
+
+def render(minutes_data: dict, fmt: str = "docx") -> bytes:
+    """Render minutes in one of FORMATS"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    with time_stage(f"render_{fmt}"):
+        return FORMATS[fmt].render(build_document(minutes_data))
+
+
+def _pool_workers() -> int:
+    return settings.RENDER_WORKERS or os.cpu_count() or 1
+
+
+def init_pool() -> ProcessPoolExecutor:
+    """
+    Create the process pool used for large batches. Its processes start on
+    first use, and each one loads the template once and reuses it.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=_pool_workers(), initializer=load_template)
+    return _pool
+
+
+def close_pool():
+    """Shut down the render pool, dropping queued work"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def render_batch(minutes_list: List[dict], fmt: str = "docx") -> List[bytes]:
+    """Render many minutes at once, in the shared process pool for large batches"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    if len(minutes_list) < MIN_BATCH_FOR_POOL:
+        return [render(minutes_data, fmt) for minutes_data in minutes_list]
+
+    chunksize = max(1, len(minutes_list) // (_pool_workers() * 4))
+    return list(init_pool().map(render, minutes_list, [fmt] * len(minutes_list), chunksize=chunksize))
+
+
+def create_docx(minutes_data: dict) -> bytes:
+    """Render minutes to a DOCX document in memory"""
+    return render(minutes_data, "docx")
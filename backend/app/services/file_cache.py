@@ -1,43 +1,301 @@
-from typing import Dict
+from typing import Dict, Optional, Tuple
+import hashlib
+import json
+import logging
 import os
+import threading
 import time
 
+from config import settings
+from .metrics import record_cache, time_stage
+from .storage import TEMP_DIR, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+BLOBS_DIR = os.path.join(TEMP_DIR, "blobs")
+INDEX_PATH = os.path.join(TEMP_DIR, "file_cache.db")
+
+# uploads are staged in the blob directory under this prefix before add_file
+STAGING_PREFIX = "incoming-"
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the sha256 of a file without loading it into memory"""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
 class FileCache:
-    def __init__(self):
-        self._cache: Dict[str, Dict] = {}
-        
-    def add_file(self, filename: str, file_path: str):
-        """Add a file to the cache"""
-        self._cache[filename] = {
-            'path': file_path,
-            'timestamp': time.time()
-        }
-        
-    def get_file_path(self, filename: str) -> str:
-        """Get the path of a cached file"""
-        if filename in self._cache:
-            return self._cache[filename]['path']
-        return None
+    """
+    Content-addressed store for uploaded audio. Files are stored once per
+    sha256 digest, client filenames are kept as aliases pointing at a digest.
+    Derived files (e.g. preprocessed audio) are blobs of their own, linked
+    to their source digest by kind.
+    The index lives in SQLite so it survives restarts and is shared by all
+    workers using the same temp directory.
+    """
+
+    def __init__(
+        self,
+        blobs_dir: str = BLOBS_DIR,
+        index_path: str = INDEX_PATH,
+        max_bytes: Optional[int] = None,
+        grace: Optional[int] = None,
+    ):
+        self.blobs_dir = blobs_dir
+        self.max_bytes = max_bytes or settings.FILE_CACHE_MAX_BYTES
+        self.grace = settings.FILE_CACHE_EVICTION_GRACE if grace is None else grace
+        os.makedirs(self.blobs_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(index_path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);
+            CREATE TABLE IF NOT EXISTS aliases (
+                name TEXT PRIMARY KEY,
+                digest TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS derived (
+                source TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                meta TEXT NOT NULL,
+                PRIMARY KEY (source, kind)
+            );
+            CREATE INDEX IF NOT EXISTS derived_digest ON derived (digest);
+            """
+        )
+
+    def _resolve(self, key: str) -> Optional[str]:
+        """Map a digest or filename alias to a digest"""
+        row = self._db.execute("SELECT digest FROM blobs WHERE digest = ?", (key,)).fetchone()
+        if row:
+            return row["digest"]
+        row = self._db.execute("SELECT digest FROM aliases WHERE name = ?", (key,)).fetchone()
+        return row["digest"] if row else None
+
+    def temp_path(self, filename: str) -> str:
+        """Path where an incoming upload can be staged before add_file"""
+        return os.path.join(
+            self.blobs_dir, f"{STAGING_PREFIX}{os.getpid()}-{time.time_ns()}-{os.path.basename(filename)}"
+        )
+
+    def add_file(self, filename: str, file_path: str, digest: Optional[str] = None) -> str:
+        """
+        Add a file to the cache, moving it into the blob store.
+        If a blob with the same content already exists the new copy is dropped.
+        Returns the content digest.
+        """
+        with time_stage("file_cache_add"):
+            return self._add_file(filename, file_path, digest)
+
+    def _add_file(self, filename: str, file_path: str, digest: Optional[str] = None, alias: bool = True) -> str:
+        digest = digest or hash_file(file_path)
+        _, ext = os.path.splitext(filename)
+        blob_path = os.path.join(self.blobs_dir, f"{digest}{ext.lower()}")
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute("SELECT path FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            exists = row is not None and os.path.exists(row["path"])
+            # a hit means identical content was uploaded before
+            record_cache("file_upload", exists)
+            if exists:
+                if os.path.abspath(file_path) != os.path.abspath(row["path"]):
+                    os.remove(file_path)
+                self._db.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (now, digest))
+            else:
+                os.replace(file_path, blob_path)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO blobs (digest, path, size, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (digest, blob_path, os.path.getsize(blob_path), now, now),
+                )
+            if alias:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO aliases (name, digest) VALUES (?, ?)",
+                    (os.path.basename(filename), digest),
+                )
+            self._evict(self.max_bytes, keep=digest)
+        return digest
+
+    def claim(self, filename: str, digest: str, size: int) -> Optional[str]:
+        """
+        Register filename for an already cached blob, for clients that send
+        the content hash before uploading. Returns the blob path, or None if
+        no blob with that digest and size exists, then the file must be sent.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT path, size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            exists = row is not None and row["size"] == size and os.path.exists(row["path"])
+            record_cache("upload_handshake", exists)
+            if not exists:
+                return None
+            self._db.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+            self._db.execute(
+                "INSERT OR REPLACE INTO aliases (name, digest) VALUES (?, ?)",
+                (os.path.basename(filename), digest),
+            )
+        return row["path"]
+
+    def get_file_path(self, key: str) -> Optional[str]:
+        """Get the path of a cached file by digest or filename"""
+        with self._lock:
+            digest = self._resolve(key)
+            row = None
+            if digest:
+                self._db.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+                row = self._db.execute("SELECT path FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        record_cache("file", row is not None)
+        return row["path"] if row else None
+
+    def add_derived(self, source: str, kind: str, file_path: Optional[str], meta: Optional[Dict] = None) -> str:
+        """
+        Cache a file derived from the blob with digest source. With file_path
+        None the source itself is recorded as the result, for when processing
+        had nothing to change. Returns the derived digest.
+        """
+        if file_path is None:
+            digest = source
+        else:
+            # derived files are only looked up through their source, a staging name is no alias
+            with time_stage("file_cache_add"):
+                digest = self._add_file(os.path.basename(file_path), file_path, alias=False)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO derived (source, kind, digest, meta) VALUES (?, ?, ?, ?)",
+                (source, kind, digest, json.dumps(meta or {})),
+            )
+        return digest
+
+    def get_derived(self, source: str, kind: str) -> Optional[Tuple[str, Dict]]:
+        """Get (path, meta) of a derived file, or None if it isn't cached"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT d.digest, d.meta, b.path FROM derived d JOIN blobs b ON b.digest = d.digest "
+                "WHERE d.source = ? AND d.kind = ?",
+                (source, kind),
+            ).fetchone()
+            hit = row is not None and os.path.exists(row["path"])
+            if hit:
+                # the source and its derivative are used together, keep both warm
+                self._db.execute(
+                    "UPDATE blobs SET last_access = ? WHERE digest IN (?, ?)",
+                    (time.time(), source, row["digest"]),
+                )
+        record_cache(f"derived_{kind.split(':')[0]}", hit)
+        return (row["path"], json.loads(row["meta"])) if hit else None
+
+    def get_digest(self, key: str) -> Optional[str]:
+        """Get the content digest of a cached file by digest or filename"""
+        with self._lock:
+            return self._resolve(key)
         
-    def file_exists(self, filename: str) -> bool:
-        """Check if a file exists in cache and on disk"""
-        if filename in self._cache:
-            file_path = self._cache[filename]['path']
-            return os.path.exists(file_path)
-        return False
+    def total_bytes(self) -> int:
+        """Total size of all cached blobs"""
+        row = self._db.execute("SELECT COALESCE(SUM(size), 0) AS total FROM blobs").fetchone()
+        return row["total"]
+
+    def _remove(self, digest: str, path: str) -> Dict[str, int]:
+        """
+        Remove a blob together with the files derived from it, unless another
+        blob or an alias still uses them. Returns the size of each removed blob.
+        """
+        row = self._db.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        removed = {digest: row["size"] if row else 0}
+        derived = self._db.execute(
+            "SELECT DISTINCT digest FROM derived WHERE source = ? AND digest != ?", (digest, digest)
+        ).fetchall()
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        self._db.execute("DELETE FROM aliases WHERE digest = ?", (digest,))
+        self._db.execute("DELETE FROM derived WHERE source = ? OR digest = ?", (digest, digest))
+
+        for (child,) in derived:
+            used = self._db.execute(
+                "SELECT 1 FROM derived WHERE digest = ? UNION ALL SELECT 1 FROM aliases WHERE digest = ? LIMIT 1",
+                (child, child),
+            ).fetchone()
+            blob = self._db.execute("SELECT path FROM blobs WHERE digest = ?", (child,)).fetchone()
+            if used is None and blob is not None:
+                removed.update(self._remove(child, blob["path"]))
+        return removed
+
+    def _evict(self, max_bytes: int, keep: Optional[str] = None):
+        """
+        Remove least recently used blobs until the cache fits in max_bytes.
+        Blobs accessed within the grace period may still be read by a running
+        transcription or job, they are kept even if the cache stays too large.
+        """
+        total = self.total_bytes()
+        if total <= max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT digest, path, size FROM blobs WHERE last_access < ? ORDER BY last_access",
+            (time.time() - self.grace,),
+        ).fetchall()
+        removed: Dict[str, int] = {}
+        for row in rows:
+            if total <= max_bytes:
+                break
+            if row["digest"] == keep or row["digest"] in removed:
+                continue
+            freed = self._remove(row["digest"], row["path"])
+            removed.update(freed)
+            total -= sum(freed.values())
+            logger.info(f"Evicted cached file {row['digest']} and {len(freed) - 1} derived file(s)")
+        if total > max_bytes:
+            logger.warning(f"File cache is {total} bytes, over its budget, the rest is in use")
+
+    def evict(self, max_bytes: Optional[int] = None):
+        """Enforce the cache size budget"""
+        with self._lock:
+            self._evict(self.max_bytes if max_bytes is None else max_bytes)
         
     def clean_old_files(self, max_age: int = 24 * 60 * 60):
-        """Clean files older than max_age seconds"""
-        current_time = time.time()
-        for filename, info in list(self._cache.items()):
-            if current_time - info['timestamp'] > max_age:
-                file_path = info['path']
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                    except OSError:
-                        pass
-                del self._cache[filename]
+        """Clean files not accessed for more than max_age seconds"""
+        cutoff = time.time() - max_age
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT digest, path FROM blobs WHERE last_access < ?", (cutoff,)
+            ).fetchall()
+            for row in rows:
+                self._remove(row["digest"], row["path"])
+
+    def clean_staging(self, max_age: Optional[int] = None):
+        """Remove staged uploads not written for max_age seconds, left behind by a crashed request"""
+        cutoff = time.time() - (self.grace if max_age is None else max_age)
+        for name in os.listdir(self.blobs_dir):
+            if not name.startswith(STAGING_PREFIX):
+                continue
+            path = os.path.join(self.blobs_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    logger.info(f"Removed abandoned staging file {name}")
+            except OSError:
+                pass
+
+    def maintain(self):
+        """Expire old files, enforce the size budget and sweep abandoned staging files"""
+        self.clean_old_files(settings.FILE_CACHE_MAX_AGE)
+        self.evict()
+        self.clean_staging()
 
 # Create a global instance
-file_cache = FileCache()
\ No newline at end of file
+file_cache = FileCache()
@@ -0,0 +1,413 @@
+# backend/app/services/jobs.py
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+from .storage import TEMP_DIR, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# handler(payload, report_progress) -> JSON-serializable result
+ProgressCallback = Callable[[float, Optional[str]], None]
+JobHandler = Callable[[Dict, ProgressCallback], Awaitable[Dict]]
+
+
+class JobNotFoundError(Exception):
+    """Raised when a job id is unknown"""
+
+
+class JobBackend(ABC):
+    """Storage for job records. Implementations must make claim() atomic."""
+
+    # whether all worker processes see the same jobs, per-process jobs are maintained by every worker
+    shared = True
+
+    @abstractmethod
+    def create(self, kind: str, payload: Dict) -> Dict:
+        """Store a new queued job and return it"""
+
+    @abstractmethod
+    def claim(self, kinds: List[str]) -> Optional[Dict]:
+        """Mark the oldest queued job as running and return it"""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        """Change fields of a job, its updated time is set to now"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Dict:
+        """Get a job, raises JobNotFoundError for unknown ids"""
+
+    @abstractmethod
+    def requeue_stale(self, cutoff: float) -> int:
+        """Put running jobs last updated before cutoff back in the queue, returns how many"""
+
+    @abstractmethod
+    def purge(self, cutoff: float) -> int:
+        """Delete completed and failed jobs that finished before cutoff, returns how many"""
+
+
+def _new_job(kind: str, payload: Dict) -> Dict:
+    now = time.time()
+    return {
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": QUEUED,
+        "progress": 0.0,
+        "message": None,
+        "payload": payload,
+        "result": None,
+        "error": None,
+        "created": now,
+        "updated": now,
+    }
+
+
+class MemoryJobBackend(JobBackend):
+    """In-process job storage, jobs are lost on restart"""
+
+    shared = False
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create(self, kind: str, payload: Dict) -> Dict:
+        job = _new_job(kind, payload)
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+        return dict(job)
+
+    def claim(self, kinds: List[str]) -> Optional[Dict]:
+        with self._lock:
+            queued = [
+                job for job in self._jobs.values()
+                if job["status"] == QUEUED and job["kind"] in kinds
+            ]
+            if not queued:
+                return None
+            job = min(queued, key=lambda j: j["created"])
+            job["status"] = RUNNING
+            job["updated"] = time.time()
+            return dict(job)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id not in self._jobs:
+                raise JobNotFoundError(f"Job not found: {job_id}")
+            self._jobs[job_id].update(fields, updated=time.time())
+
+    def get(self, job_id: str) -> Dict:
+        with self._lock:
+            if job_id not in self._jobs:
+                raise JobNotFoundError(f"Job not found: {job_id}")
+            return dict(self._jobs[job_id])
+
+    def requeue_stale(self, cutoff: float) -> int:
+        with self._lock:
+            stale = [
+                job for job in self._jobs.values()
+                if job["status"] == RUNNING and job["updated"] < cutoff
+            ]
+            for job in stale:
+                job.update(status=QUEUED, progress=0.0, message=None, updated=time.time())
+        return len(stale)
+
+    def purge(self, cutoff: float) -> int:
+        with self._lock:
+            finished = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in (COMPLETED, FAILED) and job["updated"] < cutoff
+            ]
+            for job_id in finished:
+                del self._jobs[job_id]
+        return len(finished)
+
+
+class SQLiteJobBackend(JobBackend):
+    """Job storage in SQLite, shared by every worker using the same file"""
+
+    JSON_FIELDS = ("payload", "result")
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(db_path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress REAL NOT NULL,
+                message TEXT,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+            """
+        )
+
+    def _row_to_job(self, row) -> Dict:
+        job = dict(row)
+        for field in self.JSON_FIELDS:
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def create(self, kind: str, payload: Dict) -> Dict:
+        job = _new_job(kind, payload)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, kind, status, progress, message, payload, result, error, created, updated) "
+                "VALUES (:job_id, :kind, :status, :progress, :message, :payload, NULL, NULL, :created, :updated)",
+                {**job, "payload": json.dumps(payload)},
+            )
+        return job
+
+    def claim(self, kinds: List[str]) -> Optional[Dict]:
+        placeholders = ",".join("?" for _ in kinds)
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock so two workers can't claim the same job
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    f"SELECT * FROM jobs WHERE status = ? AND kind IN ({placeholders}) "
+                    "ORDER BY created LIMIT 1",
+                    (QUEUED, *kinds),
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                now = time.time()
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, updated = ? WHERE job_id = ?",
+                    (RUNNING, now, row["job_id"]),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        job = self._row_to_job(row)
+        job.update(status=RUNNING, updated=now)
+        return job
+
+    def update(self, job_id: str, **fields):
+        for field in self.JSON_FIELDS:
+            if field in fields and fields[field] is not None:
+                fields[field] = json.dumps(fields[field])
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{name} = :{name}" for name in fields)
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = :job_id",
+                {**fields, "job_id": job_id},
+            )
+        if cursor.rowcount == 0:
+            raise JobNotFoundError(f"Job not found: {job_id}")
+
+    def get(self, job_id: str) -> Dict:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(f"Job not found: {job_id}")
+        return self._row_to_job(row)
+
+    def requeue_stale(self, cutoff: float) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, progress = 0, message = NULL, updated = ? "
+                "WHERE status = ? AND updated < ?",
+                (QUEUED, time.time(), RUNNING, cutoff),
+            )
+        return cursor.rowcount
+
+    def purge(self, cutoff: float) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?",
+                (COMPLETED, FAILED, cutoff),
+            )
+        return cursor.rowcount
+
+
+class JobQueue:
+    """
+    Runs registered job handlers in a pool of asyncio workers.
+    Submitting returns immediately, status is polled through get().
+    Running jobs send heartbeats, so a job whose process died is noticed
+    by requeue_stale() and picked up again by another worker. Finished
+    jobs are deleted by purge() once they are older than JOB_TTL.
+    """
+
+    def __init__(
+        self,
+        backend: JobBackend,
+        workers: int,
+        poll_interval: float = 0.5,
+        heartbeat_interval: Optional[float] = None,
+    ):
+        self.backend = backend
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval or settings.JOB_HEARTBEAT_INTERVAL
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        # job writes run off the event loop, one at a time so a late progress update can't overwrite the final state
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-writer")
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def _write(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, partial(func, *args, **kwargs))
+
+    async def submit(self, kind: str, payload: Dict) -> Dict:
+        """Queue a job and return its record"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job = await self._write(self.backend.create, kind, payload)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"Queued {kind} job {job['job_id']}")
+        return job
+
+    async def get(self, job_id: str) -> Dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.backend.get, job_id)
+
+    def start(self):
+        """Start the worker tasks on the running event loop"""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self, drain_timeout: Optional[float] = None):
+        """
+        Stop claiming new jobs and wait up to drain_timeout seconds for the
+        running ones to finish. Jobs still running after that are cancelled
+        and put back in the queue for another worker.
+        """
+        if drain_timeout is None:
+            drain_timeout = settings.JOB_DRAIN_TIMEOUT
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=drain_timeout)
+            if pending:
+                logger.warning(f"{len(pending)} job worker(s) still busy after {drain_timeout}s, requeueing their jobs")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def requeue_stale(self, max_age: Optional[float] = None) -> int:
+        """Requeue running jobs without a heartbeat for max_age seconds"""
+        max_age = max_age or settings.JOB_STALE_SECONDS
+        count = self.backend.requeue_stale(time.time() - max_age)
+        if count:
+            logger.warning(f"Requeued {count} stale job(s)")
+        return count
+
+    def purge(self, max_age: Optional[float] = None) -> int:
+        """Delete finished jobs older than max_age seconds, their results have had time to be fetched"""
+        max_age = max_age or settings.JOB_TTL
+        count = self.backend.purge(time.time() - max_age)
+        if count:
+            logger.info(f"Purged {count} finished job(s)")
+        return count
+
+    async def _wait_for_work(self):
+        # other processes may enqueue into a shared backend, so poll as well as wait
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, index: int):
+        loop = asyncio.get_running_loop()
+        kinds = list(self._handlers)
+        while not self._stopping:
+            try:
+                job = await loop.run_in_executor(None, self.backend.claim, kinds)
+            except Exception as e:
+                logger.error(f"Job worker {index} failed to claim a job: {str(e)}")
+                job = None
+            if job is None:
+                await self._wait_for_work()
+                continue
+            await self._run(job)
+
+    async def _heartbeat(self, job_id: str):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._write(self.backend.update, job_id)
+            except Exception as e:
+                logger.error(f"Heartbeat for job {job_id} failed: {str(e)}")
+
+    async def _run(self, job: Dict):
+        job_id = job["job_id"]
+        handler = self._handlers[job["kind"]]
+
+        loop = asyncio.get_running_loop()
+
+        def progress_written(future: asyncio.Future):
+            if not future.cancelled() and future.exception() is not None:
+                logger.error(f"Progress update for job {job_id} failed: {str(future.exception())}")
+
+        def report_progress(progress: float, message: Optional[str] = None):
+            # handlers report from the event loop, so the write is queued rather than waited for
+            future = loop.run_in_executor(
+                self._writer, partial(self.backend.update, job_id, progress=progress, message=message)
+            )
+            future.add_done_callback(progress_written)
+
+        logger.info(f"Running {job['kind']} job {job_id}")
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            result = await handler(job["payload"], report_progress)
+            await self._write(self.backend.update, job_id, status=COMPLETED, progress=1.0, result=result)
+            logger.info(f"Job {job_id} completed")
+        except asyncio.CancelledError:
+            # interrupted by shutdown, not by the job itself, so let another worker run it
+            await self._write(self.backend.update, job_id, status=QUEUED, progress=0.0, message=None)
+            logger.info(f"Job {job_id} requeued")
+            raise
+        except Exception as e:
+            error_msg = str(getattr(e, "detail", e))
+            logger.error(f"Job {job_id} failed: {error_msg}")
+            await self._write(self.backend.update, job_id, status=FAILED, error=error_msg)
+        finally:
+            heartbeat.cancel()
+
+
+def create_job_backend() -> JobBackend:
+    if settings.JOB_BACKEND == "memory":
+        return MemoryJobBackend()
+    return SQLiteJobBackend(os.path.join(TEMP_DIR, "jobs.db"))
+
+
+job_queue = JobQueue(create_job_backend(), workers=settings.JOB_WORKERS)
@@ -0,0 +1,141 @@
+# backend/app/services/json_stream.py
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+# (event type, top-level key, value)
+#   "field": a top-level value is complete, e.g. ("field", "title", "Weekly sync")
+#   "item":  one element of a top-level list is complete, e.g. ("item", "key_points", "...")
+ParseEvent = Tuple[str, str, Any]
+
+# an object starts with "{" and a quoted key, "{name}" in prose does not
+OBJECT_START_RE = re.compile(r'\{\s*"')
+
+
+class IncrementalJSONParser:
+    """
+    Incrementally scans a streamed JSON object and reports each top-level
+    field, and each element of top-level lists, as soon as it is complete.
+    Text before the object (prose, code fences) is ignored. Output that isn't
+    valid JSON stops the events instead of raising, the caller repairs the
+    full text once the stream has ended.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._token_start: Optional[int] = None
+        self._object_start: Optional[int] = None
+        self.done = False
+        self.failed = False
+        self.value: Optional[dict] = None
+
+    def _fail(self):
+        """Stop reporting events, the rest of the output can't be trusted"""
+        self.done = True
+        self.failed = True
+
+    def _tracking(self) -> bool:
+        """Whether the current position is a top-level key/value or a top-level list item"""
+        depth = len(self._stack)
+        return depth == 1 or (depth == 2 and self._stack[1] == "[")
+
+    def _finish_token(self, end: int, events: List[ParseEvent], kind: str):
+        if self._token_start is None:
+            return
+        raw = self._buffer[self._token_start:end].strip()
+        self._token_start = None
+        if self._key is None:
+            self._fail()
+            return
+        try:
+            value = json.loads(raw, strict=False)
+        except json.JSONDecodeError:
+            self._fail()
+            return
+        events.append((kind, self._key, value))
+
+    def feed(self, text: str) -> List[ParseEvent]:
+        """Add streamed text and return the events it completed"""
+        self._buffer += text
+        events: List[ParseEvent] = []
+
+        while self._pos < len(self._buffer) and not self.done:
+            i = self._pos
+            ch = self._buffer[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if not self._stack:
+                if ch == "{":
+                    rest = self._buffer[i + 1:].lstrip()
+                    if not rest:
+                        # wait for the text after the brace
+                        self._pos = i
+                        break
+                    if OBJECT_START_RE.match(self._buffer, i):
+                        self._stack.append("{")
+                        self._object_start = i
+                continue
+
+            depth = len(self._stack)
+
+            if ch == ":" and depth == 1:
+                key = None
+                if self._token_start is not None:
+                    try:
+                        key = json.loads(self._buffer[self._token_start:i].strip(), strict=False)
+                    except json.JSONDecodeError:
+                        # unquoted or single-quoted key
+                        pass
+                self._token_start = None
+                if not isinstance(key, str):
+                    self._fail()
+                    break
+                self._key = key
+            elif ch == ",":
+                if depth == 1:
+                    self._finish_token(i, events, "field")
+                    # the next value needs a key of its own
+                    self._key = None
+                elif self._tracking():
+                    self._finish_token(i, events, "item")
+            elif ch in "}]":
+                if depth == 1:
+                    self._finish_token(i, events, "field")
+                    if self.failed:
+                        break
+                    self._stack.pop()
+                    self.done = True
+                    try:
+                        self.value = json.loads(self._buffer[self._object_start:i + 1], strict=False)
+                    except json.JSONDecodeError:
+                        self.value = None
+                else:
+                    if depth == 2 and self._tracking():
+                        self._finish_token(i, events, "item")
+                    self._stack.pop()
+            elif ch in "{[":
+                # a top-level list is reported item by item, not as one value
+                if self._token_start is None and self._tracking() and not (depth == 1 and ch == "["):
+                    self._token_start = i
+                self._stack.append(ch)
+            elif not ch.isspace():
+                if ch == '"':
+                    self._in_string = True
+                if self._token_start is None and self._tracking():
+                    self._token_start = i
+
+        return events
@@ -0,0 +1,242 @@
+# backend/app/services/metrics.py
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+Values are per process and nothing is shared between workers: with several
+uvicorn workers a scrape of /metrics is answered by whichever worker gets
+the request and shows only that worker. Every series carries a worker label
+(the process id) so series of different workers are never mixed up, but
+totals are only complete when the backend runs a single worker.
+"""
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+import math
+import os
+import threading
+import time
+
+# seconds, from fast local work up to long upstream calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self, const: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        """Sample lines, const labels are added to every series"""
+        raise NotImplementedError
+
+    def render(self, const: Sequence[Tuple[str, str]] = ()) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples(const))
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self, const=()):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key, const)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with block, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self, const=()):
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, (*const, ("le", _format_value(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, const)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        # read at render time, every uvicorn worker is its own process
+        const = (("worker", str(os.getpid())),)
+        return "\n".join(metric.render(const) for metric in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+http_requests_in_flight = registry.gauge(
+    "memomatic_http_requests_in_flight", "HTTP requests currently being handled"
+)
+http_request_duration = registry.histogram(
+    "memomatic_http_request_duration_seconds",
+    "Time until the response headers are sent, per route",
+    ["method", "route", "status"],
+)
+stage_duration = registry.histogram(
+    "memomatic_stage_duration_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+)
+upstream_wait = registry.histogram(
+    "memomatic_upstream_wait_seconds",
+    "Time spent waiting for a free upstream slot",
+    ["operation"],
+)
+upstream_duration = registry.histogram(
+    "memomatic_upstream_request_duration_seconds",
+    "Upstream API call latency",
+    ["operation"],
+)
+upstream_errors = registry.counter(
+    "memomatic_upstream_errors_total",
+    "Failed upstream API calls",
+    ["operation", "error"],
+)
+upstream_retries = registry.counter(
+    "memomatic_upstream_retries_total",
+    "Upstream calls retried after a transient failure",
+    ["operation"],
+)
+upstream_hedges = registry.counter(
+    "memomatic_upstream_hedges_total",
+    "Hedged second requests sent because the first was slow",
+    ["operation"],
+)
+circuit_open = registry.gauge(
+    "memomatic_circuit_open",
+    "1 while a circuit breaker is failing fast",
+    ["breaker"],
+)
+audio_seconds = registry.counter(
+    "memomatic_audio_seconds_total",
+    "Seconds of audio transcribed as speech or skipped as silence",
+    ["kind"],
+)
+cache_requests = registry.counter(
+    "memomatic_cache_requests_total",
+    "Cache lookups by result (hit or miss)",
+    ["cache", "result"],
+)
+minutes_parse = registry.counter(
+    "memomatic_minutes_parse_total",
+    "Generated minutes by how their JSON was obtained (ok, repaired, reasked, incomplete, failed)",
+    ["result"],
+)
+minutes_repairs = registry.counter(
+    "memomatic_minutes_repairs_total",
+    "Repairs needed to read the minutes JSON returned by the model",
+    ["repair"],
+)
+rate_limit_rejections = registry.counter(
+    "memomatic_rate_limit_rejections_total",
+    "Cycles refused because the daily limit was reached",
+)
+
+
+def time_stage(stage: str):
+    """Context manager recording the duration of a processing stage"""
+    return stage_duration.time(stage=stage)
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
@@ -1,5 +1,47 @@
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
 from config import settings
+from .clients import get_client, upstream_slot
+from .metrics import minutes_parse, minutes_repairs, time_stage
+from .minutes_schema import (
+    FIELDS,
+    LIST_FIELDS,
+    extract_json,
+    fallback_minutes,
+    missing_fields,
+    normalize_keys,
+    validate_minutes,
+)
+from .result_cache import ResultCache
+from .storage import TEMP_DIR
+from .resilience import (
+    UpstreamError,
+    UpstreamTimeoutError,
+    as_upstream_error,
+    chat_breaker,
+    chat_policy,
+    is_retryable,
+    resilient_call,
+)
+
+logger = logging.getLogger(__name__)
+
+MINUTES_MODEL = "mallam-small"
+TEMPERATURE = 0.3
+MAX_TOKENS = 1024
+
+minutes_cache = ResultCache(
+    os.path.join(TEMP_DIR, "minutes_cache.db"),
+    ttl=settings.MINUTES_CACHE_TTL,
+    max_bytes=settings.MINUTES_CACHE_MAX_BYTES,
+    name="minutes",
+)
 
 system_prompt = """You are MemoMatic, a highly experienced meeting minutes writer with expertise in corporate documentation.
 Your task is to transform the meeting transcript into clear, structured, and professional minutes. Return the minutes in the following JSON format:
@@ -31,25 +73,353 @@ Guidelines for each section:
 4. Action Items: Include what needs to be done and who is responsible
 5. Decisions: List all key decisions made
 
+If lines of the transcript start with a speaker label (e.g. "Speaker 1:"), the label tells who said that line.
+Use it to attribute action items to the speaker responsible (e.g. "Speaker 2 to send the budget by Friday"),
+or use the person's name instead when the transcript makes clear who the speaker is.
+
 Important: Ensure the response is in valid JSON format.
 """
 
-async def generate_minutes(transcript: str) -> dict:
-    client = OpenAI(
-        base_url=settings.MESOLITICA_API_URL,
-        api_key=settings.MESOLITICA_API_KEY,
+map_prompt = """You are MemoMatic, a meeting minutes assistant. You will receive one part of a longer meeting transcript.
+Extract the notes from this part only and return them in the following JSON format:
+
+{
+    "summary": "Short summary of this part (50-80 words)",
+    "key_points": ["Key point", "..."],
+    "action_items": ["Action item, including who is responsible", "..."],
+    "decisions": ["Decision", "..."]
+}
+
+Only include items that are stated in this part. Use empty lists when there is nothing to report.
+If lines start with a speaker label (e.g. "Speaker 1:"), use it to say who is responsible for each action item.
+Important: Ensure the response is in valid JSON format.
+"""
+
+reduce_prompt = """You are MemoMatic, a highly experienced meeting minutes writer. You will receive notes
+extracted, in order, from consecutive parts of one meeting transcript, as a JSON list.
+Merge them into a single set of minutes, removing duplicated or overlapping items.
+""" + system_prompt[system_prompt.index("Return the minutes"):]
+
+combine_prompt = """You are MemoMatic, a meeting minutes assistant. You will receive notes extracted, in order,
+from consecutive parts of a meeting transcript, as a JSON list. Merge them into one set of notes,
+removing duplicated or overlapping items, and return them in the following JSON format:
+
+{
+    "summary": "Summary of these parts (80-120 words)",
+    "key_points": ["Key point", "..."],
+    "action_items": ["Action item, including who is responsible", "..."],
+    "decisions": ["Decision", "..."]
+}
+
+Important: Ensure the response is in valid JSON format.
+"""
+
+FIELD_FORMATS = {
+    "title": '"title": "Meeting Title (derived from context)"',
+    "summary": '"summary": "Executive summary of the meeting (150-200 words)"',
+    "key_points": '"key_points": ["Key point 1", "Key point 2", "etc..."]',
+    "action_items": '"action_items": ["Action item, including who is responsible", "etc..."]',
+    "decisions": '"decisions": ["Decision 1", "Decision 2", "etc..."]',
+}
+
+
+def _json_format(fields: List[str]) -> str:
+    return "{\n    " + ",\n    ".join(FIELD_FORMATS[field] for field in fields) + "\n}"
+
+
+reask_prompt = """You are MemoMatic, a meeting minutes assistant. Minutes were written for the meeting transcript
+(or the notes from it) you will receive, but some fields are missing. Write only those fields and return them
+in the following JSON format:
+
+{format}
+
+Important: Ensure the response is in valid JSON format.
+"""
+
+reformat_prompt = """You are MemoMatic, a meeting minutes assistant. You will receive meeting minutes written as
+plain text. Rewrite them, without adding anything, in the following JSON format:
+
+{format}
+
+Use empty lists for sections the minutes don't have.
+Important: Ensure the response is in valid JSON format.
+"""
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, roughly four characters per token"""
+    return len(text) // 4 + 1
+
+
+def split_transcript(transcript: str, max_tokens: int) -> List[str]:
+    """Split a transcript into parts of at most max_tokens, on sentence boundaries where possible"""
+    sentences = re.split(r"(?<=[.!?])\s+", transcript.strip())
+    parts, current, current_tokens = [], [], 0
+    
+    for sentence in sentences:
+        tokens = estimate_tokens(sentence)
+        if tokens > max_tokens:
+            # a single very long "sentence" (ASR output often lacks punctuation), split on words
+            words = sentence.split()
+            step = max(1, len(words) * max_tokens // tokens)
+            pieces = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            pieces = [sentence]
+        
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                parts.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def _parse_notes(content: str) -> Dict:
+    """Parse notes returned by the model, keeping plain text as a summary"""
+    notes, _ = extract_json(content)
+    return notes if notes is not None else {"summary": content.strip()}
+
+
+def _dedupe_notes(notes: List[Dict]) -> List[Dict]:
+    """Drop list items repeated verbatim across parts before sending them to the model again"""
+    seen = set()
+    deduped = []
+    for part in notes:
+        part = dict(part)
+        for field in LIST_FIELDS:
+            items = []
+            for item in part.get(field) or []:
+                key = (field, " ".join(str(item).lower().split()))
+                if key not in seen:
+                    seen.add(key)
+                    items.append(item)
+            part[field] = items
+        deduped.append(part)
+    return deduped
+
+
+def _messages(prompt: str, content: str) -> List[Dict]:
+    return [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": content}
+    ]
+
+
+async def _complete(prompt: str, content: str, max_tokens: int = MAX_TOKENS) -> str:
+    client = get_client()
+    
+    async def request():
+        return await client.chat.completions.create(
+            model=MINUTES_MODEL,
+            messages=_messages(prompt, content),
+            temperature=TEMPERATURE,
+            max_tokens=max_tokens,
+        )
+    
+    response = await resilient_call(
+        request, "chat_completion", chat_policy, chat_breaker, hedge_delay=settings.UPSTREAM_HEDGE_DELAY
     )
+    return response.choices[0].message.content
+
+
+async def _stream_complete(prompt: str, content: str, max_tokens: int = MAX_TOKENS) -> AsyncIterator[str]:
+    """
+    Yield completion text deltas as the model produces them. Opening the
+    stream is retried, once text has been yielded a failure is final.
+    Each chunk must arrive within the attempt timeout and the whole stream
+    within the deadline of chat_policy.
+    """
+    client = get_client()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + chat_policy.deadline
+    try:
+        # the slot is held for the whole stream, not just while it is opened
+        async with upstream_slot("chat_completion_stream", timeout=chat_policy.deadline):
+            stream = await resilient_call(
+                lambda: client.chat.completions.create(
+                    model=MINUTES_MODEL,
+                    messages=_messages(prompt, content),
+                    temperature=TEMPERATURE,
+                    max_tokens=max_tokens,
+                    stream=True,
+                ),
+                "chat_completion_stream",
+                chat_policy,
+                chat_breaker,
+                slot=False,
+            )
+            chunks = stream.__aiter__()
+            try:
+                while True:
+                    # a stalled stream times out like a slow attempt instead of waiting for the HTTP read timeout
+                    timeout = max(0.0, min(chat_policy.attempt_timeout, deadline - loop.time()))
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except Exception as e:
+                if is_retryable(e):
+                    chat_breaker.record_failure()
+                raise as_upstream_error("chat_completion_stream", e) from e
+            finally:
+                await stream.close()
+    except asyncio.TimeoutError as e:
+        # only waiting for the slot gets here, upstream failures are already UpstreamErrors
+        raise UpstreamTimeoutError("chat_completion_stream timed out waiting for a free upstream slot") from e
+
+
+async def _map_notes(transcript: str) -> str:
+    """
+    Summarize each part of a long transcript in parallel and merge the notes
+    until they fit in one request. Returns the notes as a JSON list.
+    """
+    semaphore = asyncio.Semaphore(settings.MINUTES_MAX_PARALLEL_REQUESTS)
     
+    async def run(prompt: str, content: str) -> Dict:
+        async with semaphore:
+            return _parse_notes(await _complete(prompt, content))
+    
+    parts = split_transcript(transcript, settings.MINUTES_CHUNK_TOKENS)
+    logger.info(f"Generating minutes map-reduce style over {len(parts)} transcript parts")
+    notes = _dedupe_notes(await asyncio.gather(*(run(map_prompt, part) for part in parts)))
+    
+    # merge notes in groups until they fit in one request
+    while len(notes) > 1 and estimate_tokens(json.dumps(notes)) > settings.MINUTES_CHUNK_TOKENS:
+        group_size = max(2, settings.MINUTES_CHUNK_TOKENS * len(notes) // estimate_tokens(json.dumps(notes)))
+        groups = [notes[i:i + group_size] for i in range(0, len(notes), group_size)]
+        notes = _dedupe_notes(await asyncio.gather(
+            *(run(combine_prompt, json.dumps(group, ensure_ascii=False)) for group in groups)
+        ))
+    
+    return json.dumps(notes, ensure_ascii=False)
+
+
+async def minutes_request(transcript: str) -> Tuple[str, str]:
+    """The (system prompt, user content) of the request that produces the minutes"""
+    if estimate_tokens(transcript) > settings.MINUTES_MAP_REDUCE_THRESHOLD_TOKENS:
+        with time_stage("minutes_map"):
+            return reduce_prompt, await _map_notes(transcript)
+    return system_prompt, transcript
+
+
+def parse_minutes(minutes_content: str) -> dict:
+    """Parse minutes JSON (repairing it if needed), plain text becomes the summary"""
+    data, _ = extract_json(minutes_content)
+    return validate_minutes(data) if data is not None else fallback_minutes(minutes_content)
+
+
+def minutes_cache_key(transcript: str) -> str:
+    """Hash of everything the generated minutes depend on: model, prompts, sampling parameters and transcript"""
+    request = {
+        "model": MINUTES_MODEL,
+        "prompts": [system_prompt, map_prompt, reduce_prompt, combine_prompt, reask_prompt, reformat_prompt],
+        "temperature": TEMPERATURE,
+        "max_tokens": MAX_TOKENS,
+        "map_reduce": [settings.MINUTES_MAP_REDUCE_THRESHOLD_TOKENS, settings.MINUTES_CHUNK_TOKENS],
+        # cached minutes include the fields filled in by a re-ask
+        "reask": [settings.MINUTES_REASK_ENABLED, settings.MINUTES_REASK_MAX_TOKENS],
+        "transcript": transcript,
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+async def cached_minutes(transcript: str) -> Optional[str]:
+    """Minutes already generated for the same transcript and settings, or None"""
+    if not settings.MINUTES_CACHE_ENABLED:
+        return None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, minutes_cache.get, minutes_cache_key(transcript))
+
+
+async def _reask(prompt: str, content: str) -> Dict:
+    with time_stage("minutes_reask"):
+        answer = await _complete(prompt, content, max_tokens=settings.MINUTES_REASK_MAX_TOKENS)
+    data, _ = extract_json(answer)
+    return normalize_keys(data) if data is not None else {}
+
+
+async def finalize_minutes(
+    minutes_content: str,
+    transcript: str,
+    request: Optional[Tuple[str, str]] = None,
+) -> str:
+    """
+    Turn a model answer into validated minutes JSON. The JSON object is
+    located and repaired, and fields that are still missing are asked for in
+    a short follow-up request (request is the prompt and content that
+    produced the answer) instead of generating everything again.
+    The minutes are cached and returned as JSON.
+    """
+    data, repairs = extract_json(minutes_content)
+    for repair in repairs:
+        minutes_repairs.inc(repair=repair)
+    outcome = "repaired" if repairs else "ok"
+    data = normalize_keys(data) if data is not None else None
+    missing = missing_fields(data) if data is not None else list(FIELDS)
+
+    if missing and settings.MINUTES_REASK_ENABLED:
+        try:
+            if data is None:
+                # no JSON at all, have the model reformat its own answer rather than read the transcript again
+                extra = await _reask(reformat_prompt.replace("{format}", _json_format(list(FIELDS))), minutes_content)
+            else:
+                prompt, content = request or await minutes_request(transcript)
+                extra = await _reask(reask_prompt.replace("{format}", _json_format(missing)), content)
+            if extra:
+                data = {**(data or {}), **{field: extra[field] for field in missing if field in extra}}
+                outcome = "reasked"
+        except Exception as e:
+            logger.warning(f"Asking again for missing minutes fields failed: {str(e)}")
+
+    if data is None:
+        outcome = "failed"
+        minutes = fallback_minutes(minutes_content)
+    else:
+        if missing_fields(data) and outcome != "reasked":
+            outcome = "incomplete"
+        minutes = validate_minutes(data)
+    minutes_parse.inc(result=outcome)
+    if outcome != "ok":
+        logger.info(f"Minutes JSON {outcome}, repairs: {repairs}, missing fields: {missing}")
+
+    minutes_content = json.dumps(minutes, ensure_ascii=False)
+    if settings.MINUTES_CACHE_ENABLED and outcome != "failed":
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, minutes_cache.set, minutes_cache_key(transcript), minutes_content)
+    return minutes_content
+
+
+async def generate_minutes(transcript: str) -> str:
+    """Generate minutes for a transcript, returned as validated JSON and cached for cached_minutes()"""
     try:
-        response = client.chat.completions.create(
-            model="mallam-small",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": transcript}
-            ],
-            temperature=0.3,
-            max_tokens=1024,
-        )
-        return response.choices[0].message.content
+        with time_stage("minutes_generate"):
+            prompt, content = await minutes_request(transcript)
+            minutes_content = await _complete(prompt, content)
+    except UpstreamError:
+        raise
+    except Exception as e:
+        raise Exception(f"Minutes generation error: {str(e)}")
+    return await finalize_minutes(minutes_content, transcript, (prompt, content))
+
+
+async def stream_minutes(transcript: str, request: Optional[Tuple[str, str]] = None) -> AsyncIterator[str]:
+    """
+    Generate minutes, yielding the model output as it streams in. request is
+    the prompt and content from minutes_request(), built here if not given.
+    Pass the complete output and the same request to finalize_minutes() for
+    the validated minutes.
+    """
+    try:
+        prompt, content = request or await minutes_request(transcript)
+        async for delta in _stream_complete(prompt, content):
+            yield delta
+    except UpstreamError:
+        raise
     except Exception as e:
-        raise Exception(f"Minutes generation error: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Minutes generation error: {str(e)}")
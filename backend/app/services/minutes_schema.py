@@ -0,0 +1,186 @@
+# backend/app/services/minutes_schema.py
+import ast
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+TEXT_FIELDS = ("title", "summary")
+LIST_FIELDS = ("key_points", "action_items", "decisions")
+FIELDS = TEXT_FIELDS + LIST_FIELDS
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+CAMEL_RE = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+
+def _text(value: Any) -> str:
+    """Flatten a value the model put where text was expected"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return " ".join(text for text in (_text(item) for item in value) if text)
+    if isinstance(value, dict):
+        # e.g. {"task": "Send the budget", "owner": "Aisyah"} -> "Send the budget - Aisyah"
+        return " - ".join(text for text in (_text(item) for item in value.values()) if text)
+    return str(value)
+
+
+class Minutes(BaseModel):
+    """Minutes as returned to clients, values the model got slightly wrong are coerced"""
+    model_config = ConfigDict(extra="ignore")
+
+    title: str = "Meeting Minutes"
+    summary: str = ""
+    key_points: List[str] = []
+    action_items: List[str] = []
+    decisions: List[str] = []
+
+    @field_validator(*TEXT_FIELDS, mode="before")
+    @classmethod
+    def _coerce_text(cls, value: Any) -> str:
+        return _text(value)
+
+    @field_validator(*LIST_FIELDS, mode="before")
+    @classmethod
+    def _coerce_list(cls, value: Any) -> List[str]:
+        if value is None:
+            return []
+        if isinstance(value, str):
+            # a single string, possibly one item per line
+            value = [line.lstrip("-*• ").strip() for line in value.splitlines()]
+        elif not isinstance(value, list):
+            value = [value]
+        return [text for text in (_text(item) for item in value) if text]
+
+
+def _normalize_key(key: str) -> str:
+    """Normalize key spelling: "Key Points", "keyPoints" and "key-points" all become key_points"""
+    return re.sub(r"[\s\-]+", "_", CAMEL_RE.sub("_", str(key)).strip()).lower()
+
+
+def normalize_keys(data: Dict) -> Dict:
+    """Unwrap {"minutes": {...}} and normalize key spelling"""
+    if len(data) == 1:
+        (inner,) = data.values()
+        if isinstance(inner, dict) and any(_normalize_key(key) in FIELDS for key in inner):
+            data = inner
+    return {_normalize_key(key): value for key, value in data.items()}
+
+
+def _scan(text: str, start: int) -> Tuple[int, List[str], bool]:
+    """
+    Find the end of the JSON object starting at text[start]. Returns the end
+    index, the brackets still open (empty when the object is complete) and
+    whether the text ended inside a string.
+    """
+    stack: List[str] = []
+    in_string = escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return i + 1, [], False
+    return len(text), stack, in_string
+
+
+def _close(text: str, stack: List[str], in_string: bool) -> str:
+    """Complete a truncated object: close the open string, drop a dangling key and close the brackets"""
+    if in_string:
+        text += '"'
+    text = re.sub(r"[\s,:]+$", "", text)
+    if stack[-1] == "{":
+        # a string right after "{" or "," is a key whose value never came
+        text = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"$', r"\1", text).rstrip(",")
+    return text + "".join("}" if bracket == "{" else "]" for bracket in reversed(stack))
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        # strict=False accepts raw newlines and tabs inside strings
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return None
+
+
+def _parse_object(text: str, start: int) -> Tuple[Optional[Any], int, List[str]]:
+    """Parse the object starting at text[start], repairing it if needed. Returns it, where it ends and the repairs"""
+    end, stack, in_string = _scan(text, start)
+    text = text[start:end]
+    repairs = []
+    if stack:
+        text = _close(text, stack, in_string)
+        repairs.append("truncated")
+
+    value = _loads(text)
+    if value is None and TRAILING_COMMA_RE.search(text):
+        text = TRAILING_COMMA_RE.sub(r"\1", text)
+        repairs.append("trailing_comma")
+        value = _loads(text)
+    if value is None:
+        # single quotes, True/None: the model answered with a Python dict
+        try:
+            value = ast.literal_eval(text)
+            repairs.append("python_literal")
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            value = None
+    return value, end, repairs
+
+
+def extract_json(content: str) -> Tuple[Optional[Dict], List[str]]:
+    """
+    Locate and repair the JSON object in a model answer. Returns the object
+    (or None) and the repairs that were needed: "fence", "extracted",
+    "trailing_comma", "truncated", "python_literal".
+    """
+    value = _loads(content)
+    if isinstance(value, dict):
+        return value, []
+
+    candidates = [(block, ["fence"]) for block in FENCE_RE.findall(content) if "{" in block]
+    candidates.append((content, []))
+    for candidate, fence in candidates:
+        # the first "{" can be prose ("{name}"), so try each one until an object parses
+        start = candidate.find("{")
+        while start >= 0:
+            value, end, repairs = _parse_object(candidate, start)
+            if isinstance(value, dict):
+                if not fence and (candidate[:start].strip() or candidate[end:].strip()):
+                    repairs.insert(0, "extracted")
+                return value, fence + repairs
+            start = candidate.find("{", start + 1)
+    return None, []
+
+
+def missing_fields(data: Dict) -> List[str]:
+    """Fields absent from parsed minutes, a title or summary that is empty counts as absent"""
+    data = normalize_keys(data)
+    missing = [field for field in LIST_FIELDS if field not in data]
+    missing[:0] = [field for field in TEXT_FIELDS if not _text(data.get(field))]
+    return missing
+
+
+def validate_minutes(data: Dict) -> Dict:
+    """Minutes dict with every field present and of the right type"""
+    return Minutes.model_validate(normalize_keys(data)).model_dump()
+
+
+def fallback_minutes(content: str) -> Dict:
+    """Minutes for an answer without any JSON, the whole answer becomes the summary"""
+    return Minutes(summary=content).model_dump()
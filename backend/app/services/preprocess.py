@@ -0,0 +1,201 @@
+# backend/app/services/preprocess.py
+"""
+Shrinks uploads before they are sent to the ASR: downmix to mono, resample,
+trim leading/trailing silence and optionally encode with a compact codec.
+The preprocessed WAV is cached in FileCache as a derivative of the upload.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import uuid
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from config import settings
+from .audio import is_wav, speech_bounds, wav_energy, write_resampled
+from .file_cache import file_cache
+from .metrics import time_stage
+
+logger = logging.getLogger(__name__)
+
+# derived entries are keyed by the parameters that produced them
+PREPROCESS_KIND = (
+    f"preprocessed:{settings.PREPROCESS_SAMPLE_RATE}:"
+    f"{settings.PREPROCESS_SILENCE_DB}:{settings.PREPROCESS_TRIM_PAD_SECONDS}"
+)
+
+# codec -> (file extension, ffmpeg output arguments)
+CODECS: Dict[str, Tuple[str, list]] = {
+    "flac": ("flac", ["-c:a", "flac", "-f", "flac"]),
+    "opus": ("ogg", ["-c:a", "libopus", "-b:a", "24k", "-f", "ogg"]),
+    "mp3": ("mp3", ["-c:a", "libmp3lame", "-b:a", "48k", "-f", "mp3"]),
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+@dataclass
+class PreparedAudio:
+    path: str
+    # seconds trimmed from the start, add to timestamps to map back to the upload
+    offset: float = 0.0
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def _decode(src_path: str, dest_path: str, sample_rate: int):
+    """Decode any format ffmpeg understands to a mono PCM WAV"""
+    subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", src_path,
+         "-ac", "1", "-ar", str(sample_rate), "-c:a", "pcm_s16le", dest_path],
+        check=True,
+    )
+
+
+def preprocess_file(
+    src_path: str,
+    dest_path: str,
+    sample_rate: int,
+    silence_db: float,
+    pad_seconds: float,
+) -> Optional[Dict]:
+    """
+    Write a mono, resampled, trimmed 16-bit WAV of src_path to dest_path.
+    Returns the meta to cache ({"offset", "duration"}), or None when the
+    source can be used as is. Runs in a worker process.
+    """
+    decoded_path = None
+    if not is_wav(src_path):
+        if not ffmpeg_available():
+            return None
+        decoded_path = f"{dest_path}.decoded.wav"
+        _decode(src_path, decoded_path, sample_rate)
+
+    source_path = decoded_path or src_path
+    try:
+        with wave.open(source_path, "rb") as wav:
+            mono_16bit = wav.getnchannels() == 1 and wav.getsampwidth() == 2
+        # the recording is read block by block, first for the energy curve and then to write the trimmed audio
+        energy, rate, duration = wav_energy(source_path)
+        start, end = speech_bounds(energy, duration, silence_db, pad_seconds)
+
+        if decoded_path is None and mono_16bit and rate == sample_rate and (start, end) == (0.0, duration):
+            return None
+
+        write_resampled(source_path, dest_path, sample_rate, start, end)
+    finally:
+        if decoded_path and os.path.exists(decoded_path):
+            os.remove(decoded_path)
+    return {"offset": start, "duration": end - start}
+
+
+def init_pool() -> ProcessPoolExecutor:
+    """Create the worker pool used for preprocessing"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PREPROCESS_WORKERS)
+    return _pool
+
+
+def close_pool():
+    """Shut down the worker pool, dropping queued work"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+async def _preprocess(file_path: str, digest: str) -> PreparedAudio:
+    loop = asyncio.get_running_loop()
+    dest_path = file_cache.temp_path(f"{digest}-{uuid.uuid4().hex}.wav")
+    try:
+        with time_stage("preprocess"):
+            meta = await loop.run_in_executor(
+                init_pool(),
+                preprocess_file,
+                file_path,
+                dest_path,
+                settings.PREPROCESS_SAMPLE_RATE,
+                settings.PREPROCESS_SILENCE_DB,
+                settings.PREPROCESS_TRIM_PAD_SECONDS,
+            )
+        if meta is None:
+            await loop.run_in_executor(None, file_cache.add_derived, digest, PREPROCESS_KIND, None)
+            return PreparedAudio(file_path)
+
+        before = os.path.getsize(file_path)
+        after = os.path.getsize(dest_path)
+        derived = await loop.run_in_executor(
+            None, file_cache.add_derived, digest, PREPROCESS_KIND, dest_path, meta
+        )
+        logger.info(
+            f"Preprocessed {digest}: {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB, "
+            f"trimmed {meta['offset']:.1f}s from the start"
+        )
+        path = await loop.run_in_executor(None, file_cache.get_file_path, derived)
+        return PreparedAudio(path, meta["offset"])
+    except Exception as e:
+        # preprocessing only saves bandwidth, the original still works
+        logger.warning(f"Preprocessing {digest} failed, using the original: {str(e)}")
+        return PreparedAudio(file_path)
+    finally:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+
+
+async def prepare_audio(file_path: str, digest: str) -> PreparedAudio:
+    """
+    Get the preprocessed version of an upload, from the cache or by running
+    preprocessing once (concurrent callers for the same digest share a run).
+    """
+    if not settings.PREPROCESS_AUDIO:
+        return PreparedAudio(file_path)
+
+    loop = asyncio.get_running_loop()
+    cached = await loop.run_in_executor(None, file_cache.get_derived, digest, PREPROCESS_KIND)
+    if cached is not None:
+        path, meta = cached
+        return PreparedAudio(path, meta.get("offset", 0.0))
+
+    task = _in_flight.get(digest)
+    if task is None:
+        task = asyncio.ensure_future(_preprocess(file_path, digest))
+        _in_flight[digest] = task
+        task.add_done_callback(lambda _: _in_flight.pop(digest, None))
+    # a cancelled caller must not cancel the run other callers are waiting on
+    return await asyncio.shield(task)
+
+
+@lru_cache(maxsize=None)
+def upload_codec() -> Optional[str]:
+    """The configured PREPROCESS_CODEC if it can be used, None to send WAV"""
+    codec = settings.PREPROCESS_CODEC
+    if not codec:
+        return None
+    if codec not in CODECS:
+        logger.warning(f"Unknown PREPROCESS_CODEC {codec}, sending WAV")
+        return None
+    if not ffmpeg_available():
+        logger.warning(f"ffmpeg not found, PREPROCESS_CODEC {codec} is ignored")
+        return None
+    return codec
+
+
+def encode_audio(file_path: str, codec: str) -> Tuple[bytes, str]:
+    """Encode audio for upload to the ASR, returns (bytes, file name)"""
+    extension, args = CODECS[codec]
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", file_path, *args, "pipe:1"],
+        check=True,
+        capture_output=True,
+    )
+    name = f"{os.path.splitext(os.path.basename(file_path))[0]}.{extension}"
+    return result.stdout, name
@@ -1,106 +1,226 @@
-from datetime import datetime
+from abc import ABC, abstractmethod
+from collections import deque
+import os
+import threading
 import time
-from typing import Dict, Tuple
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import settings
+from .metrics import rate_limit_rejections
+from .storage import TEMP_DIR, connect_sqlite
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage for per-IP usage and active sessions.
+    Every method is a single atomic operation so limits hold under concurrency.
+    """
+
+    # whether all worker processes see the same state, per-process state is pruned by every worker
+    shared = True
+
+    @abstractmethod
+    def acquire(self, ip: str, now: float, limit: int, window: int) -> Tuple[bool, List[float], Optional[str]]:
+        """
+        Record a new cycle for ip if it has fewer than limit cycles in the window.
+        Returns (is_allowed, usage timestamps oldest first, new session id).
+        """
+
+    @abstractmethod
+    def status(self, ip: str, now: float, window: int, session_ttl: int) -> Tuple[List[float], Optional[str]]:
+        """Returns (usage timestamps oldest first, active session id)"""
+
+    @abstractmethod
+    def prune(self, now: float, window: int, session_ttl: int):
+        """Drop usage outside the window and expired sessions"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per-process state, an IP -> timestamps log bounded by the limit and an IP -> session index"""
+
+    shared = False
 
-class RateLimiter:
     def __init__(self):
-        # store ip and usage timestamps
-        self._usage: Dict[str, list] = {}
-        
+        self._usage: Dict[str, Deque[float]] = {}
+        self._sessions: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _usage_for(self, ip: str, now: float, window: int) -> Deque[float]:
+        usage = self._usage.get(ip)
+        if usage is None:
+            return deque()
+        while usage and now - usage[0] >= window:
+            usage.popleft()
+        if not usage:
+            del self._usage[ip]
+        return usage
+
+    def acquire(self, ip, now, limit, window):
+        with self._lock:
+            usage = self._usage_for(ip, now, window)
+            if len(usage) >= limit:
+                return False, list(usage), None
+            # only the last `limit` timestamps matter for a sliding window of `limit` cycles
+            usage = self._usage.setdefault(ip, deque(maxlen=limit))
+            usage.append(now)
+            session_id = f"{ip}_{now}"
+            self._sessions[ip] = (session_id, now)
+            return True, list(usage), session_id
+
+    def status(self, ip, now, window, session_ttl):
+        with self._lock:
+            usage = list(self._usage_for(ip, now, window))
+            session = self._sessions.get(ip)
+            if session and now - session[1] >= session_ttl:
+                del self._sessions[ip]
+                session = None
+            return usage, session[0] if session else None
+
+    def prune(self, now, window, session_ttl):
+        with self._lock:
+            for ip in list(self._usage):
+                self._usage_for(ip, now, window)
+            for ip, (_, started) in list(self._sessions.items()):
+                if now - started >= session_ttl:
+                    del self._sessions[ip]
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """State in SQLite, so every uvicorn worker sees the same limits"""
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(db_path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS usage (
+                ip TEXT NOT NULL,
+                timestamp REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS usage_ip_timestamp ON usage (ip, timestamp);
+            CREATE TABLE IF NOT EXISTS sessions (
+                ip TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                started REAL NOT NULL
+            );
+            """
+        )
+
+    def _usage_for(self, ip: str, now: float, window: int) -> List[float]:
+        rows = self._db.execute(
+            "SELECT timestamp FROM usage WHERE ip = ? AND timestamp > ? ORDER BY timestamp",
+            (ip, now - window),
+        ).fetchall()
+        return [row["timestamp"] for row in rows]
+
+    def acquire(self, ip, now, limit, window):
+        with self._lock:
+            # BEGIN IMMEDIATE serializes check-and-increment across workers
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("DELETE FROM usage WHERE ip = ? AND timestamp <= ?", (ip, now - window))
+                usage = self._usage_for(ip, now, window)
+                if len(usage) >= limit:
+                    self._db.execute("COMMIT")
+                    return False, usage, None
+                session_id = f"{ip}_{now}"
+                self._db.execute("INSERT INTO usage (ip, timestamp) VALUES (?, ?)", (ip, now))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (ip, session_id, started) VALUES (?, ?, ?)",
+                    (ip, session_id, now),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return True, usage + [now], session_id
+
+    def status(self, ip, now, window, session_ttl):
+        with self._lock:
+            usage = self._usage_for(ip, now, window)
+            row = self._db.execute(
+                "SELECT session_id FROM sessions WHERE ip = ? AND started > ?",
+                (ip, now - session_ttl),
+            ).fetchone()
+        return usage, row["session_id"] if row else None
+
+    def prune(self, now, window, session_ttl):
+        with self._lock:
+            self._db.execute("DELETE FROM usage WHERE timestamp <= ?", (now - window,))
+            self._db.execute("DELETE FROM sessions WHERE started <= ?", (now - session_ttl,))
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+
         # max num of complete cycles per day
-        self.max_daily_cycles = 3
-        
+        self.max_daily_cycles = settings.RATE_LIMIT_MAX_DAILY_CYCLES
+
         # time windows in seconds (24 hours)
-        self.time_window = 24 * 60 * 60
-        
-        # store active sessions to track completion
-        self._active_sessions: Dict[str, Dict] = {}
-        
-    def _clean_old_requests(self, ip: str):
-        """Remove requests older than 24 hours"""
-        if ip in self._usage:
-            current_time = time.time()
-            self._usage[ip] = [
-                timestamp for timestamp in self._usage[ip]
-                if current_time - timestamp < self.time_window
-            ]
-            
+        self.time_window = settings.RATE_LIMIT_WINDOW
+
+        # sessions expire after this many seconds
+        self.session_ttl = settings.RATE_LIMIT_SESSION_TTL
+
+    def _time_remaining(self, usage: List[float], current_time: float) -> int:
+        """Seconds until the oldest cycle leaves the window, once the limit is reached"""
+        if len(usage) >= self.max_daily_cycles:
+            return int(usage[0] + self.time_window - current_time)
+        return int(self.time_window)
+
     def start_cycle(self, ip: str) -> Tuple[bool, Dict]:
         """
         Start a new cycle if user hasn't exceeded their limit
         Returns: (is_allowed: bool, rate_limit_info: Dict)
         """
-        self._clean_old_requests(ip)
-        
         current_time = time.time()
-        
-        #initialize usage data for new IPs
-        if ip not in self._usage:
-            self._usage[ip] = []
-            
-        # get current usage count
-        current_usage = len(self._usage[ip])
-        
+        is_allowed, usage, session_id = self.backend.acquire(
+            ip, current_time, self.max_daily_cycles, self.time_window
+        )
+
         # check if limit is exceeded
-        if current_usage >= self.max_daily_cycles:
-            oldest_request = self._usage[ip][0]
-            reset_time = oldest_request + self.time_window
-            time_remaining = reset_time - current_time
-            
+        if not is_allowed:
+            rate_limit_rejections.inc()
             return False, {
                 "cycles_remaining": 0,
-                "time_remaining_seconds": int(time_remaining),
+                "time_remaining_seconds": self._time_remaining(usage, current_time),
                 "total_daily_limit": self.max_daily_cycles,
                 "active_cycle": False
             }
-            
-        # add new request timestamp
-        self._usage[ip].append(current_time)
-        
-        # create active session
-        session_id = f"{ip}_{current_time}"
-        self._active_sessions[session_id] = {
-            "ip": ip,
-            "timestamp": current_time,
-            "status": "active"
-        }
-        
+
         return True, {
-            "cycles_remaining": self.max_daily_cycles - len(self._usage[ip]),
+            "cycles_remaining": self.max_daily_cycles - len(usage),
             "time_remaining_seconds": int(self.time_window),
             "total_daily_limit": self.max_daily_cycles,
             "active_cycle": True,
             "session_id": session_id
         }
-        
+
     def check_status(self, ip: str) -> Dict:
         """Check current rate limit status without starting a new cycle"""
-        self._clean_old_requests(ip)
-        
         current_time = time.time()
-        current_usage = len(self._usage.get(ip, []))
-        
-        # find if there's an active session
-        active_session = None
-        for session_id, session in self._active_sessions.items():
-            if session["ip"] == ip and session["status"] == "active":
-                active_session = session_id
-                break
-        
-        if current_usage > self.max_daily_cycles:
-            oldest_request = self._usage[ip][0]
-            reset_time = oldest_request + self.time_window
-            time_remaining = reset_time - current_time
-        else:
-            time_remaining = self.time_window
-            
+        usage, session_id = self.backend.status(
+            ip, current_time, self.time_window, self.session_ttl
+        )
+
         return {
-            "cycles_remaining": max(0, self.max_daily_cycles - current_usage),
-            "time_remaining_seconds": int(time_remaining),
+            "cycles_remaining": max(0, self.max_daily_cycles - len(usage)),
+            "time_remaining_seconds": self._time_remaining(usage, current_time),
             "total_daily_limit": self.max_daily_cycles,
-            "active_cycle": active_session is not None,
-            "session_id": active_session
+            "active_cycle": session_id is not None,
+            "session_id": session_id
         }
-        
 
-rate_limiter = RateLimiter()
\ No newline at end of file
+    def prune(self):
+        """Drop expired usage and sessions"""
+        self.backend.prune(time.time(), self.time_window, self.session_ttl)
+
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend()
+    return SQLiteRateLimitBackend(os.path.join(TEMP_DIR, "rate_limit.db"))
+
+
+rate_limiter = RateLimiter(create_rate_limit_backend())
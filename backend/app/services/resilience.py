@@ -0,0 +1,245 @@
+# backend/app/services/resilience.py
+"""
+Retries, deadlines, circuit breaking and hedging for upstream model calls,
+shared by transcription and minutes generation.
+"""
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import httpx
+import openai
+
+from config import settings
+from .clients import upstream_slot
+from .metrics import circuit_open, upstream_hedges, upstream_retries
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# statuses worth retrying, everything else in 4xx means the request itself is wrong
+RETRYABLE_STATUS = {408, 409, 425, 429}
+
+
+class UpstreamError(Exception):
+    """An upstream model call failed"""
+
+
+class UpstreamTimeoutError(UpstreamError):
+    """An upstream model call ran out of time"""
+
+
+class UpstreamUnavailableError(UpstreamError):
+    """The upstream is failing and calls are refused until it recovers"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_timeout(error: Exception) -> bool:
+    return isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, httpx.TimeoutException))
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, throttling and server errors are transient"""
+    if is_timeout(error) or isinstance(error, (openai.APIConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def as_upstream_error(operation: str, error: Exception) -> UpstreamError:
+    if isinstance(error, UpstreamError):
+        return error
+    if is_timeout(error):
+        return UpstreamTimeoutError(f"{operation} timed out")
+    return UpstreamError(f"{operation} failed: {str(error)}")
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures and fails
+    fast for reset_timeout seconds, then lets one trial call through
+    (half-open) and closes again once a call succeeds.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        """Seconds until calls are let through again, 0 when closed"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            # half-open, one trial at a time, a trial that never reports back is replaced
+            if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started = None
+        circuit_open.set(0, breaker=self.name)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is None and self._failures < self.failure_threshold:
+                return
+            if self._opened_at is None:
+                logger.warning(f"Circuit {self.name} opened after {self._failures} failures")
+            self._opened_at = time.monotonic()
+            self._trial_started = None
+        circuit_open.set(1, breaker=self.name)
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int
+    # timeout of each attempt, and of all attempts and backoff together (seconds)
+    attempt_timeout: float
+    deadline: float
+    backoff_base: float = settings.UPSTREAM_BACKOFF_BASE
+    backoff_max: float = settings.UPSTREAM_BACKOFF_MAX
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+async def _hedged(call: Callable[[], Awaitable[T]], operation: str, delay: float) -> T:
+    """
+    Start call, and if it hasn't finished after delay seconds start a second
+    identical one. The first successful result wins, the other is cancelled.
+    """
+    first = asyncio.ensure_future(call())
+    if not delay:
+        return await first
+
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return first.result()
+
+        upstream_hedges.inc(operation=operation)
+        tasks.add(asyncio.ensure_future(call()))
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def resilient_call(
+    call: Callable[[], Awaitable[T]],
+    operation: str,
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    hedge_delay: float = 0.0,
+    slot: bool = True,
+) -> T:
+    """
+    Run an upstream call with a per-attempt timeout, retrying transient
+    failures with backoff until the policy's deadline. Always raises an
+    UpstreamError subclass on failure.
+
+    Each attempt holds an upstream slot (a hedged request shares it), pass
+    slot=False when the caller already holds one. The attempt timeout starts
+    once the slot is held, waiting for one only counts against the deadline
+    and is never reported to the breaker.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.deadline
+
+    for attempt in range(policy.max_retries + 1):
+        if not breaker.allow():
+            raise UpstreamUnavailableError(
+                f"{operation} is temporarily unavailable, please try again later",
+                retry_after=breaker.retry_after(),
+            )
+
+        started = False
+        held = upstream_slot(operation, timeout=max(0.0, deadline - loop.time())) if slot else nullcontext()
+        try:
+            async with held:
+                timeout = min(policy.attempt_timeout, deadline - loop.time())
+                if timeout <= 0:
+                    raise asyncio.TimeoutError()
+                started = True
+                result = await asyncio.wait_for(_hedged(call, operation, hedge_delay), timeout)
+        except Exception as e:
+            if not started:
+                # every slot stayed busy until the deadline, the upstream never saw the request
+                raise UpstreamTimeoutError(f"{operation} timed out waiting for a free upstream slot") from e
+
+            retryable = is_retryable(e)
+            if retryable:
+                breaker.record_failure()
+            else:
+                # the upstream answered, it just rejected this request
+                breaker.record_success()
+
+            delay = policy.backoff(attempt)
+            if not retryable or attempt == policy.max_retries or loop.time() + delay >= deadline:
+                raise as_upstream_error(operation, e) from e
+
+            upstream_retries.inc(operation=operation)
+            logger.warning(f"{operation} failed (attempt {attempt + 1}), retrying in {delay:.1f}s: {str(e)}")
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+transcription_policy = RetryPolicy(
+    max_retries=settings.TRANSCRIBE_CHUNK_RETRIES,
+    attempt_timeout=settings.UPSTREAM_TRANSCRIBE_TIMEOUT,
+    deadline=settings.UPSTREAM_TRANSCRIBE_DEADLINE,
+)
+chat_policy = RetryPolicy(
+    max_retries=settings.UPSTREAM_MAX_RETRIES,
+    attempt_timeout=settings.UPSTREAM_CHAT_TIMEOUT,
+    deadline=settings.UPSTREAM_CHAT_DEADLINE,
+)
+
+transcription_breaker = CircuitBreaker(
+    "transcription", settings.UPSTREAM_CIRCUIT_FAILURES, settings.UPSTREAM_CIRCUIT_RESET
+)
+chat_breaker = CircuitBreaker(
+    "chat", settings.UPSTREAM_CIRCUIT_FAILURES, settings.UPSTREAM_CIRCUIT_RESET
+)
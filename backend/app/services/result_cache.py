@@ -0,0 +1,92 @@
+# backend/app/services/result_cache.py
+from typing import Optional
+import logging
+import threading
+import time
+
+from .metrics import record_cache
+from .storage import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Persistent key/value cache for expensive upstream results.
+    Entries expire after ttl seconds and the least recently used entries
+    are evicted once the stored values exceed max_bytes.
+    """
+
+    def __init__(self, db_path: str, ttl: int, max_bytes: int, name: str = "result"):
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(db_path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+            """
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached value, or None if missing or expired"""
+        value = self._get(key)
+        record_cache(self.name, value is not None)
+        return value
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row["expires"] < now:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            return row["value"]
+
+    def set(self, key: str, value: str):
+        """Store a value and enforce the size budget"""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, expires, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now + self.ttl, now),
+            )
+            self._evict(keep=key)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def _evict(self, keep: Optional[str] = None):
+        self._db.execute("DELETE FROM results WHERE expires < ?", (time.time(),))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) AS total FROM results").fetchone()["total"]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM results ORDER BY last_access").fetchall()
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            if row["key"] == keep:
+                continue
+            self._db.execute("DELETE FROM results WHERE key = ?", (row["key"],))
+            total -= row["size"]
+
+    def evict(self):
+        """Drop expired entries and enforce the size budget"""
+        with self._lock:
+            self._evict()
@@ -0,0 +1,442 @@
+# backend/app/services/search.py
+"""
+Local search over generated minutes and their transcripts. Every meeting is
+split into passages (title, summary, list items, transcript passages) that
+are ranked with BM25, optionally blended with the cosine similarity of
+hashed n-gram vectors computed on the CPU.
+
+The index is append-only. Postings are stored in SQLite as one block of
+numpy arrays per term and meeting, merged by compact(). Passage vectors are
+appended to memory-mapped files next to the database.
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+from .metrics import time_stage
+from .storage import TEMP_DIR, connect_sqlite
+from .transcripts import TranscriptNotFoundError, transcript_store
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DIR = os.path.join(TEMP_DIR, "search")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# best BM25 hits kept (and re-scored with vectors), at least this many and CANDIDATES_PER_RESULT per requested meeting
+RERANK_CANDIDATES = 200
+CANDIDATES_PER_RESULT = 20
+# meetings whose passages are compared with the query when no word matches
+FALLBACK_MEETINGS = 100
+# passages returned per meeting
+MATCHES_PER_MEETING = 3
+
+# CJK characters are single tokens, everything else is split on non-word characters
+TOKEN_RE = re.compile(r"[\u3400-\u9fff]|[^\W_\u3400-\u9fff]+")
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "was", "we", "with",
+    "ada", "akan", "dan", "dari", "dengan", "di", "ini", "itu", "ke", "kita", "saya", "tidak", "untuk", "yang",
+}
+
+# minutes fields indexed as passages, by kind
+MINUTES_FIELDS = {
+    "title": "title",
+    "summary": "summary",
+    "key_points": "key_point",
+    "action_items": "action_item",
+    "decisions": "decision",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+@lru_cache(maxsize=65536)
+def _word_features(word: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed dimensions and signs of a word and its character trigrams"""
+    padded = f" {word} "
+    features = [word] + [padded[i:i + 3] for i in range(len(padded) - 2)]
+    hashes = np.array([zlib.crc32(feature.encode("utf-8")) for feature in features], dtype=np.uint64)
+    # the lowest bit picks the sign so collisions cancel out on average
+    signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+    return ((hashes >> 1) % dim).astype(np.int64), signs
+
+
+def embed(texts: List[str], dim: int) -> np.ndarray:
+    """
+    Unit vectors of hashed word and character trigram counts. Not a
+    language model, but shares n-grams between inflections and misspellings.
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = Counter(TOKEN_RE.findall(text.lower()))
+        if not words:
+            continue
+        features = [(_word_features(word, dim), count) for word, count in words.items()]
+        np.add.at(
+            vectors[row],
+            np.concatenate([dims for (dims, _), _ in features]),
+            np.concatenate([signs * count for (_, signs), count in features]),
+        )
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-10)
+
+
+def meeting_passages(minutes_data: Dict, segments: List[Dict], passage_words: int) -> List[Dict]:
+    """Split minutes and transcript segments into passages of at most passage_words words"""
+    passages = []
+    for field, kind in MINUTES_FIELDS.items():
+        value = minutes_data.get(field)
+        for text in (value if isinstance(value, list) else [value]):
+            if isinstance(text, str) and text.strip():
+                passages.append({"kind": kind, "text": text.strip(), "start": None})
+
+    for segment in segments:
+        words = segment["text"].split()
+        if not words:
+            continue
+        start, end = segment.get("start"), segment.get("end")
+        for first in range(0, len(words), passage_words):
+            # start of the passage, interpolated by word position within the segment
+            offset = None
+            if start is not None:
+                offset = start if end is None else start + (end - start) * first / len(words)
+            text = " ".join(words[first:first + passage_words])
+            if segment.get("speaker"):
+                text = f"{segment['speaker']}: {text}"
+            passages.append({"kind": "transcript", "text": text, "start": offset})
+    return passages
+
+
+class SearchIndex:
+    """
+    Append-only BM25 (plus optional vector) index over meetings. Writes go
+    through SQLite transactions so several workers can index concurrently,
+    each process keeps the per-passage arrays it needs for scoring in
+    memory and loads new passages on the next search.
+    """
+
+    def __init__(self, root: str = SEARCH_DIR, vector_dim: Optional[int] = None):
+        self.root = root
+        self.vector_dim = vector_dim or settings.SEARCH_VECTOR_DIM
+        os.makedirs(self.root, exist_ok=True)
+        self.vectors_path = os.path.join(self.root, f"passages.{self.vector_dim}.f16")
+        self.meeting_vectors_path = os.path.join(self.root, f"meetings.{self.vector_dim}.f16")
+
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(os.path.join(self.root, "index.db"))
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meetings (
+                meeting INTEGER PRIMARY KEY,
+                minutes_id TEXT NOT NULL UNIQUE,
+                title TEXT,
+                transcript_id TEXT,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS passages (
+                passage INTEGER PRIMARY KEY,
+                meeting INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                start REAL,
+                length INTEGER NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                block INTEGER NOT NULL,
+                passages BLOB NOT NULL,
+                counts BLOB NOT NULL,
+                PRIMARY KEY (term, block)
+            ) WITHOUT ROWID;
+            """
+        )
+        # per process view of the index, extended by _refresh()
+        self._loaded = 0
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._meetings = np.zeros(0, dtype=np.int32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._vectors: Optional[np.memmap] = None
+        self._meeting_vectors: Optional[np.memmap] = None
+        self._background: Set[asyncio.Future] = set()
+
+    def _append_vectors(self, path: str, first_row: int, vectors: np.ndarray):
+        """Write vectors at their row offset, rows are ids handed out by SQLite"""
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            f.seek(first_row * self.vector_dim * 2)
+            f.write(vectors.astype(np.float16).tobytes())
+
+    def add_meeting(
+        self,
+        minutes_id: str,
+        minutes_data: Dict,
+        segments: List[Dict],
+        transcript_id: Optional[str] = None,
+    ) -> bool:
+        """Index one meeting, returns False if it is already indexed"""
+        passages = meeting_passages(minutes_data, segments, settings.SEARCH_PASSAGE_WORDS)
+        tokens = [tokenize(passage["text"]) for passage in passages]
+        vectors = embed([passage["text"] for passage in passages], self.vector_dim) if settings.SEARCH_VECTORS else None
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self._db.execute("SELECT 1 FROM meetings WHERE minutes_id = ?", (minutes_id,)).fetchone():
+                    self._db.execute("ROLLBACK")
+                    return False
+                meeting = self._db.execute(
+                    "INSERT INTO meetings (minutes_id, title, transcript_id, created) VALUES (?, ?, ?, ?)",
+                    (minutes_id, minutes_data.get("title"), transcript_id, time.time()),
+                ).lastrowid
+                # passage ids are dense so they can index the in-memory arrays and vector files
+                first = self._db.execute("SELECT COALESCE(MAX(passage), 0) + 1 AS next FROM passages").fetchone()["next"]
+                self._db.executemany(
+                    "INSERT INTO passages (passage, meeting, kind, start, length, text) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (first + i, meeting, passage["kind"], passage["start"], len(terms), passage["text"])
+                        for i, (passage, terms) in enumerate(zip(passages, tokens))
+                    ],
+                )
+
+                # one block per term for this meeting: passage ids (int32) and term counts (uint16)
+                postings: Dict[str, Tuple[array, array]] = {}
+                for i, terms in enumerate(tokens):
+                    for term, count in Counter(terms).items():
+                        ids, counts = postings.setdefault(term, (array("i"), array("H")))
+                        ids.append(first + i)
+                        counts.append(min(count, 65535))
+                self._db.executemany(
+                    "INSERT INTO postings (term, block, passages, counts) VALUES (?, ?, ?, ?)",
+                    [(term, meeting, ids.tobytes(), counts.tobytes()) for term, (ids, counts) in postings.items()],
+                )
+
+                # vectors are on disk before the rows that point at them are visible
+                if vectors is not None and len(vectors):
+                    self._append_vectors(self.vectors_path, first, vectors)
+                    meeting_vector = vectors.sum(axis=0)
+                    meeting_vector /= max(np.linalg.norm(meeting_vector), 1e-10)
+                    self._append_vectors(self.meeting_vectors_path, meeting, meeting_vector[None, :])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        logger.info(f"Indexed minutes {minutes_id}: {len(passages)} passages, {len(postings)} terms")
+        return True
+
+    def refresh(self):
+        """Load passages indexed since the last call, possibly by other workers"""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        rows = self._db.execute(
+            "SELECT passage, meeting, length FROM passages WHERE passage > ? ORDER BY passage", (self._loaded,)
+        ).fetchall()
+        if not rows:
+            return
+        last = rows[-1]["passage"]
+        lengths = np.zeros(last + 1, dtype=np.int32)
+        meetings = np.zeros(last + 1, dtype=np.int32)
+        lengths[:len(self._lengths)] = self._lengths
+        meetings[:len(self._meetings)] = self._meetings
+        ids = np.array([row["passage"] for row in rows])
+        lengths[ids] = [row["length"] for row in rows]
+        meetings[ids] = [row["meeting"] for row in rows]
+        self._lengths, self._meetings, self._loaded = lengths, meetings, last
+        # BM25 length normalization, depends on the average passage length so it is redone on every load
+        average = float(lengths.sum()) / max(int(np.count_nonzero(lengths)), 1)
+        self._norms = (K1 * (1.0 - B + B * lengths / average)).astype(np.float32)
+
+        if settings.SEARCH_VECTORS and os.path.exists(self.vectors_path):
+            self._vectors = self._open_vectors(self.vectors_path, last + 1)
+            meeting_count = int(meetings.max()) + 1
+            self._meeting_vectors = self._open_vectors(self.meeting_vectors_path, meeting_count)
+
+    def _open_vectors(self, path: str, rows: int) -> Optional[np.memmap]:
+        if not os.path.exists(path):
+            return None
+        available = os.path.getsize(path) // (self.vector_dim * 2)
+        if available == 0:
+            return None
+        return np.memmap(path, dtype=np.float16, mode="r", shape=(min(rows, available), self.vector_dim))
+
+    def _bm25(self, terms: List[str], candidates: int) -> Dict[int, float]:
+        """BM25 scores of the (at most candidates) best passages containing a query term"""
+        if not terms:
+            return {}
+        count = int(np.count_nonzero(self._lengths))
+        scores = np.zeros(len(self._lengths), dtype=np.float32)
+        for term in set(terms):
+            rows = self._db.execute("SELECT passages, counts FROM postings WHERE term = ?", (term,)).fetchall()
+            if not rows:
+                continue
+            ids = np.concatenate([np.frombuffer(row["passages"], dtype=np.int32) for row in rows])
+            counts = np.concatenate([np.frombuffer(row["counts"], dtype=np.uint16) for row in rows]).astype(np.float32)
+            # ids are ascending, passages indexed after our last refresh are picked up next time
+            if ids[-1] >= len(scores):
+                known = int(np.searchsorted(ids, len(scores)))
+                ids, counts = ids[:known], counts[:known]
+            idf = float(np.log(1.0 + (count - len(ids) + 0.5) / (len(ids) + 0.5)))
+            weights = counts * (idf * (K1 + 1.0))
+            weights /= counts + self._norms[ids]
+            # a passage appears once per term, so plain fancy indexing adds up correctly
+            scores[ids] += weights
+        hits = np.flatnonzero(scores)
+        if len(hits) > candidates:
+            hits = hits[np.argpartition(-scores[hits], candidates)[:candidates]]
+        return dict(zip(hits.tolist(), scores[hits].tolist()))
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Meetings ranked by their best matching passage, each with its top passages"""
+        with self._lock:
+            self._refresh()
+            scores = self._bm25(tokenize(query), max(RERANK_CANDIDATES, limit * CANDIDATES_PER_RESULT))
+            use_vectors = settings.SEARCH_VECTORS and self._vectors is not None
+            query_vector = embed([query], self.vector_dim)[0] if use_vectors else None
+
+            if scores and use_vectors:
+                top = max(scores.values())
+                ids = np.array([c for c in scores if c < len(self._vectors)], dtype=np.int64)
+                similarity = self._vectors[ids].astype(np.float32) @ query_vector if len(ids) else []
+                weight = settings.SEARCH_VECTOR_WEIGHT
+                scores = {c: (1.0 - weight) * score / top for c, score in scores.items()}
+                for c, s in zip(ids.tolist(), similarity):
+                    scores[c] += weight * max(float(s), 0.0)
+            elif not scores and use_vectors and self._meeting_vectors is not None:
+                # no word matches, fall back to the most similar meetings and their closest passages
+                similarity = self._meeting_vectors.astype(np.float32) @ query_vector
+                best = np.argsort(-similarity)[:max(limit, FALLBACK_MEETINGS)]
+                ids = np.flatnonzero(np.isin(self._meetings, best))
+                ids = ids[ids < len(self._vectors)]
+                if len(ids):
+                    passage_similarity = self._vectors[ids].astype(np.float32) @ query_vector
+                    scores = {
+                        int(i): float(s) for i, s in zip(ids, passage_similarity)
+                        if s > settings.SEARCH_MIN_SIMILARITY
+                    }
+
+            by_meeting: Dict[int, List[int]] = {}
+            for passage in sorted(scores, key=scores.get, reverse=True):
+                matches = by_meeting.setdefault(int(self._meetings[passage]), [])
+                if len(matches) < MATCHES_PER_MEETING:
+                    matches.append(passage)
+            meetings = sorted(by_meeting, key=lambda m: scores[by_meeting[m][0]], reverse=True)[:limit]
+            if not meetings:
+                return []
+
+            passage_ids = [p for m in meetings for p in by_meeting[m]]
+            placeholders = ",".join("?" for _ in passage_ids)
+            passages = {
+                row["passage"]: row for row in self._db.execute(
+                    f"SELECT passage, kind, start, text FROM passages WHERE passage IN ({placeholders})", passage_ids
+                ).fetchall()
+            }
+            placeholders = ",".join("?" for _ in meetings)
+            info = {
+                row["meeting"]: row for row in self._db.execute(
+                    f"SELECT meeting, minutes_id, title, transcript_id, created FROM meetings "
+                    f"WHERE meeting IN ({placeholders})", meetings
+                ).fetchall()
+            }
+
+        return [
+            {
+                "minutes_id": info[m]["minutes_id"],
+                "title": info[m]["title"],
+                "transcript_id": info[m]["transcript_id"],
+                "created": info[m]["created"],
+                "score": round(scores[by_meeting[m][0]], 4),
+                "matches": [
+                    {
+                        "kind": passages[p]["kind"],
+                        "text": passages[p]["text"],
+                        "start": passages[p]["start"],
+                        "score": round(scores[p], 4),
+                    }
+                    for p in by_meeting[m]
+                ],
+            }
+            for m in meetings
+        ]
+
+    def compact(self, max_blocks: Optional[int] = None):
+        """Merge the posting blocks of terms that have more than max_blocks, keeps term lookups fast"""
+        max_blocks = max_blocks or settings.SEARCH_COMPACT_BLOCKS
+        with self._lock:
+            terms = self._db.execute(
+                "SELECT term FROM postings GROUP BY term HAVING COUNT(*) > ?", (max_blocks,)
+            ).fetchall()
+        for row in terms:
+            # one term at a time so searches in this worker aren't held up for the whole pass
+            with self._lock:
+                self._merge_blocks(row["term"])
+        if terms:
+            logger.info(f"Compacted postings of {len(terms)} search terms")
+
+    def _merge_blocks(self, term: str):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            blocks = self._db.execute(
+                "SELECT block, passages, counts FROM postings WHERE term = ? ORDER BY block", (term,)
+            ).fetchall()
+            if len(blocks) > 1:
+                self._db.execute("DELETE FROM postings WHERE term = ?", (term,))
+                self._db.execute(
+                    "INSERT INTO postings (term, block, passages, counts) VALUES (?, ?, ?, ?)",
+                    (
+                        term,
+                        blocks[-1]["block"],
+                        b"".join(block["passages"] for block in blocks),
+                        b"".join(block["counts"] for block in blocks),
+                    ),
+                )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def schedule(self, minutes_id: str, minutes_data: Dict, transcript: str, transcript_id: Optional[str] = None):
+        """
+        Index a meeting in the background, the request that produced it
+        doesn't wait. Stored transcripts are indexed with their timestamps.
+        """
+        if not settings.SEARCH_ENABLED:
+            return
+        task = asyncio.ensure_future(self._index(minutes_id, minutes_data, transcript, transcript_id))
+        # keep a reference so the task isn't garbage collected while it runs
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _index(self, minutes_id: str, minutes_data: Dict, transcript: str, transcript_id: Optional[str]):
+        loop = asyncio.get_running_loop()
+        try:
+            segments = [{"text": transcript, "start": None}]
+            if transcript_id:
+                try:
+                    segments = await loop.run_in_executor(None, transcript_store.segments, transcript_id)
+                except TranscriptNotFoundError:
+                    # expired since the minutes were generated, index the text without timestamps
+                    transcript_id = None
+            with time_stage("search_index"):
+                await loop.run_in_executor(None, self.add_meeting, minutes_id, minutes_data, segments, transcript_id)
+        except Exception as e:
+            logger.error(f"Indexing minutes {minutes_id} failed: {str(e)}")
+
+
+# Create a global instance
+search_index = SearchIndex()
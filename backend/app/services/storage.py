@@ -0,0 +1,73 @@
+# backend/app/services/storage.py
+import os
+import sqlite3
+
+from config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Get the absolute path to the project root directory
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+TEMP_DIR = settings.TEMP_DIR or os.path.join(PROJECT_ROOT, "temp")
+
+
+def connect_sqlite(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite connection that can be shared between threads and
+    between uvicorn worker processes using the same database file.
+    """
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(
+        db_path,
+        timeout=30,
+        check_same_thread=False,
+        isolation_level=None,
+    )
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers in other processes proceed while one process writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class FileLock:
+    """
+    Inter-process lock on a file, used to elect the one worker that runs
+    maintenance tasks. The OS releases it when the holding process exits,
+    so another worker takes over after a crash.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Try to take the lock without blocking, True if this process holds it"""
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            # no flock (Windows), assume a single process
+            self._file = True
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None and self._file is not True:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
@@ -1,20 +1,198 @@
 # backend/app/services/transcription.py
+import asyncio
+import hashlib
 import logging
-from openai import OpenAI
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
 from config import settings
 import os
 
+from .audio import AudioChunk, is_wav, merge_overlap, split_audio, wav_duration
+from .clients import get_client
+from .diarization import DIARIZATION_KIND, get_speaker_turns, label_text
+from .file_cache import hash_file
+from .metrics import audio_seconds, stage_duration, time_stage
+from .preprocess import PREPROCESS_KIND, PreparedAudio, encode_audio, prepare_audio, upload_codec
+from .resilience import UpstreamError, resilient_call, transcription_breaker, transcription_policy
+from .storage import TEMP_DIR
+from .transcripts import format_transcript, transcript_store
+from .vad import VAD_KIND, get_speech_index, plan_chunks, write_speech_chunks
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Get the absolute path to the project root directory
-PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-TEMP_DIR = os.path.join(PROJECT_ROOT, "temp")
+CHUNKS_DIR = os.path.join(TEMP_DIR, "chunks")
+
+TRANSCRIPTION_MODEL = "base"
+RESPONSE_FORMAT = "text"
+
+# upper bound on the words an ASR can produce for the overlap between two chunks
+MAX_OVERLAP_WORDS = 60
+
+_in_flight: Dict[str, asyncio.Future] = {}
+_background: Set[asyncio.Future] = set()
+
+
+@dataclass
+class AudioAnalysis:
+    # the audio sent to the ASR, with its offset into the upload
+    prepared: PreparedAudio
+    # speech index of prepared.path, None when VAD is off or failed
+    index: Optional[dict] = None
+
+
+def transcript_cache_key(audio_hash: str, model: str = TRANSCRIPTION_MODEL, response_format: str = RESPONSE_FORMAT) -> str:
+    key = f"{audio_hash}:{model}:{response_format}"
+    # preprocessed or speech-only audio can transcribe slightly differently
+    if settings.PREPROCESS_AUDIO:
+        key = f"{key}:{PREPROCESS_KIND}"
+    if settings.VAD_ENABLED:
+        key = f"{key}:{VAD_KIND}"
+    # a diarized transcript is labeled by speaker
+    if settings.DIARIZATION_ENABLED:
+        key = f"{key}:{DIARIZATION_KIND}"
+    return key
+
+
+def transcript_id(audio_hash: str) -> str:
+    """Id the transcript of an upload is stored under, it changes with anything that changes the transcript"""
+    return hashlib.sha256(transcript_cache_key(audio_hash).encode("utf-8")).hexdigest()[:32]
+
+
+async def _analyze(file_path: str, audio_hash: str) -> AudioAnalysis:
+    prepared = await prepare_audio(file_path, audio_hash)
+    index = await get_speech_index(prepared.path, audio_hash)
+    return AudioAnalysis(prepared, index)
+
+
+async def analyze_audio(file_path: str, audio_hash: str) -> AudioAnalysis:
+    """
+    Preprocess an upload and build its speech index, each step cached per
+    audio hash. Concurrent callers for the same hash share a run.
+    """
+    task = _in_flight.get(audio_hash)
+    if task is None:
+        task = asyncio.ensure_future(_analyze(file_path, audio_hash))
+        _in_flight[audio_hash] = task
+        task.add_done_callback(lambda _: _in_flight.pop(audio_hash, None))
+    # a cancelled caller must not cancel the run other callers are waiting on
+    return await asyncio.shield(task)
+
+
+def _analysis_done(task: asyncio.Future, audio_hash: str):
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        # nobody awaits the task, transcription analyzes the upload again when it needs it
+        logger.warning(f"Background analysis of {audio_hash} failed: {str(task.exception())}")
+
+
+def start_analysis(file_path: str, audio_hash: str):
+    """Analyze a new upload in the background so it is ready by the time it is transcribed"""
+    if settings.PREPROCESS_AUDIO or settings.VAD_ENABLED:
+        task = asyncio.ensure_future(analyze_audio(file_path, audio_hash))
+        # keep a reference so the task isn't garbage collected while it runs
+        _background.add(task)
+        task.add_done_callback(lambda done: _analysis_done(done, audio_hash))
+
+
+async def stop_analysis():
+    """Cancel background analyses still running and wait for them, called on shutdown"""
+    tasks = list(_background) + list(_in_flight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _transcribe_file(file_path: str) -> str:
+    """Send a single audio file to the ASR, retrying transient failures"""
+    loop = asyncio.get_running_loop()
+    client = get_client()
+    
+    codec = upload_codec()
+    audio_file = None
+    if codec:
+        audio, name = await loop.run_in_executor(None, encode_audio, file_path, codec)
+    else:
+        # the open file is streamed by the HTTP client, it is never loaded whole
+        audio_file = await loop.run_in_executor(None, open, file_path, "rb")
+        audio, name = audio_file, os.path.basename(file_path)
+    
+    async def request():
+        if audio_file is not None:
+            # a retry sends the file again from the start
+            audio_file.seek(0)
+        return await client.audio.transcriptions.create(
+            model=TRANSCRIPTION_MODEL,
+            file=(name, audio),
+            response_format=RESPONSE_FORMAT,
+        )
+    
+    try:
+        return await resilient_call(request, "transcription", transcription_policy, transcription_breaker)
+    finally:
+        if audio_file is not None:
+            audio_file.close()
+
+
+async def _transcribe_chunk(chunk: AudioChunk, semaphore: asyncio.Semaphore) -> str:
+    """Transcribe one chunk, a failed chunk is retried on its own"""
+    async with semaphore:
+        text = await _transcribe_file(chunk.path)
+        logger.info(f"Chunk {chunk.index} ({chunk.start:.1f}s-{chunk.end:.1f}s) transcribed")
+        return text
+
 
-async def transcribe_audio(file_path: str):
+async def _split(analysis: AudioAnalysis, chunk_dir: str) -> List[AudioChunk]:
     """
-    Transcribe audio file using Mesolitica API.
+    Chunks to transcribe: the speech regions from the speech index when
+    there is one, otherwise the whole recording split at quiet points.
+    Only WAV is split, other formats are sent as one request unless
+    preprocessing has converted them to WAV.
+    """
+    loop = asyncio.get_running_loop()
+    audio_path = analysis.prepared.path
+    index = analysis.index
+    
+    with time_stage("transcribe_split"):
+        if index and index["segments"]:
+            speech = sum(end - start for start, end in index["segments"])
+            audio_seconds.inc(speech, kind="speech")
+            audio_seconds.inc(index["duration"] - speech, kind="skipped")
+            groups = plan_chunks(
+                index["segments"], settings.TRANSCRIBE_CHUNK_SECONDS, settings.TRANSCRIBE_CHUNK_OVERLAP_SECONDS
+            )
+            return await loop.run_in_executor(None, write_speech_chunks, audio_path, chunk_dir, groups)
+        
+        chunks = await loop.run_in_executor(
+            None,
+            split_audio,
+            audio_path,
+            chunk_dir,
+            settings.TRANSCRIBE_CHUNK_SECONDS,
+            settings.TRANSCRIBE_CHUNK_OVERLAP_SECONDS,
+            settings.TRANSCRIBE_SPLIT_SEARCH_SECONDS,
+        )
+    if not chunks:
+        end = await loop.run_in_executor(None, wav_duration, audio_path) if is_wav(audio_path) else None
+        chunks = [AudioChunk(index=0, path=audio_path, start=0.0, end=end)]
+    return chunks
+
+
+async def stream_transcription(file_path: str, audio_hash: Optional[str] = None) -> AsyncIterator[Dict]:
+    """
+    Transcribe audio file using Mesolitica API, yielding segments as they
+    become available. Only speech regions are sent when the speech index
+    finds them, otherwise long WAV recordings are split at quiet points.
+    Chunks are transcribed in parallel, segments are still yielded in order.
+    Each segment is a dict with index, total, start, end (seconds), text and
+    speaker (None unless diarization is enabled). A chunk spanning several
+    speakers yields one segment per speaker, all with the chunk's index.
+    Results are stored in the transcript store under transcript_id(audio_hash),
+    so retries of the same recording never hit the API again.
     """
     logger.info(f"Starting transcription for file: {file_path}")
     
@@ -28,25 +206,99 @@ async def transcribe_audio(file_path: str):
     file_size = os.path.getsize(file_path)
     logger.info(f"File size: {file_size / (1024*1024):.2f} MB")
     
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    if audio_hash is None:
+        audio_hash = await loop.run_in_executor(None, hash_file, file_path)
+    stored_id = transcript_id(audio_hash)
+    
+    cached = await loop.run_in_executor(None, transcript_store.lookup, stored_id)
+    if cached is not None:
+        logger.info(f"Transcript cache hit for {audio_hash}")
+        for segment in cached:
+            yield segment
+        return
+    
+    chunk_dir = os.path.join(CHUNKS_DIR, f"{audio_hash}-{uuid.uuid4().hex}")
+    tasks = []
+    diarizing = None
+    transcript = ""
+    segments = []
     try:
-        client = OpenAI(
-            base_url=settings.MESOLITICA_API_URL,
-            api_key=settings.MESOLITICA_API_KEY,
-        )
+        # usually done in the background since the upload, timestamps are shifted back by the trimmed offset
+        analysis = await analyze_audio(file_path, audio_hash)
+        prepared = analysis.prepared
+        if settings.DIARIZATION_ENABLED and analysis.index and analysis.index["segments"]:
+            # diarization runs in the worker pool while the chunks are transcribed, speakers are assigned after
+            diarizing = asyncio.ensure_future(
+                get_speaker_turns(prepared.path, audio_hash, analysis.index["segments"])
+            )
+        chunks = await _split(analysis, chunk_dir)
         
-        logger.info("Initialized OpenAI client")
+        logger.info("Sending transcription request...")
+        semaphore = asyncio.Semaphore(settings.TRANSCRIBE_MAX_PARALLEL_CHUNKS)
+        tasks = [asyncio.create_task(_transcribe_chunk(chunk, semaphore)) for chunk in chunks]
         
-        with open(file_path, "rb") as audio_file:
-            logger.info("Sending transcription request...")
-            transcript = client.audio.transcriptions.create(
-                model="base",
-                file=audio_file,
-                response_format="text",
-            )
-            logger.info("Transcription completed successfully")
-            return transcript
+        previous = None
+        turns = None
+        for chunk, task in zip(chunks, tasks):
+            text = (await task).strip()
+            if previous is not None and previous.end is not None and chunk.start < previous.end:
+                # chunks overlap in time, drop the words already emitted
+                text = merge_overlap(transcript, text, MAX_OVERLAP_WORDS)
+            transcript = f"{transcript} {text}" if transcript and text else transcript or text
+            previous = chunk
+            if diarizing is not None:
+                turns = await diarizing
+                diarizing = None
+            if turns and chunk.segments:
+                pieces = label_text(text, chunk.segments, turns)
+            else:
+                pieces = [(chunk.start, chunk.end, None, text)]
+            for start, end, speaker, piece in pieces:
+                segment = {
+                    "index": chunk.index,
+                    "total": len(chunks),
+                    "start": start + prepared.offset,
+                    "end": end + prepared.offset if end is not None else None,
+                    "text": piece,
+                    "speaker": speaker,
+                }
+                segments.append(segment)
+                yield segment
+        logger.info("Transcription completed successfully")
             
     except Exception as e:
         error_msg = f"Transcription error: {str(e)}"
         logger.error(error_msg)
-        raise Exception(error_msg)
\ No newline at end of file
+        if isinstance(e, UpstreamError):
+            # typed so callers can tell an upstream outage from a bad file
+            raise
+        raise Exception(error_msg)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if diarizing is not None:
+            diarizing.cancel()
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+    
+    await loop.run_in_executor(None, transcript_store.save, stored_id, audio_hash, segments)
+    # only uncached transcriptions, cache hits show up in the cache metrics
+    stage_duration.observe(time.perf_counter() - started, stage="transcribe")
+
+
+async def transcribe_audio(
+    file_path: str,
+    audio_hash: Optional[str] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+):
+    """
+    Transcribe audio file using Mesolitica API and return the full transcript,
+    with "Speaker N:" lines when diarization is enabled.
+    """
+    segments = []
+    async for segment in stream_transcription(file_path, audio_hash):
+        segments.append(segment)
+        if on_progress:
+            on_progress(segment["index"] + 1, segment["total"])
+    return format_transcript(segments)
@@ -0,0 +1,234 @@
+# backend/app/services/transcripts.py
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import threading
+import time
+
+from config import settings
+from .metrics import record_cache
+from .storage import TEMP_DIR, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+STORE_PATH = os.path.join(TEMP_DIR, "transcript_store.db")
+
+
+class TranscriptNotFoundError(Exception):
+    """Raised when a transcript id is unknown or expired"""
+
+
+def format_transcript(segments: List[Dict]) -> str:
+    """Join segment texts, as one "Speaker N: ..." line per turn when segments are labeled"""
+    if not any(segment.get("speaker") for segment in segments):
+        return " ".join(segment["text"] for segment in segments if segment["text"])
+    lines = []
+    previous = None
+    for segment in segments:
+        if not segment["text"]:
+            continue
+        speaker = segment.get("speaker")
+        if lines and speaker == previous:
+            lines[-1] = f"{lines[-1]} {segment['text']}"
+        else:
+            lines.append(f"{speaker}: {segment['text']}" if speaker else segment["text"])
+        previous = speaker
+    return "\n".join(lines)
+
+
+class TranscriptStore:
+    """
+    Timestamped transcripts, kept server-side under an id so clients can
+    page through them or fetch a time range instead of sending the whole
+    text back and forth. Each segment is one row (times, speaker number,
+    text), speaker names are stored once per transcript.
+    Transcripts expire after ttl seconds and the least recently used are
+    evicted once their text exceeds max_bytes.
+    """
+
+    def __init__(self, db_path: str = STORE_PATH, ttl: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.ttl = ttl or settings.TRANSCRIPT_CACHE_TTL
+        self.max_bytes = max_bytes or settings.TRANSCRIPT_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(db_path)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS transcripts (
+                transcript_id TEXT PRIMARY KEY,
+                audio_hash TEXT NOT NULL,
+                speakers TEXT NOT NULL,
+                segment_count INTEGER NOT NULL,
+                duration REAL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                expires REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS transcripts_last_access ON transcripts (last_access);
+            CREATE TABLE IF NOT EXISTS segments (
+                transcript_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                start_seconds REAL NOT NULL,
+                end_seconds REAL,
+                speaker INTEGER,
+                text TEXT NOT NULL,
+                PRIMARY KEY (transcript_id, idx)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def save(self, transcript_id: str, audio_hash: str, segments: List[Dict]):
+        """Store the segments of a transcript, replacing any previous version"""
+        speakers: List[str] = []
+        rows = []
+        for index, segment in enumerate(segments):
+            speaker = segment.get("speaker")
+            if speaker is not None and speaker not in speakers:
+                speakers.append(speaker)
+            rows.append((
+                transcript_id,
+                index,
+                segment["start"],
+                segment["end"],
+                speakers.index(speaker) if speaker is not None else None,
+                segment["text"],
+            ))
+        ends = [segment["end"] for segment in segments if segment["end"] is not None]
+        size = sum(len(segment["text"].encode("utf-8")) for segment in segments)
+        now = time.time()
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete(transcript_id)
+                self._db.execute(
+                    "INSERT INTO transcripts (transcript_id, audio_hash, speakers, segment_count, duration, size, "
+                    "created, expires, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (transcript_id, audio_hash, json.dumps(speakers), len(rows), max(ends) if ends else None,
+                     size, now, now + self.ttl, now),
+                )
+                self._db.executemany(
+                    "INSERT INTO segments (transcript_id, idx, start_seconds, end_seconds, speaker, text) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._evict(keep=transcript_id)
+
+    def _meta(self, transcript_id: str) -> Optional[Dict]:
+        now = time.time()
+        row = self._db.execute("SELECT * FROM transcripts WHERE transcript_id = ?", (transcript_id,)).fetchone()
+        if row is None:
+            return None
+        if row["expires"] < now:
+            self._delete(transcript_id)
+            return None
+        self._db.execute("UPDATE transcripts SET last_access = ? WHERE transcript_id = ?", (now, transcript_id))
+        meta = dict(row)
+        meta["speakers"] = json.loads(meta["speakers"])
+        return meta
+
+    def get(self, transcript_id: str) -> Dict:
+        """Transcript metadata: segment count, duration, speakers and size"""
+        with self._lock:
+            meta = self._meta(transcript_id)
+        if meta is None:
+            raise TranscriptNotFoundError(f"Transcript not found: {transcript_id}")
+        return {
+            "transcript_id": transcript_id,
+            "file_id": meta["audio_hash"],
+            "segments": meta["segment_count"],
+            "duration": meta["duration"],
+            "speakers": meta["speakers"],
+            "size": meta["size"],
+            "created": meta["created"],
+        }
+
+    def segments(
+        self,
+        transcript_id: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> List[Dict]:
+        """
+        Segments in order, optionally only those overlapping the start/end
+        range (seconds), then paged by offset and limit.
+        """
+        query = "SELECT * FROM segments WHERE transcript_id = ?"
+        params: list = [transcript_id]
+        if start is not None:
+            query += " AND (end_seconds IS NULL OR end_seconds > ?)"
+            params.append(start)
+        if end is not None:
+            query += " AND start_seconds < ?"
+            params.append(end)
+        query += " ORDER BY idx LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+
+        with self._lock:
+            meta = self._meta(transcript_id)
+            rows = self._db.execute(query, params).fetchall() if meta is not None else []
+        if meta is None:
+            raise TranscriptNotFoundError(f"Transcript not found: {transcript_id}")
+        speakers = meta["speakers"]
+        return [
+            {
+                "index": row["idx"],
+                "total": meta["segment_count"],
+                "start": row["start_seconds"],
+                "end": row["end_seconds"],
+                "text": row["text"],
+                "speaker": speakers[row["speaker"]] if row["speaker"] is not None else None,
+            }
+            for row in rows
+        ]
+
+    def lookup(self, transcript_id: str) -> Optional[List[Dict]]:
+        """All segments of a stored transcript, or None, recorded as a transcript cache hit or miss"""
+        try:
+            segments = self.segments(transcript_id)
+        except TranscriptNotFoundError:
+            segments = None
+        record_cache("transcript", segments is not None)
+        return segments
+
+    def text(self, transcript_id: str, start: Optional[float] = None, end: Optional[float] = None) -> str:
+        """The transcript (or the part in the start/end range) as text"""
+        return format_transcript(self.segments(transcript_id, start=start, end=end))
+
+    def _delete(self, transcript_id: str):
+        self._db.execute("DELETE FROM segments WHERE transcript_id = ?", (transcript_id,))
+        self._db.execute("DELETE FROM transcripts WHERE transcript_id = ?", (transcript_id,))
+
+    def _evict(self, keep: Optional[str] = None):
+        expired = self._db.execute(
+            "SELECT transcript_id FROM transcripts WHERE expires < ?", (time.time(),)
+        ).fetchall()
+        for row in expired:
+            self._delete(row["transcript_id"])
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) AS total FROM transcripts").fetchone()["total"]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT transcript_id, size FROM transcripts ORDER BY last_access").fetchall()
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            if row["transcript_id"] == keep:
+                continue
+            self._delete(row["transcript_id"])
+            total -= row["size"]
+
+    def evict(self):
+        """Drop expired transcripts and enforce the size budget"""
+        with self._lock:
+            self._evict()
+
+
+# Create a global instance
+transcript_store = TranscriptStore()
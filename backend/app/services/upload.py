@@ -0,0 +1,244 @@
+# backend/app/services/upload.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from functools import partial
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from config import settings
+from .metrics import time_stage
+from .storage import TEMP_DIR, fcntl
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = os.path.join(TEMP_DIR, "uploads")
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured maximum size"""
+
+
+class UploadOffsetError(Exception):
+    """Raised when a chunk is sent for an offset the server doesn't expect"""
+
+
+class UploadNotFoundError(Exception):
+    """Raised when a resumable upload id is unknown"""
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call in the default thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+async def iter_upload_file(file, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Yield the content of an UploadFile in bounded chunks"""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def write_stream(
+    stream: AsyncIterator[bytes],
+    file_path: str,
+    append: bool = False,
+    start_size: int = 0,
+    max_size: Optional[int] = None,
+    hasher=None,
+) -> int:
+    """
+    Write an async byte stream to disk without buffering it in memory,
+    optionally feeding every chunk to a hashlib object on the way.
+    Returns the total file size after writing.
+    """
+    if max_size is None:
+        max_size = settings.MAX_UPLOAD_SIZE
+    size = start_size
+    buffer = await run_blocking(open, file_path, "ab" if append else "wb")
+    try:
+        async for chunk in stream:
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLargeError(
+                    f"Upload exceeds maximum size of {max_size} bytes"
+                )
+            if hasher is not None:
+                hasher.update(chunk)
+            await run_blocking(buffer.write, chunk)
+    finally:
+        await run_blocking(buffer.close)
+    return size
+
+
+async def save_upload(file, dest_path: str, max_size: Optional[int] = None) -> Tuple[int, str]:
+    """
+    Stream an UploadFile to dest_path in chunks, enforcing max_size.
+    The file is written to a temporary path first so a failed upload
+    never leaves a truncated file behind.
+    Returns (size, sha256 hex digest), the digest is computed while streaming.
+    """
+    part_path = f"{dest_path}.{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
+    try:
+        with time_stage("upload_write"):
+            size = await write_stream(
+                iter_upload_file(file), part_path, max_size=max_size, hasher=hasher
+            )
+        await run_blocking(os.replace, part_path, dest_path)
+        return size, hasher.hexdigest()
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+
+class UploadManager:
+    """
+    Tracks resumable, chunked uploads. State lives next to the partial
+    file on disk so an upload can be resumed after a restart.
+    """
+
+    def __init__(self, uploads_dir: str = UPLOADS_DIR):
+        self.uploads_dir = uploads_dir
+        os.makedirs(self.uploads_dir, exist_ok=True)
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.uploads_dir, f"{upload_id}.part")
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.uploads_dir, f"{upload_id}.json")
+
+    def _load_meta(self, upload_id: str) -> Dict:
+        # upload ids are generated by us, reject anything else before touching the disk
+        try:
+            uuid.UUID(hex=upload_id)
+        except ValueError:
+            raise UploadNotFoundError(f"Upload not found: {upload_id}")
+
+        meta_path = self._meta_path(upload_id)
+        if not os.path.exists(meta_path):
+            raise UploadNotFoundError(f"Upload not found: {upload_id}")
+        with open(meta_path, "r") as f:
+            return json.load(f)
+
+    def create(self, filename: str, total_size: Optional[int] = None) -> Dict:
+        """Register a new resumable upload"""
+        if total_size is not None and total_size > settings.MAX_UPLOAD_SIZE:
+            raise UploadTooLargeError(
+                f"Upload exceeds maximum size of {settings.MAX_UPLOAD_SIZE} bytes"
+            )
+
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "upload_id": upload_id,
+            "filename": os.path.basename(filename),
+            "total_size": total_size,
+        }
+        with open(self._meta_path(upload_id), "w") as f:
+            json.dump(meta, f)
+        open(self._part_path(upload_id), "wb").close()
+        return {**meta, "offset": 0}
+
+    def status(self, upload_id: str) -> Dict:
+        """Get the current state of an upload, including the resume offset"""
+        meta = self._load_meta(upload_id)
+        return {**meta, "offset": os.path.getsize(self._part_path(upload_id))}
+
+    def _lock(self, upload_id: str):
+        """
+        Lock an upload's part file so only one request writes or completes it
+        at a time, in any worker. The lock is released when the file is closed.
+        """
+        self._load_meta(upload_id)
+        try:
+            lock_file = open(self._part_path(upload_id), "rb")
+        except FileNotFoundError:
+            raise UploadNotFoundError(f"Upload not found: {upload_id}")
+        if fcntl is None:
+            # no flock (Windows), assume a single process
+            return lock_file
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise UploadOffsetError(f"Another request is writing upload {upload_id}")
+        return lock_file
+
+    async def append(self, upload_id: str, offset: int, stream: AsyncIterator[bytes]) -> Dict:
+        """Append a chunk at the given offset, returns the new state"""
+        lock_file = await run_blocking(self._lock, upload_id)
+        try:
+            # the offset is checked while holding the lock, so two requests can't both append at it
+            state = await run_blocking(self.status, upload_id)
+            if offset != state["offset"]:
+                raise UploadOffsetError(
+                    f"Expected offset {state['offset']}, got {offset}"
+                )
+
+            max_size = settings.MAX_UPLOAD_SIZE
+            if state["total_size"] is not None:
+                max_size = min(max_size, state["total_size"])
+
+            part_path = self._part_path(upload_id)
+            try:
+                with time_stage("upload_chunk_write"):
+                    state["offset"] = await write_stream(
+                        stream,
+                        part_path,
+                        append=True,
+                        start_size=offset,
+                        max_size=max_size,
+                    )
+            except UploadTooLargeError:
+                # drop the rejected chunk so the upload can still be resumed
+                await run_blocking(os.truncate, part_path, offset)
+                raise
+            return state
+        finally:
+            await run_blocking(lock_file.close)
+
+    async def complete(self, upload_id: str, dest_path: str) -> Dict:
+        """Move a finished upload to dest_path"""
+        lock_file = await run_blocking(self._lock, upload_id)
+        try:
+            state = await run_blocking(self.status, upload_id)
+            if state["total_size"] is not None and state["offset"] != state["total_size"]:
+                raise UploadOffsetError(
+                    f"Upload incomplete: {state['offset']} of {state['total_size']} bytes received"
+                )
+
+            await run_blocking(os.replace, self._part_path(upload_id), dest_path)
+            await run_blocking(os.remove, self._meta_path(upload_id))
+            return state
+        finally:
+            await run_blocking(lock_file.close)
+
+    def clean_stale(self, max_age: Optional[int] = None):
+        """Remove unfinished uploads that haven't received a chunk for max_age seconds"""
+        cutoff = time.time() - (max_age or settings.UPLOAD_MAX_AGE)
+        for name in os.listdir(self.uploads_dir):
+            upload_id, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            part_path = self._part_path(upload_id)
+            try:
+                # the part file is touched by every chunk
+                last_write = os.path.getmtime(part_path if os.path.exists(part_path) else self._meta_path(upload_id))
+                if last_write < cutoff:
+                    for path in (part_path, self._meta_path(upload_id)):
+                        if os.path.exists(path):
+                            os.remove(path)
+                    logger.info(f"Removed stale upload {upload_id}")
+            except OSError:
+                pass
+
+
+upload_manager = UploadManager()
@@ -0,0 +1,180 @@
+# backend/app/services/vad.py
+"""
+Energy-based voice activity detection. Builds a speech-segment index for
+each recording so only speech is sent to the ASR, the index is cached in
+FileCache next to the upload and reused by every later transcription.
+"""
+import asyncio
+import logging
+import os
+import wave
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from .audio import ENERGY_FRAME_SECONDS, AudioChunk, is_wav, wav_energy
+from .file_cache import file_cache
+from .metrics import time_stage
+from .preprocess import PREPROCESS_KIND, init_pool
+
+logger = logging.getLogger(__name__)
+
+# the index depends on the detection parameters and on the audio it was computed on
+VAD_KIND = (
+    f"vad:{settings.VAD_MARGIN_DB}:{settings.VAD_MIN_SPEECH_DB}:{settings.VAD_MIN_SILENCE_SECONDS}:"
+    f"{settings.VAD_MIN_SPEECH_SECONDS}:{settings.VAD_PAD_SECONDS}"
+    + (f":{PREPROCESS_KIND}" if settings.PREPROCESS_AUDIO else "")
+)
+
+# speech is rarely this much quieter than the loudest speech, caps the threshold for recordings without pauses
+DYNAMIC_RANGE_DB = 25.0
+
+# silence inserted between speech segments joined into one chunk, so words don't run together
+SEGMENT_GAP_SECONDS = 0.3
+
+Segment = Tuple[float, float]
+
+
+def detect_speech(
+    energy: np.ndarray,
+    duration: float,
+    margin_db: float,
+    min_speech_db: float,
+    min_silence: float,
+    min_speech: float,
+    pad: float,
+    frame_seconds: float = ENERGY_FRAME_SECONDS,
+) -> List[Segment]:
+    """
+    Find (start, end) seconds of speech from the RMS energy of each frame.
+    A frame is speech when it is margin_db above the noise floor (10th
+    percentile of frame energy). Short pauses are bridged, short blips
+    dropped and segments padded.
+    """
+    if len(energy) == 0:
+        return []
+    db = 20 * np.log10(energy + 1e-10)
+    noise_floor = np.percentile(db, 10)
+    loud = np.percentile(db, 95)
+    threshold = max(min_speech_db, min(noise_floor + margin_db, loud - DYNAMIC_RANGE_DB))
+
+    # runs of speech frames as [start, end) frame indices
+    edges = np.diff(np.concatenate(([0], (db > threshold).astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * frame_seconds
+    ends = np.flatnonzero(edges == -1) * frame_seconds
+
+    bridged: List[List[float]] = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if bridged and start - bridged[-1][1] < min_silence:
+            bridged[-1][1] = end
+        else:
+            bridged.append([start, end])
+
+    segments: List[List[float]] = []
+    for start, end in bridged:
+        if end - start < min_speech:
+            continue
+        start, end = max(0.0, start - pad), min(duration, end + pad)
+        if segments and start <= segments[-1][1]:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end])
+    return [(start, end) for start, end in segments]
+
+
+def build_speech_index(file_path: str) -> Optional[dict]:
+    """Speech segments of a PCM WAV with its duration, None for other formats. Runs in a worker process."""
+    if not is_wav(file_path):
+        return None
+    energy, _, duration = wav_energy(file_path)
+    segments = detect_speech(
+        energy,
+        duration,
+        settings.VAD_MARGIN_DB,
+        settings.VAD_MIN_SPEECH_DB,
+        settings.VAD_MIN_SILENCE_SECONDS,
+        settings.VAD_MIN_SPEECH_SECONDS,
+        settings.VAD_PAD_SECONDS,
+    )
+    return {"duration": duration, "segments": segments}
+
+
+async def get_speech_index(file_path: str, digest: str) -> Optional[dict]:
+    """
+    Get the speech index of the audio at file_path (an upload, or its
+    preprocessed version) from the cache, computing and caching it once.
+    """
+    if not settings.VAD_ENABLED:
+        return None
+
+    loop = asyncio.get_running_loop()
+    cached = await loop.run_in_executor(None, file_cache.get_derived, digest, VAD_KIND)
+    if cached is not None:
+        return cached[1] or None
+
+    try:
+        with time_stage("vad"):
+            index = await loop.run_in_executor(init_pool(), build_speech_index, file_path)
+    except Exception as e:
+        logger.warning(f"Voice activity detection failed for {digest}, transcribing everything: {str(e)}")
+        return None
+
+    # an empty meta also marks files the VAD can't read, so they aren't retried
+    await loop.run_in_executor(None, file_cache.add_derived, digest, VAD_KIND, None, index or {})
+    if index:
+        speech = sum(end - start for start, end in index["segments"])
+        logger.info(f"Speech index for {digest}: {speech:.1f}s of speech in {index['duration']:.1f}s")
+    return index
+
+
+def plan_chunks(segments: List[Segment], chunk_seconds: float, overlap_seconds: float) -> List[List[Segment]]:
+    """
+    Group consecutive speech segments into chunks of at most chunk_seconds
+    of speech. Segments longer than a chunk are cut into overlapping pieces.
+    """
+    pieces: List[Segment] = []
+    for start, end in segments:
+        while end - start > chunk_seconds:
+            pieces.append((start, start + chunk_seconds))
+            start += chunk_seconds - overlap_seconds
+        pieces.append((start, end))
+
+    groups: List[List[Segment]] = []
+    length = 0.0
+    for start, end in pieces:
+        if groups and length + (end - start) <= chunk_seconds:
+            groups[-1].append((start, end))
+            length += end - start + SEGMENT_GAP_SECONDS
+        else:
+            groups.append([(start, end)])
+            length = end - start + SEGMENT_GAP_SECONDS
+    return groups
+
+
+def write_speech_chunks(file_path: str, out_dir: str, groups: List[List[Segment]]) -> List[AudioChunk]:
+    """
+    Write each group of speech segments as one WAV, segments separated by
+    a short silence. Chunk start/end are on the timeline of file_path.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    chunks = []
+    with wave.open(file_path, "rb") as src:
+        rate = src.getframerate()
+        frame_bytes = src.getnchannels() * src.getsampwidth()
+        # 8-bit WAV is unsigned, its silence is 0x80
+        silence = b"\x80" if src.getsampwidth() == 1 else b"\x00"
+        gap = silence * (int(SEGMENT_GAP_SECONDS * rate) * frame_bytes)
+        for index, group in enumerate(groups):
+            parts = []
+            for start, end in group:
+                src.setpos(int(start * rate))
+                parts.append(src.readframes(int(end * rate) - int(start * rate)))
+            chunk_path = os.path.join(out_dir, f"speech_{index:04d}.wav")
+            with wave.open(chunk_path, "wb") as dest:
+                dest.setnchannels(src.getnchannels())
+                dest.setsampwidth(src.getsampwidth())
+                dest.setframerate(rate)
+                dest.writeframes(gap.join(parts))
+            chunks.append(AudioChunk(index=index, path=chunk_path, start=group[0][0], end=group[-1][1], segments=group))
+    return chunks
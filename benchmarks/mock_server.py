@@ -0,0 +1,138 @@
+# benchmarks/mock_server.py
+"""
+Local stand-in for the Mesolitica API, implementing the OpenAI-compatible
+audio.transcriptions and chat.completions endpoints.
+
+    python -m benchmarks.mock_server --port 9000 --latency 0.5 --error-rate 0.05
+
+then point the backend at it with MESOLITICA_API_URL=http://127.0.0.1:9000
+Behaviour is configured through MOCK_* environment variables so it also
+works when started directly with uvicorn.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+app = FastAPI(title="MemoMatic mock upstream")
+
+WORDS = (
+    "meeting project budget timeline team review client report update plan "
+    "decision action follow up next week deadline design release testing"
+).split()
+
+
+def _setting(name: str, default: float) -> float:
+    return float(os.environ.get(f"MOCK_{name}", default))
+
+
+async def _simulate(payload_bytes: int = 0):
+    """Sleep for the configured latency, and maybe fail"""
+    latency = _setting("LATENCY", 0.2) + _setting("LATENCY_PER_MB", 0.0) * payload_bytes / (1024 * 1024)
+    jitter = _setting("JITTER", 0.1)
+    await asyncio.sleep(max(0.0, latency * (1 + random.uniform(-jitter, jitter))))
+    if random.random() < _setting("ERROR_RATE", 0.0):
+        return JSONResponse(status_code=502, content={"error": {"message": "mock upstream error"}})
+    return None
+
+
+def _text(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words)) + "."
+
+
+def _minutes_json() -> str:
+    items = int(_setting("MINUTES_ITEMS", 5))
+    return json.dumps({
+        "title": "Mock Meeting",
+        "summary": _text(int(_setting("SUMMARY_WORDS", 150))),
+        "key_points": [_text(12) for _ in range(items)],
+        "action_items": [_text(12) for _ in range(items)],
+        "decisions": [_text(12) for _ in range(items)],
+    })
+
+
+@app.get("/")
+def health():
+    return {"status": "ok"}
+
+
+@app.post("/audio/transcriptions")
+async def transcriptions(request: Request):
+    body = await request.body()
+    error = await _simulate(len(body))
+    if error:
+        return error
+    return PlainTextResponse(_text(int(_setting("TRANSCRIPT_WORDS", 500))))
+
+
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = await _simulate()
+    if error:
+        return error
+
+    content = _minutes_json()
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        async def events():
+            step = 16
+            for i in range(0, len(content), step):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(_setting("TOKEN_INTERVAL", 0.0))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Mesolitica API for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, help="Base latency per request (seconds)")
+    parser.add_argument("--latency-per-mb", type=float, help="Extra latency per MB of uploaded audio (seconds)")
+    parser.add_argument("--error-rate", type=float, help="Fraction of requests answered with a 502")
+    parser.add_argument("--transcript-words", type=int, help="Words in each transcription response")
+    parser.add_argument("--minutes-items", type=int, help="Items per list in each minutes response")
+    args = parser.parse_args()
+
+    for name in ("latency", "latency_per_mb", "error_rate", "transcript_words", "minutes_items"):
+        value = getattr(args, name)
+        if value is not None:
+            os.environ[f"MOCK_{name.upper()}"] = str(value)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# benchmarks/run.py
+"""
+Load benchmark for the MemoMatic API against the local mock upstream.
+
+    python -m benchmarks.run --requests 50 --concurrency 10
+
+Starts the mock server and the backend as subprocesses, drives
+/v1/upload_audio, /v1/transcribe, /v1/generate_minutes and create_docx
+under concurrent load, and reports throughput, latency percentiles and the
+backend's peak memory. The backend keeps its state in a temporary directory
+(TEMP_DIR) that is removed afterwards, so runs never touch temp/.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Random noise WAV, every call returns different content so caches never hit"""
+    samples = (np.random.uniform(-0.3, 0.3, int(seconds * sample_rate)) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def client_address(i: int) -> str:
+    """A distinct client IP per benchmark request, sent as X-Forwarded-For"""
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def summarize(name: str, latencies: List[float], errors: int, wall: float) -> Dict:
+    return {
+        "scenario": name,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        args,
+        cwd=PROJECT_ROOT,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server for {url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def process_tree(pid: int) -> List[int]:
+    """pid and all its running descendants (Linux /proc)"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # the command name in parentheses can contain spaces, the parent pid follows it
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """
+    Peak resident memory of a running process and its descendants (uvicorn
+    workers, preprocessing pool), summed (Linux /proc). The peaks need not
+    have happened at the same time, so this is an upper bound.
+    """
+    total = None
+    for process in process_tree(pid) if os.path.isdir("/proc") else []:
+        try:
+            with open(f"/proc/{process}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total = (total or 0.0) + int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    return total
+
+
+async def run_scenario(name: str, total: int, concurrency: int, call: Callable) -> Dict:
+    """Run `total` calls of an async function with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call(i)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(name, latencies, errors, time.perf_counter() - started)
+
+
+async def benchmark_api(base_url: str, args) -> List[Dict]:
+    results = []
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=600.0, limits=limits) as client:
+        audio = [make_wav(args.audio_seconds) for _ in range(args.requests)]
+
+        async def upload(i: int) -> str:
+            response = await client.post(
+                "/v1/upload_audio", files={"file": (f"bench_{i}.wav", audio[i], "audio/wav")}
+            )
+            response.raise_for_status()
+            return response.json()["file_id"]
+
+        file_ids: Dict[int, str] = {}
+
+        async def upload_scenario(i: int):
+            file_ids[i] = await upload(i)
+
+        results.append(await run_scenario("upload_audio", args.requests, args.concurrency, upload_scenario))
+
+        async def transcribe(i: int):
+            # cycles are per IP, each request acts as its own client so sessions run concurrently
+            headers = {"X-Forwarded-For": client_address(i)}
+            session = await client.post("/v1/start-cycle", headers=headers)
+            session.raise_for_status()
+            response = await client.post(
+                f"/v1/transcribe/{file_ids[i]}",
+                params={"session_id": session.json()["session_id"]},
+                headers=headers,
+            )
+            response.raise_for_status()
+
+        results.append(await run_scenario("transcribe", len(file_ids), args.concurrency, transcribe))
+
+        transcript = " ".join(["meeting project budget timeline"] * args.transcript_words)
+
+        async def minutes(i: int):
+            response = await client.post(
+                "/v1/generate_minutes", json={"transcript": f"{i} {transcript}"}
+            )
+            response.raise_for_status()
+
+        results.append(await run_scenario("generate_minutes", args.requests, args.concurrency, minutes))
+    return results
+
+
+def benchmark_docx(args) -> Dict:
+    """create_docx in-process, using a thread pool for concurrency"""
+    sys.path.insert(0, PROJECT_ROOT)
+    from backend.app.services.document import create_docx, load_template
+
+    minutes = {
+        "title": "Benchmark Meeting",
+        "summary": "word " * 200,
+        "key_points": ["key point " * 10] * 5,
+        "action_items": ["action item " * 10] * 5,
+        "decisions": ["decision " * 10] * 5,
+    }
+    load_template()
+    latencies = []
+
+    def one(_):
+        started = time.perf_counter()
+        create_docx(minutes)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    return summarize("create_docx", latencies, 0, time.perf_counter() - started)
+
+
+def print_table(results: List[Dict], peak_mb: Optional[float]):
+    header = f"{'scenario':<18}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['scenario']:<18}{r['requests']:>9}{r['errors']:>8}{r['throughput_rps']:>9.2f}"
+            f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+        )
+    if peak_mb is not None:
+        print(f"\nbackend peak RSS (all processes): {peak_mb:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MemoMatic load benchmark")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--audio-seconds", type=float, default=30.0, help="Length of each generated WAV")
+    parser.add_argument("--transcript-words", type=int, default=500, help="Words in the minutes benchmark transcript")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock upstream latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock upstream error rate")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the backend")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    # the backend and the in-process docx benchmark keep their state here instead of temp/
+    temp_dir = tempfile.mkdtemp(prefix="memomatic-bench-")
+    os.environ["TEMP_DIR"] = temp_dir
+
+    try:
+        mock_port, api_port = free_port(), free_port()
+        mock = start_process(
+            [sys.executable, "-m", "uvicorn", "benchmarks.mock_server:app", "--port", str(mock_port), "--log-level", "warning"],
+            {"MOCK_LATENCY": str(args.latency), "MOCK_ERROR_RATE": str(args.error_rate)},
+        )
+        backend = start_process(
+            [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(api_port), "--log-level", "warning",
+             "--workers", str(args.workers),
+             # client addresses are taken from X-Forwarded-For, sent by the benchmark itself
+             "--proxy-headers", "--forwarded-allow-ips", "127.0.0.1"],
+            {
+                "MESOLITICA_API_URL": f"http://127.0.0.1:{mock_port}",
+                "MESOLITICA_API_KEY": "benchmark",
+                # every transcription is a cycle of its own client, no client should hit the limit
+                "RATE_LIMIT_BACKEND": "memory" if args.workers == 1 else "sqlite",
+                "RATE_LIMIT_MAX_DAILY_CYCLES": str(10 ** 9),
+                # in-process state isn't shared between workers
+                "JOB_BACKEND": "memory" if args.workers == 1 else "sqlite",
+            },
+        )
+
+        try:
+            wait_until_up(f"http://127.0.0.1:{mock_port}/", mock)
+            wait_until_up(f"http://127.0.0.1:{api_port}/", backend)
+            results = asyncio.run(benchmark_api(f"http://127.0.0.1:{api_port}", args))
+            peak_mb = peak_rss_mb(backend.pid)
+        finally:
+            backend.terminate()
+            mock.terminate()
+            backend.wait()
+            mock.wait()
+
+        if peak_mb is None:
+            # not on Linux, fall back to the largest child process seen so far
+            peak_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+            if sys.platform == "darwin":
+                peak_mb /= 1024
+
+        results.append(benchmark_docx(args))
+        print_table(results, peak_mb)
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"results": results, "backend_peak_rss_mb": peak_mb}, f, indent=2)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,164 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     MESOLITICA_API_URL: str = "https://api.mesolitica.com"
     MESOLITICA_API_KEY: str = ""
     
+    # shared state (caches, uploads, jobs, indexes) is kept here, empty uses temp/ in the project root
+    TEMP_DIR: str = ""
+    
+    # rate limiting: "sqlite" is shared by all workers, "memory" is per process
+    RATE_LIMIT_BACKEND: str = "sqlite"
+    RATE_LIMIT_MAX_DAILY_CYCLES: int = 3
+    RATE_LIMIT_WINDOW: int = 24 * 60 * 60
+    # an active cycle expires after this many seconds
+    RATE_LIMIT_SESSION_TTL: int = 6 * 60 * 60
+    RATE_LIMIT_PRUNE_INTERVAL: int = 10 * 60
+    
+    # shared upstream API client
+    API_TIMEOUT: float = 600.0
+    API_CONNECT_TIMEOUT: float = 10.0
+    API_MAX_CONNECTIONS: int = 20
+    API_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    API_KEEPALIVE_EXPIRY: float = 30.0
+    # maximum number of in-flight upstream calls per worker
+    API_MAX_CONCURRENCY: int = 8
+    
+    # upstream calls: timeout per attempt and total budget including retries (seconds)
+    UPSTREAM_TRANSCRIBE_TIMEOUT: float = 300.0
+    UPSTREAM_TRANSCRIBE_DEADLINE: float = 900.0
+    UPSTREAM_CHAT_TIMEOUT: float = 120.0
+    UPSTREAM_CHAT_DEADLINE: float = 300.0
+    # retries of chat calls, transcription uses TRANSCRIBE_CHUNK_RETRIES
+    UPSTREAM_MAX_RETRIES: int = 3
+    # exponential backoff with full jitter between retries (seconds)
+    UPSTREAM_BACKOFF_BASE: float = 0.5
+    UPSTREAM_BACKOFF_MAX: float = 10.0
+    # after this many consecutive failures calls fail fast until the reset timeout passes
+    UPSTREAM_CIRCUIT_FAILURES: int = 5
+    UPSTREAM_CIRCUIT_RESET: float = 30.0
+    # send a second chat request if the first hasn't answered after this many seconds, 0 disables
+    UPSTREAM_HEDGE_DELAY: float = 0.0
+    
+    # uploads are streamed to disk in chunks of this size (bytes)
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # maximum accepted upload size (bytes), enforced while streaming
+    MAX_UPLOAD_SIZE: int = 200 * 1024 * 1024
+    # unfinished chunked uploads are removed after this many seconds without a new chunk
+    UPLOAD_MAX_AGE: int = 24 * 60 * 60
+    
+    # content-addressed audio cache, evicted LRU once it exceeds this many bytes
+    FILE_CACHE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024
+    # files not accessed for this many seconds are removed
+    FILE_CACHE_MAX_AGE: int = 24 * 60 * 60
+    # how often the background eviction task runs (seconds)
+    FILE_CACHE_EVICTION_INTERVAL: int = 10 * 60
+    # files accessed this recently are kept over the size budget, so running transcriptions keep their audio,
+    # and staging files not written for this long are left over from a crash (seconds)
+    FILE_CACHE_EVICTION_GRACE: int = 60 * 60
+    
+    # long recordings are split at quiet points into chunks of about this length (seconds), only WAV is split,
+    # other formats only once PREPROCESS_AUDIO has decoded them
+    TRANSCRIBE_CHUNK_SECONDS: float = 300.0
+    # neighbouring chunks share this much audio so words at the cut aren't lost
+    TRANSCRIBE_CHUNK_OVERLAP_SECONDS: float = 2.0
+    # how far from the target cut to look for a silence (seconds)
+    TRANSCRIBE_SPLIT_SEARCH_SECONDS: float = 15.0
+    TRANSCRIBE_MAX_PARALLEL_CHUNKS: int = 4
+    TRANSCRIBE_CHUNK_RETRIES: int = 2
+    
+    # optionally downmix audio to mono, resample it and trim leading/trailing silence before transcription,
+    # other formats than WAV are decoded with ffmpeg
+    PREPROCESS_AUDIO: bool = False
+    PREPROCESS_SAMPLE_RATE: int = 16000
+    # frames quieter than this (dBFS) count as silence when trimming
+    PREPROCESS_SILENCE_DB: float = -45.0
+    # silence kept before and after the trimmed audio (seconds)
+    PREPROCESS_TRIM_PAD_SECONDS: float = 0.25
+    # encode audio sent to the ASR with ffmpeg ("flac", "opus" or "mp3"), empty sends 16-bit WAV
+    PREPROCESS_CODEC: str = ""
+    PREPROCESS_WORKERS: int = 2
+    
+    # only transcribe speech regions found by energy-based voice activity detection, speakers quieter than
+    # VAD_MIN_SPEECH_DB or close to the noise floor can be dropped, so it is off by default
+    VAD_ENABLED: bool = False
+    # frames this much louder than the noise floor count as speech (dB)
+    VAD_MARGIN_DB: float = 12.0
+    # frames quieter than this never count as speech (dBFS)
+    VAD_MIN_SPEECH_DB: float = -50.0
+    # pauses shorter than this stay inside a speech segment (seconds)
+    VAD_MIN_SILENCE_SECONDS: float = 0.6
+    # speech shorter than this is dropped as noise (seconds)
+    VAD_MIN_SPEECH_SECONDS: float = 0.3
+    VAD_PAD_SECONDS: float = 0.2
+    
+    # label transcript segments by speaker, clustering MFCC statistics of the speech regions, needs VAD_ENABLED
+    DIARIZATION_ENABLED: bool = False
+    # speech is described by sliding windows of this length and hop (seconds)
+    DIARIZATION_WINDOW_SECONDS: float = 1.5
+    DIARIZATION_HOP_SECONDS: float = 0.75
+    # clusters closer than this (cosine distance) are the same speaker
+    DIARIZATION_THRESHOLD: float = 0.075
+    DIARIZATION_MAX_SPEAKERS: int = 8
+    # shorter speaker turns are attributed to the previous speaker (seconds)
+    DIARIZATION_MIN_TURN_SECONDS: float = 1.0
+    
+    # transcripts longer than this (estimated tokens) are summarized map-reduce style
+    MINUTES_MAP_REDUCE_THRESHOLD_TOKENS: int = 12000
+    # size of each transcript part in the map step (estimated tokens)
+    MINUTES_CHUNK_TOKENS: int = 4000
+    MINUTES_MAX_PARALLEL_REQUESTS: int = 4
+    # fields missing from the model's minutes are asked for in a short follow-up request
+    MINUTES_REASK_ENABLED: bool = True
+    MINUTES_REASK_MAX_TOKENS: int = 512
+    # identical minutes requests (transcript, model, prompts, sampling) are answered from a cache
+    MINUTES_CACHE_ENABLED: bool = True
+    MINUTES_CACHE_TTL: int = 7 * 24 * 60 * 60
+    MINUTES_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    
+    # optional styled .docx used as the base of every generated document
+    DOCX_TEMPLATE_PATH: str = ""
+    # processes rendering large batch exports, 0 uses one per CPU
+    RENDER_WORKERS: int = 0
+    
+    # generated minutes and documents are kept this many seconds
+    ARTIFACT_TTL: int = 24 * 60 * 60
+    
+    # background jobs: "sqlite" survives restarts and is shared by workers, "memory" is per process
+    JOB_BACKEND: str = "sqlite"
+    JOB_WORKERS: int = 2
+    # on shutdown running jobs get this long to finish before they are requeued (seconds)
+    JOB_DRAIN_TIMEOUT: float = 30.0
+    # running jobs are marked alive this often, a job not marked for JOB_STALE_SECONDS is requeued
+    JOB_HEARTBEAT_INTERVAL: float = 15.0
+    JOB_STALE_SECONDS: float = 120.0
+    # completed and failed jobs, with their results, are deleted after this many seconds
+    JOB_TTL: int = 24 * 60 * 60
+    
+    # transcripts are cached by audio hash, model and response format
+    TRANSCRIPT_CACHE_TTL: int = 7 * 24 * 60 * 60
+    TRANSCRIPT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    
+    # generated minutes and their transcripts are indexed for /v1/search
+    SEARCH_ENABLED: bool = True
+    # transcripts are indexed as passages of this many words
+    SEARCH_PASSAGE_WORDS: int = 60
+    # blend in hashed n-gram vectors, they also answer queries without word matches
+    SEARCH_VECTORS: bool = True
+    SEARCH_VECTOR_DIM: int = 1024
+    SEARCH_VECTOR_WEIGHT: float = 0.3
+    SEARCH_MIN_SIMILARITY: float = 0.2
+    # terms with more posting blocks than this are merged during maintenance
+    SEARCH_COMPACT_BLOCKS: int = 64
+    
+    @model_validator(mode="after")
+    def _check_diarization(self):
+        # speakers are only looked for in the speech regions found by the VAD
+        if self.DIARIZATION_ENABLED and not self.VAD_ENABLED:
+            raise ValueError("DIARIZATION_ENABLED requires VAD_ENABLED")
+        return self
+    
     class Config:
         env_file = ".env"
         
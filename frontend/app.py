@@ -1,6 +1,6 @@
 import streamlit as st
 import requests
-import os
+import hashlib
 import json
 from utils.style_utils import load_css
 
@@ -10,14 +10,8 @@ class FileState:
         self.path = None
         self.name = None
         self.size = None
-
-# get the absolute path to the project root directory
-PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-TEMP_DIR = os.path.join(PROJECT_ROOT, "temp")
-
-# create a temp directory if it does not exist
-if not os.path.exists(TEMP_DIR):
-    os.makedirs(TEMP_DIR)
+        self.file_id = None
+        self.sha256 = None
 
 API_BASE_URL = "http://localhost:8000/v1"
 
@@ -30,6 +24,9 @@ load_css()
 # initialize session state
 if 'transcript' not in st.session_state:
     st.session_state.transcript = None
+# id of the transcript stored by the API, minutes are requested by id instead of sending the text back
+if 'transcript_id' not in st.session_state:
+    st.session_state.transcript_id = None
 if 'active_session' not in st.session_state:
     st.session_state.active_session = None
 if 'file_state' not in st.session_state:
@@ -101,6 +98,29 @@ def start_new_cycle():
         st.error(f"Error starting new cycle: {str(e)}")
         return None
     
+def hash_upload(audio_file, chunk_size=1024 * 1024):
+    """Compute the sha256 of an uploaded file chunk by chunk"""
+    hasher = hashlib.sha256()
+    audio_file.seek(0)
+    for chunk in iter(lambda: audio_file.read(chunk_size), b""):
+        hasher.update(chunk)
+    audio_file.seek(0)
+    return hasher.hexdigest()
+
+def check_server_copy(audio_file, digest):
+    """Ask the backend whether it already has this content, returns the file_id or None"""
+    try:
+        response = requests.post(
+            f"{API_BASE_URL}/uploads/check",
+            json={"filename": audio_file.name, "size": audio_file.size, "sha256": digest}
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result["file_id"] if result["exists"] else None
+    except requests.exceptions.RequestException:
+        # the handshake is only an optimization, fall back to uploading
+        return None
+
 def handle_file_upload(audio_file):
     """Handle file upload with caching"""
     if audio_file is None:
@@ -114,18 +134,24 @@ def handle_file_upload(audio_file):
         current_state.size == audio_file.size):
         return True
         
-    # New file needs to be uploaded
+    # New file needs to be uploaded, unless the server already has its content
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/upload_audio",
-            files={"file": audio_file}
-        )
-        response.raise_for_status()
+        digest = hash_upload(audio_file)
+        file_id = check_server_copy(audio_file, digest)
+        if file_id is None:
+            response = requests.post(
+                f"{API_BASE_URL}/upload_audio",
+                files={"file": audio_file}
+            )
+            response.raise_for_status()
+            file_id = response.json()["file_id"]
         
         # Update file state
         current_state.uploaded = True
         current_state.name = audio_file.name
         current_state.size = audio_file.size
+        current_state.sha256 = digest
+        current_state.file_id = file_id
         
         return True
         
@@ -134,19 +160,106 @@ def handle_file_upload(audio_file):
         current_state.uploaded = False
         current_state.name = None
         current_state.size = None
+        current_state.sha256 = None
+        current_state.file_id = None
         return False
 
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a Server-Sent Events response"""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+def format_timestamp(seconds):
+    """Format seconds as mm:ss"""
+    if seconds is None:
+        return "--:--"
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+
+def stream_transcript(file_id):
+    """Stream transcript segments from the API, rendering them as they arrive. Returns (transcript, transcript_id)"""
+    status = st.empty()
+    placeholder = st.empty()
+    lines = []
+    
+    status.info("Transcribing audio... text will appear as it is recognized.")
+    with requests.get(
+        f"{API_BASE_URL}/transcribe/{file_id}/stream",
+        params={"session_id": st.session_state.active_session},
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        for event, data in iter_sse_events(response):
+            if event == "segment":
+                if data["text"]:
+                    lines.append(f"`{format_timestamp(data['start'])}` {data['text']}")
+                    placeholder.markdown("\n\n".join(lines))
+                status.info(f"Transcribing audio... {data['index'] + 1}/{data['total']} parts done.")
+            elif event == "done":
+                status.empty()
+                placeholder.empty()
+                return data["transcript"], data.get("transcript_id")
+            elif event == "error":
+                status.empty()
+                raise requests.exceptions.RequestException(data["detail"])
+    
+    raise requests.exceptions.RequestException("Transcription stream ended unexpectedly")
+
+def stream_minutes(regenerate=False):
+    """
+    Stream minutes from the API, rendering each section as soon as it is complete.
+    Unless regenerate is set, minutes already generated for this transcript come from the server's cache.
+    """
+    placeholder = st.empty()
+    partial = {}
+    
+    if st.session_state.transcript_id:
+        body = {"transcript_id": st.session_state.transcript_id}
+    else:
+        body = {"transcript": st.session_state.transcript}
+    
+    with requests.post(
+        f"{API_BASE_URL}/generate_minutes/stream",
+        json={**body, "session_id": st.session_state.active_session, "regenerate": regenerate},
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        for event, data in iter_sse_events(response):
+            if event == "section":
+                if data["type"] == "item":
+                    partial.setdefault(data["key"], []).append(data["value"])
+                else:
+                    partial[data["key"]] = data["value"]
+                with placeholder.container():
+                    display_minutes(partial)
+            elif event == "done":
+                placeholder.empty()
+                return data
+            elif event == "error":
+                placeholder.empty()
+                raise requests.exceptions.RequestException(data["detail"])
+    
+    raise requests.exceptions.RequestException("Minutes stream ended unexpectedly")
+
 def display_minutes(minutes_data):
     """Display formatted minutes"""
     st.markdown("---")
-    st.markdown(f"<h1 class='minutes-title'>{minutes_data['title']}</h1>",
+    st.markdown(f"<h1 class='minutes-title'>{minutes_data.get('title', 'Meeting Minutes')}</h1>",
                 unsafe_allow_html=True)
     
     # Summary
-    st.markdown("<h2 class='section-title'>Summary</h2>", 
-                unsafe_allow_html=True)
-    st.markdown(f"<div class='summary-section'>{minutes_data['summary']}</div>", 
-                unsafe_allow_html=True)
+    if minutes_data.get('summary'):
+        st.markdown("<h2 class='section-title'>Summary</h2>", 
+                    unsafe_allow_html=True)
+        st.markdown(f"<div class='summary-section'>{minutes_data['summary']}</div>", 
+                    unsafe_allow_html=True)
     
     # Key Points
     if minutes_data.get('key_points'):
@@ -195,63 +308,51 @@ if audio_file:
             cycle_data = start_new_cycle()
             
             if cycle_data:
-                with st.spinner("Transcribing audio... This may take a few minutes."):
-                    try:
-                        response = requests.post(
-                            f"{API_BASE_URL}/transcribe/{audio_file.name}",
-                            params={"session_id": st.session_state.active_session}
-                        )
-                        response.raise_for_status()
-                        st.session_state.transcript = response.json()["transcript"]
-                        st.success("Transcription completed!")
+                try:
+                    st.session_state.transcript, st.session_state.transcript_id = stream_transcript(
+                        st.session_state.file_state.file_id
+                    )
+                    st.success("Transcription completed!")
                         
-                    except requests.exceptions.RequestException as e:
-                        st.error(f"Error during transcription: {str(e)}")
-                        st.session_state.active_session = None
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Error during transcription: {str(e)}")
+                    st.session_state.active_session = None
         
         # Show transcription and generate minutes if available
         if st.session_state.transcript:
             with st.expander("View Transcription"):
                 st.write(st.session_state.transcript)
             
-            # Generate minutes button
-            if st.button("📝 Generate Minutes", key="generate_minutes"):
-                with st.spinner("Generating Minutes... Please wait."):
-                    try:
-                        response = requests.post(
-                            f"{API_BASE_URL}/generate_minutes",
-                            json={
-                                "transcript": st.session_state.transcript,
-                                "session_id": st.session_state.active_session
-                            }
-                        )
-                        response.raise_for_status()
-                        minutes_content = response.json()["minutes"]
+            # Generate minutes button, regenerate asks the model again instead of reusing earlier minutes
+            col1, col2 = st.columns(2)
+            with col1:
+                generate_clicked = st.button("📝 Generate Minutes", key="generate_minutes")
+            with col2:
+                regenerate_clicked = st.button("🔄 Regenerate", key="regenerate_minutes")
+            
+            if generate_clicked or regenerate_clicked:
+                try:
+                    # sections are rendered while the model is still writing
+                    result = stream_minutes(regenerate=regenerate_clicked)
+                    if result.get("cache_hit"):
+                        st.info("♻️ These minutes were generated earlier for this transcript and didn't use any generation capacity. Click Regenerate for a new version.")
+                    display_minutes(result["minutes_data"])
+                    
+                    # Download button, the document is fetched from the API for this minutes id
+                    docx_response = requests.get(
+                        f"{API_BASE_URL}/minutes/{result['minutes_id']}/docx"
+                    )
+                    docx_response.raise_for_status()
+                    st.download_button(
+                        label="📄 Download Minutes",
+                        data=docx_response.content,
+                        file_name="meeting_minutes.docx",
+                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                        key="download_btn"
+                    )
                         
-                        try:
-                            # Parse and display minutes
-                            minutes_data = json.loads(minutes_content)
-                            display_minutes(minutes_data)
-                            
-                            # Download button
-                            docx_path = os.path.join(TEMP_DIR, "minutes.docx")
-                            if os.path.exists(docx_path):
-                                with open(docx_path, "rb") as docx_file:
-                                    st.download_button(
-                                        label="📄 Download Minutes",
-                                        data=docx_file,
-                                        file_name="meeting_minutes.docx",
-                                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                        key="download_btn"
-                                    )
-                            else:
-                                st.error("Error: Generated document not found.")
-                                
-                        except json.JSONDecodeError:
-                            st.write(minutes_content)
-                            
-                    except requests.exceptions.RequestException as e:
-                        st.error(f"Error generating minutes: {str(e)}")
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Error generating minutes: {str(e)}")
         
         
 # sidebar
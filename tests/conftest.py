@@ -0,0 +1,23 @@
+# tests/conftest.py
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+# set before the services are imported, they create their databases under TEMP_DIR
+_temp_dir = tempfile.mkdtemp(prefix="memomatic-test-")
+os.environ["TEMP_DIR"] = _temp_dir
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_temp_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def temp_dir(tmp_path):
+    return str(tmp_path)
@@ -0,0 +1,26 @@
+# tests/test_audio.py
+from backend.app.services.audio import merge_overlap
+
+
+def test_drops_repeated_words():
+    assert merge_overlap("we agreed on the budget", "on the budget and hiring", 5) == "and hiring"
+
+
+def test_ignores_case_and_punctuation():
+    assert merge_overlap("Send it to Aisyah.", "aisyah, by Friday", 5) == "by Friday"
+
+
+def test_longest_overlap_wins():
+    assert merge_overlap("a b a b", "a b a b c", 10) == "c"
+
+
+def test_no_overlap():
+    assert merge_overlap("first part", "second part here", 5) == "second part here"
+
+
+def test_overlap_limited_to_max_words():
+    assert merge_overlap("one two three", "one two three four", 2) == "one two three four"
+
+
+def test_empty_previous():
+    assert merge_overlap("", "hello there", 5) == "hello there"
@@ -0,0 +1,95 @@
+# tests/test_file_cache.py
+import os
+import time
+
+import pytest
+
+from backend.app.services.file_cache import FileCache
+
+
+@pytest.fixture
+def cache(temp_dir):
+    return FileCache(os.path.join(temp_dir, "blobs"), os.path.join(temp_dir, "index.db"), max_bytes=10, grace=0)
+
+
+def stage(cache: FileCache, content: bytes, name: str = "audio.wav") -> str:
+    path = cache.temp_path(name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def age(cache: FileCache, digest: str, seconds: float):
+    cache._db.execute("UPDATE blobs SET last_access = last_access - ? WHERE digest = ?", (seconds, digest))
+
+
+def test_deduplicates(cache):
+    first = cache.add_file("a.wav", stage(cache, b"same"))
+    second = cache.add_file("b.wav", stage(cache, b"same"))
+    assert first == second
+    assert cache.get_file_path("b.wav") == cache.get_file_path(first)
+    assert cache.total_bytes() == 4
+
+
+def test_evicts_least_recently_used(cache):
+    old = cache.add_file("old.wav", stage(cache, b"123456"))
+    age(cache, old, 10)
+    new = cache.add_file("new.wav", stage(cache, b"abcdef"))
+    assert cache.get_file_path(old) is None
+    assert cache.get_file_path("old.wav") is None
+    assert cache.get_file_path(new) is not None
+
+
+def test_recently_used_files_are_kept(cache):
+    cache.grace = 60
+    first = cache.add_file("first.wav", stage(cache, b"123456"))
+    second = cache.add_file("second.wav", stage(cache, b"abcdef"))
+    # both may be in use, the budget is exceeded rather than deleting one
+    assert cache.get_file_path(first) is not None
+    assert cache.get_file_path(second) is not None
+
+    age(cache, first, 120)
+    cache.evict()
+    assert cache.get_file_path(first) is None
+    assert cache.get_file_path(second) is not None
+
+
+def test_derived_files_removed_with_source(cache):
+    cache.max_bytes = 100
+    source = cache.add_file("a.wav", stage(cache, b"source"))
+    derived = cache.add_derived(source, "preprocess", stage(cache, b"derived", "a.wav"), {"offset": 1.0})
+    cache.add_derived(source, "vad", None, {"segments": []})
+    derived_path, meta = cache.get_derived(source, "preprocess")
+    assert meta == {"offset": 1.0}
+
+    # only the source is old, its preprocessed copy goes with it
+    age(cache, source, 10)
+    cache.clean_old_files(5)
+    assert cache.get_file_path(source) is None
+    assert cache.get_file_path(derived) is None
+    assert not os.path.exists(derived_path)
+    assert cache.total_bytes() == 0
+
+
+def test_shared_derived_file_is_kept(cache):
+    cache.max_bytes = 100
+    first = cache.add_file("a.wav", stage(cache, b"first"))
+    second = cache.add_file("b.wav", stage(cache, b"second"))
+    # both sources preprocess to the same content
+    derived = cache.add_derived(first, "preprocess", stage(cache, b"derived"))
+    cache.add_derived(second, "preprocess", stage(cache, b"derived"))
+
+    age(cache, first, 10)
+    cache.clean_old_files(5)
+    assert cache.get_derived(second, "preprocess") is not None
+    assert cache.get_file_path(derived) is not None
+
+
+def test_clean_staging(cache):
+    abandoned = stage(cache, b"partial")
+    old = time.time() - 120
+    os.utime(abandoned, (old, old))
+    current = stage(cache, b"partial", "b.wav")
+    cache.clean_staging(60)
+    assert not os.path.exists(abandoned)
+    assert os.path.exists(current)
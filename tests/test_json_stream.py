@@ -0,0 +1,91 @@
+# tests/test_json_stream.py
+import json
+
+from backend.app.services.json_stream import IncrementalJSONParser
+
+MINUTES = {
+    "title": "Weekly sync",
+    "summary": "Budget, \"hiring\" and {plans}.",
+    "key_points": ["first", "second, with a comma"],
+    "action_items": [{"task": "Send it", "owner": "Aisyah"}],
+    "decisions": [],
+}
+
+
+def feed_all(parser, text, size):
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return events
+
+
+def test_events_in_order():
+    parser = IncrementalJSONParser()
+    events = parser.feed(json.dumps(MINUTES))
+    assert events == [
+        ("field", "title", "Weekly sync"),
+        ("field", "summary", "Budget, \"hiring\" and {plans}."),
+        ("item", "key_points", "first"),
+        ("item", "key_points", "second, with a comma"),
+        ("item", "action_items", {"task": "Send it", "owner": "Aisyah"}),
+    ]
+    assert parser.done and not parser.failed
+    assert parser.value == MINUTES
+
+
+def test_chunking_does_not_change_events():
+    text = "```json\n" + json.dumps(MINUTES, indent=2) + "\n```"
+    expected = IncrementalJSONParser().feed(text)
+    for size in (1, 2, 7):
+        parser = IncrementalJSONParser()
+        assert feed_all(parser, text, size) == expected
+        assert parser.value == MINUTES
+
+
+def test_prose_before_object():
+    parser = IncrementalJSONParser()
+    events = feed_all(parser, 'Fill in {name} and {date}: {"title": "Sync"}', 3)
+    assert events == [("field", "title", "Sync")]
+    assert parser.value == {"title": "Sync"}
+
+
+def test_scalar_values():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"a": 1, "b": true, "c": null, "d": {"x": [1, 2]}}')
+    assert events == [
+        ("field", "a", 1),
+        ("field", "b", True),
+        ("field", "c", None),
+        ("field", "d", {"x": [1, 2]}),
+    ]
+
+
+def test_python_dict_is_not_an_object():
+    parser = IncrementalJSONParser()
+    assert parser.feed("{'title': 'Sync', 'summary': 'x'}") == []
+    assert not parser.done
+    assert parser.value is None
+
+
+def test_single_quoted_key_fails():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"title": "Sync", \'summary\': \'x\'}')
+    assert events == [("field", "title", "Sync")]
+    assert parser.done and parser.failed
+    assert parser.value is None
+    # nothing after a failure is reported
+    assert parser.feed('{"title": "Sync"}') == []
+
+
+def test_value_without_key_fails():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"title": "Sync", "stray"}')
+    assert events == [("field", "title", "Sync")]
+    assert parser.failed
+
+
+def test_incomplete_stream():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"title": "Sync", "key_points": ["first", "sec')
+    assert events == [("field", "title", "Sync"), ("item", "key_points", "first")]
+    assert not parser.done
@@ -0,0 +1,90 @@
+# tests/test_minutes_schema.py
+from backend.app.services.minutes_schema import extract_json, missing_fields, validate_minutes
+
+
+def test_plain_json():
+    data, repairs = extract_json('{"title": "Weekly sync", "key_points": ["a"]}')
+    assert data == {"title": "Weekly sync", "key_points": ["a"]}
+    assert repairs == []
+
+
+def test_code_fence():
+    data, repairs = extract_json('Here you go:\n```json\n{"title": "Sync"}\n```\nThanks')
+    assert data == {"title": "Sync"}
+    assert repairs == ["fence"]
+
+
+def test_extracted_from_prose():
+    data, repairs = extract_json('Sure! {"title": "Sync"} Let me know.')
+    assert data == {"title": "Sync"}
+    assert repairs == ["extracted"]
+
+
+def test_prose_braces_are_skipped():
+    data, repairs = extract_json('Replace {name} with yours: {"title": "Sync"}')
+    assert data == {"title": "Sync"}
+    assert repairs == ["extracted"]
+
+
+def test_trailing_comma():
+    data, repairs = extract_json('{"title": "Sync", "decisions": ["a", "b",],}')
+    assert data == {"title": "Sync", "decisions": ["a", "b"]}
+    assert repairs == ["trailing_comma"]
+
+
+def test_truncated():
+    data, repairs = extract_json('{"title": "Sync", "key_points": ["first", "sec')
+    assert data == {"title": "Sync", "key_points": ["first", "sec"]}
+    assert repairs == ["truncated"]
+
+
+def test_truncated_dangling_key():
+    data, repairs = extract_json('{"title": "Sync", "summary"')
+    assert data == {"title": "Sync"}
+    assert repairs == ["truncated"]
+
+
+def test_python_literal():
+    data, repairs = extract_json("{'title': 'Sync', 'decisions': None}")
+    assert data == {"title": "Sync", "decisions": None}
+    assert repairs == ["python_literal"]
+
+
+def test_raw_newline_in_string():
+    data, repairs = extract_json('{"summary": "line one\nline two"}')
+    assert data == {"summary": "line one\nline two"}
+    assert repairs == []
+
+
+def test_no_json():
+    assert extract_json("I could not produce minutes for this meeting.") == (None, [])
+
+
+def test_validate_coerces_values():
+    minutes = validate_minutes({
+        "minutes": {
+            "Title": ["Weekly", "sync"],
+            "keyPoints": "- first\n- second\n",
+            "action-items": [{"task": "Send the budget", "owner": "Aisyah"}],
+            "decisions": None,
+        }
+    })
+    assert minutes == {
+        "title": "Weekly sync",
+        "summary": "",
+        "key_points": ["first", "second"],
+        "action_items": ["Send the budget - Aisyah"],
+        "decisions": [],
+    }
+
+
+def test_validate_defaults():
+    minutes = validate_minutes({})
+    assert minutes["title"] == "Meeting Minutes"
+    assert minutes["key_points"] == []
+
+
+def test_missing_fields():
+    assert missing_fields({"title": " ", "Key Points": [], "decisions": []}) == [
+        "title", "summary", "action_items"
+    ]
@@ -0,0 +1,85 @@
+# tests/test_rate_limiter.py
+import os
+
+import pytest
+
+from backend.app.services.rate_limiter import (
+    MemoryRateLimitBackend,
+    RateLimitBackend,
+    RateLimiter,
+    SQLiteRateLimitBackend,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, temp_dir):
+    if request.param == "memory":
+        return MemoryRateLimitBackend()
+    return SQLiteRateLimitBackend(os.path.join(temp_dir, "rate_limit.db"))
+
+
+def test_acquire_until_limit(backend):
+    for i in range(3):
+        allowed, usage, session_id = backend.acquire("1.1.1.1", 100.0 + i, 3, 60)
+        assert allowed
+        assert usage == [100.0 + j for j in range(i + 1)]
+        assert session_id == f"1.1.1.1_{100.0 + i}"
+
+    allowed, usage, session_id = backend.acquire("1.1.1.1", 110.0, 3, 60)
+    assert not allowed
+    assert usage == [100.0, 101.0, 102.0]
+    assert session_id is None
+
+    # other IPs have their own limit
+    assert backend.acquire("2.2.2.2", 110.0, 3, 60)[0]
+
+
+def test_window_slides(backend):
+    for i in range(3):
+        backend.acquire("1.1.1.1", 100.0 + i, 3, 60)
+    assert not backend.acquire("1.1.1.1", 159.0, 3, 60)[0]
+    # the first cycle has left the window
+    allowed, usage, _ = backend.acquire("1.1.1.1", 160.0, 3, 60)
+    assert allowed
+    assert usage == [101.0, 102.0, 160.0]
+
+
+def test_status_and_session_expiry(backend):
+    assert backend.status("1.1.1.1", 100.0, 60, 10) == ([], None)
+    backend.acquire("1.1.1.1", 100.0, 3, 60)
+    assert backend.status("1.1.1.1", 105.0, 60, 10) == ([100.0], "1.1.1.1_100.0")
+    assert backend.status("1.1.1.1", 110.0, 60, 10) == ([100.0], None)
+
+
+def test_prune(backend):
+    backend.acquire("1.1.1.1", 100.0, 3, 60)
+    backend.acquire("2.2.2.2", 150.0, 3, 60)
+    backend.prune(170.0, 60, 10)
+    assert backend.status("1.1.1.1", 170.0, 60, 10) == ([], None)
+    assert backend.status("2.2.2.2", 170.0, 60, 10) == ([150.0], None)
+
+
+def test_rate_limiter(backend):
+    limiter = RateLimiter(backend)
+    limiter.max_daily_cycles = 2
+
+    status = limiter.check_status("1.1.1.1")
+    assert status["cycles_remaining"] == 2
+    assert not status["active_cycle"]
+
+    allowed, info = limiter.start_cycle("1.1.1.1")
+    assert allowed
+    assert info["cycles_remaining"] == 1
+    assert info["session_id"].startswith("1.1.1.1_")
+    assert limiter.check_status("1.1.1.1")["session_id"] == info["session_id"]
+
+    assert limiter.start_cycle("1.1.1.1")[0]
+    allowed, info = limiter.start_cycle("1.1.1.1")
+    assert not allowed
+    assert info["cycles_remaining"] == 0
+    assert 0 < info["time_remaining_seconds"] <= limiter.time_window
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
@@ -0,0 +1,150 @@
+# tests/test_resilience.py
+import asyncio
+
+import httpx
+import pytest
+
+from backend.app.services import clients
+from backend.app.services.resilience import (
+    CircuitBreaker,
+    RetryPolicy,
+    UpstreamError,
+    UpstreamTimeoutError,
+    UpstreamUnavailableError,
+    resilient_call,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_semaphore(monkeypatch):
+    # the slot semaphore is bound to the event loop of the test that created it
+    monkeypatch.setattr(clients, "_semaphore", None)
+
+
+def policy(max_retries=2, attempt_timeout=1.0, deadline=5.0):
+    return RetryPolicy(
+        max_retries=max_retries,
+        attempt_timeout=attempt_timeout,
+        deadline=deadline,
+        backoff_base=0.0,
+        backoff_max=0.0,
+    )
+
+
+class Flaky:
+    """Fails with the given errors, then returns "ok" """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_breaker_opens_and_recovers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("backend.app.services.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30.0)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.retry_after() == 30.0
+
+    now[0] += 30.0
+    # half-open: one trial call at a time
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.retry_after() == 0.0
+
+
+def test_failed_trial_reopens(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("backend.app.services.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    now[0] += 30.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_retries_transient_errors():
+    call = Flaky(httpx.ConnectError("refused"), asyncio.TimeoutError())
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30.0)
+    assert asyncio.run(resilient_call(call, "test", policy(), breaker)) == "ok"
+    assert call.calls == 3
+
+
+def test_gives_up_after_max_retries():
+    call = Flaky(*[httpx.ConnectError("refused")] * 3)
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30.0)
+    with pytest.raises(UpstreamError, match="test failed"):
+        asyncio.run(resilient_call(call, "test", policy(max_retries=1), breaker))
+    assert call.calls == 2
+
+
+def test_does_not_retry_other_errors():
+    call = Flaky(ValueError("bad request"))
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30.0)
+    with pytest.raises(UpstreamError):
+        asyncio.run(resilient_call(call, "test", policy(), breaker))
+    assert call.calls == 1
+    # the upstream answered, so the breaker stays closed
+    assert breaker.allow()
+
+
+def test_attempt_timeout():
+    async def slow():
+        await asyncio.sleep(1)
+
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30.0)
+    with pytest.raises(UpstreamTimeoutError):
+        asyncio.run(resilient_call(slow, "test", policy(max_retries=0, attempt_timeout=0.05), breaker))
+
+
+def test_open_breaker_fails_fast():
+    call = Flaky(*[httpx.ConnectError("refused")] * 3)
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30.0)
+    with pytest.raises(UpstreamUnavailableError) as error:
+        asyncio.run(resilient_call(call, "test", policy(), breaker))
+    assert call.calls == 2
+    assert error.value.retry_after > 0
+
+
+def test_slot_timeout_is_not_a_failure(monkeypatch):
+    monkeypatch.setattr(clients.settings, "API_MAX_CONCURRENCY", 1)
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30.0)
+    call = Flaky()
+
+    async def run():
+        async with clients.upstream_slot("test"):
+            await resilient_call(call, "test", policy(deadline=0.05), breaker)
+
+    with pytest.raises(UpstreamTimeoutError, match="free upstream slot"):
+        asyncio.run(run())
+    assert call.calls == 0
+    assert breaker.allow()
+
+
+def test_hedged_call_wins():
+    calls = []
+
+    async def call():
+        calls.append(None)
+        # the first request hangs, the hedged one answers
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+        return len(calls)
+
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30.0)
+    result = asyncio.run(resilient_call(call, "test", policy(), breaker, hedge_delay=0.01))
+    assert result == 2
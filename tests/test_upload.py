@@ -0,0 +1,115 @@
+# tests/test_upload.py
+import asyncio
+import io
+import os
+
+import pytest
+
+from backend.app.services.upload import (
+    UploadManager,
+    UploadNotFoundError,
+    UploadOffsetError,
+    UploadTooLargeError,
+    save_upload,
+)
+
+
+class FakeUploadFile:
+    """The part of an UploadFile that save_upload reads"""
+
+    def __init__(self, data: bytes):
+        self._file = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+@pytest.fixture
+def manager(temp_dir):
+    return UploadManager(os.path.join(temp_dir, "uploads"))
+
+
+def test_save_upload(temp_dir):
+    dest = os.path.join(temp_dir, "audio.wav")
+    size, digest = asyncio.run(save_upload(FakeUploadFile(b"abc"), dest))
+    assert size == 3
+    assert digest == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+    assert os.listdir(temp_dir) == ["audio.wav"]
+
+
+def test_save_upload_too_large(temp_dir):
+    dest = os.path.join(temp_dir, "audio.wav")
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(save_upload(FakeUploadFile(b"x" * 10), dest, max_size=5))
+    # neither the destination nor the part file is left behind
+    assert os.listdir(temp_dir) == []
+
+
+def test_append_and_complete(manager, temp_dir):
+    state = manager.create("meeting.wav", total_size=6)
+    upload_id = state["upload_id"]
+    assert state["offset"] == 0
+
+    assert asyncio.run(manager.append(upload_id, 0, chunks(b"abc")))["offset"] == 3
+    assert manager.status(upload_id)["offset"] == 3
+    assert asyncio.run(manager.append(upload_id, 3, chunks(b"de", b"f")))["offset"] == 6
+
+    dest = os.path.join(temp_dir, "meeting.wav")
+    assert asyncio.run(manager.complete(upload_id, dest))["offset"] == 6
+    with open(dest, "rb") as f:
+        assert f.read() == b"abcdef"
+    with pytest.raises(UploadNotFoundError):
+        manager.status(upload_id)
+
+
+def test_append_offset_mismatch(manager):
+    upload_id = manager.create("meeting.wav")["upload_id"]
+    asyncio.run(manager.append(upload_id, 0, chunks(b"abc")))
+    with pytest.raises(UploadOffsetError, match="Expected offset 3, got 0"):
+        asyncio.run(manager.append(upload_id, 0, chunks(b"abc")))
+    assert manager.status(upload_id)["offset"] == 3
+
+
+def test_append_overflow_truncates(manager):
+    upload_id = manager.create("meeting.wav", total_size=5)["upload_id"]
+    asyncio.run(manager.append(upload_id, 0, chunks(b"abc")))
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(manager.append(upload_id, 3, chunks(b"de", b"fg")))
+    # the rejected chunk is dropped, the upload resumes from the last good offset
+    assert manager.status(upload_id)["offset"] == 3
+    assert asyncio.run(manager.append(upload_id, 3, chunks(b"de")))["offset"] == 5
+
+
+def test_concurrent_append_rejected(manager):
+    upload_id = manager.create("meeting.wav")["upload_id"]
+    lock_file = manager._lock(upload_id)
+    try:
+        with pytest.raises(UploadOffsetError, match="Another request"):
+            asyncio.run(manager.append(upload_id, 0, chunks(b"abc")))
+    finally:
+        lock_file.close()
+    assert asyncio.run(manager.append(upload_id, 0, chunks(b"abc")))["offset"] == 3
+
+
+def test_complete_incomplete_upload(manager, temp_dir):
+    upload_id = manager.create("meeting.wav", total_size=6)["upload_id"]
+    asyncio.run(manager.append(upload_id, 0, chunks(b"abc")))
+    dest = os.path.join(temp_dir, "meeting.wav")
+    with pytest.raises(UploadOffsetError, match="3 of 6 bytes"):
+        asyncio.run(manager.complete(upload_id, dest))
+    assert not os.path.exists(dest)
+    assert manager.status(upload_id)["offset"] == 3
+
+
+def test_unknown_upload(manager):
+    with pytest.raises(UploadNotFoundError):
+        manager.status("not-an-id")
+    with pytest.raises(UploadNotFoundError):
+        manager.status("0" * 32)
+    with pytest.raises(UploadTooLargeError):
+        manager.create("meeting.wav", total_size=10 ** 12)